@@ -0,0 +1,50 @@
+"""Compare the throughput of hash functions used with ``HashDecorator``.
+
+Run with ``python benchmarks/hashing.py [size in MiB]``. For every hash function,
+the time to hash a file by name through :meth:`HashDecorator.put_file` is measured.
+"""
+
+import functools
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from minimalkv.idgen import Blake2bTreeHash, HashDecorator
+from minimalkv.memory import DictStore
+
+HASHFUNCS = {
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+    "blake2b-tree (1 thread)": functools.partial(Blake2bTreeHash, max_workers=1),
+    "blake2b-tree": Blake2bTreeHash,
+}
+
+
+class _NullStore(DictStore):
+    # discard the data to only measure reading and hashing
+    def _put_filename(self, key, filename, *args, **kwargs):
+        return key
+
+
+def main(size_mib=256):
+    """Hash a file of ``size_mib`` MiB with every hash function."""
+    with tempfile.NamedTemporaryFile() as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mib):
+            f.write(block)
+        f.flush()
+
+        print(f"{os.cpu_count()} CPUs, {size_mib} MiB")
+        for name, hashfunc in HASHFUNCS.items():
+            store = HashDecorator(_NullStore(), hashfunc=hashfunc)
+            start = time.perf_counter()
+            store.put_file(None, f.name)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>24}: {size_mib / elapsed:8.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -6,7 +6,13 @@ from minimalkv._constants import (
     VALID_NON_NUM,
 )
 from minimalkv._get_store import get_store, get_store_from_url
-from minimalkv._key_value_store import KeyValueStore, UrlKeyValueStore
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    UrlKeyValueStore,
+)
 from minimalkv._mixins import CopyMixin, TimeToLiveMixin, UrlMixin
 from minimalkv._store_creation import create_store
 from minimalkv._store_decoration import decorate_store
@@ -26,8 +32,11 @@ __all__ = [
     "FOREVER",
     "get_store_from_url",
     "get_store",
+    "KeyPage",
+    "KeyStat",
     "KeyValueStore",
     "NOT_SET",
+    "PreconditionFailed",
     "TimeToLiveMixin",
     "url2dict",
     "UrlKeyValueStore",
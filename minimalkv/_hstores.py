@@ -1,4 +1,4 @@
-import os
+import warnings
 
 from minimalkv._mixins import ExtendedKeyspaceMixin
 from minimalkv.fs import FilesystemStore
@@ -9,22 +9,12 @@ from minimalkv.net.botostore import BotoStore
 from minimalkv.net.gcstore import GoogleCloudStore
 
 
-class HDictStore(ExtendedKeyspaceMixin, DictStore):  # noqa D
-    pass
-
-
-class HRedisStore(ExtendedKeyspaceMixin, RedisStore):  # noqa D
-    pass
-
-
-class HAzureBlockBlobStore(ExtendedKeyspaceMixin, AzureBlockBlobStore):  # noqa D
-    pass
-
-
-class HBotoStore(ExtendedKeyspaceMixin, BotoStore):  # noqa D
-    def size(self, key: str) -> bytes:
+class _SizeMixin:
+    def size(self, key: str) -> int:
         """Get size of data at key in bytes.
 
+        Deprecated, use ``stat(key).size`` instead.
+
         Parameters
         ----------
         key : str
@@ -35,26 +25,33 @@ class HBotoStore(ExtendedKeyspaceMixin, BotoStore):  # noqa D
         size : int
             Size of value at key in bytes.
         """
-        k = self.bucket.lookup(self.prefix + key)
-        return k.size
+        warnings.warn(
+            "size(key) is deprecated, use stat(key).size instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        return self.stat(key).size  # type: ignore
 
 
-class HGoogleCloudStore(ExtendedKeyspaceMixin, GoogleCloudStore):  # noqa D
+class HDictStore(ExtendedKeyspaceMixin, DictStore):  # noqa D
     pass
 
 
-class HFilesystemStore(ExtendedKeyspaceMixin, FilesystemStore):  # noqa D
-    def size(self, key: str) -> int:
-        """Get size of data at key in bytes.
+class HRedisStore(ExtendedKeyspaceMixin, RedisStore):  # noqa D
+    pass
 
-        Parameters
-        ----------
-        key : str
-            Key of data.
 
-        Returns
-        -------
-        size : int
-            Size of value at key in bytes.
-        """
-        return os.path.getsize(self._build_filename(key))
+class HAzureBlockBlobStore(ExtendedKeyspaceMixin, AzureBlockBlobStore):  # noqa D
+    pass
+
+
+class HBotoStore(_SizeMixin, ExtendedKeyspaceMixin, BotoStore):  # noqa D
+    pass
+
+
+class HGoogleCloudStore(ExtendedKeyspaceMixin, GoogleCloudStore):  # noqa D
+    pass
+
+
+class HFilesystemStore(_SizeMixin, ExtendedKeyspaceMixin, FilesystemStore):  # noqa D
+    pass
@@ -1,5 +1,20 @@
+import heapq
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from io import BytesIO
-from typing import IO, Iterable, Iterator, List, Optional, Union
+from typing import (
+    IO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from minimalkv._constants import VALID_KEY_RE
 from minimalkv._mixins import UrlMixin
@@ -8,6 +23,495 @@ from minimalkv._mixins import UrlMixin
 key_type = str
 
 
+class KeyStat(NamedTuple):
+    """Metadata of the value stored at a key, as returned by :meth:`KeyValueStore.stat`.
+
+    Attributes
+    ----------
+    key : str
+        The key.
+    size : int
+        Size of the value in bytes.
+    last_modified : datetime, optional
+        Time of the last modification, timezone-aware. ``None`` if the store does not
+        record it.
+    etag : str, optional
+        Identifier of the stored content which changes whenever the value changes,
+        e.g. an ETag or content hash. ``None`` if the store does not provide one.
+    """
+
+    key: str
+    size: int
+    last_modified: Optional[datetime] = None
+    etag: Optional[str] = None
+
+
+class KeyPage(NamedTuple):
+    """A page of keys, as returned by :meth:`KeyValueStore.list_page`.
+
+    Attributes
+    ----------
+    keys : list of str
+        The keys of the page, in ascending order.
+    token : str, optional
+        Continuation token to pass to :meth:`KeyValueStore.list_page` for the next
+        page. ``None`` if there are no more keys.
+    """
+
+    keys: List[str]
+    token: Optional[str] = None
+
+
+def _key_page(keys: List[str], limit: int) -> KeyPage:
+    """Return the page of the first ``limit`` of ``limit + 1`` sorted ``keys``.
+
+    The continuation token is the last key of the page, there are more keys if one
+    more than ``limit`` was listed.
+    """
+    if len(keys) > limit:
+        return KeyPage(keys[:limit], keys[limit - 1])
+    return KeyPage(keys)
+
+
+def _check_page_arguments(
+    start_after: Optional[str], limit: int, token: Optional[str]
+) -> None:
+    """Raise ValueError if the arguments of ``list_page`` are invalid."""
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    if start_after is not None and token is not None:
+        raise ValueError("Only one of start_after and token can be given")
+
+
+def _sorted_page(
+    keys: Iterable[str], start_after: Optional[str], limit: int, token: Optional[str]
+) -> KeyPage:
+    """Select the page from unordered ``keys``, the token is its last key."""
+    if token is not None:
+        start_after = token
+    if start_after is not None:
+        keys = (key for key in keys if key > start_after)
+    return _key_page(heapq.nsmallest(limit + 1, keys), limit)
+
+
+def _nonempty_page(
+    store: "KeyValueStore", prefix: str, start_after: Optional[str], limit: int
+) -> KeyPage:
+    """List the first page of ``store`` with keys after ``start_after``.
+
+    Pages without keys are skipped, the page only has no keys if the listing is
+    complete.
+    """
+    page = store.list_page(prefix, start_after, limit)
+    while not page.keys and page.token is not None:
+        page = store.list_page(prefix, limit=limit, token=page.token)
+    return page
+
+
+class PreconditionFailed(Exception):
+    """The condition of a conditional write or delete was not met.
+
+    Raised by :meth:`KeyValueStore.put` and :meth:`KeyValueStore.delete` if
+    ``if_match`` does not match the current ETag of the value or the key exists
+    despite ``if_none_match``.
+    """
+
+
+def _check_precondition(key: str, etag: Optional[str], if_match: Optional[str]):
+    """Raise PreconditionFailed unless the current ``etag`` of key satisfies ``if_match``.
+
+    ``etag`` is ``None`` if the key does not exist, ``if_match`` is ``None`` if it must
+    not exist.
+    """
+    if if_match is None:
+        if etag is not None:
+            raise PreconditionFailed(f"The key {key} already exists")
+    elif etag != if_match:
+        raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+
+
+def _file_size(file: IO) -> int:
+    """Return the number of bytes left in ``file``, seeking to its end if possible."""
+    try:
+        seekable = file.seekable()
+    except AttributeError:
+        seekable = False
+    if seekable:
+        start = file.tell()
+        file.seek(0, io.SEEK_END)
+        return file.tell() - start
+
+    # short reads do not mean the end of the file for raw or streaming readers
+    bufsize = 1024 * 1024
+    size = 0
+    while True:
+        buf = file.read(bufsize)
+        if not buf:
+            return size
+        size += len(buf)
+
+
+def _read_at_most(file: IO, n: int) -> bytes:
+    """Read ``n`` bytes from ``file``, fewer only if it ends before.
+
+    Raw and streaming readers may return less than requested before the end.
+    """
+    chunks = []
+    remaining = n
+    while remaining > 0:
+        buf = file.read(remaining)
+        if not buf:
+            break
+        chunks.append(buf)
+        remaining -= len(buf)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+# ranges closer than this are read at once by get_ranges
+_MAX_RANGE_GAP = 64 * 1024
+
+
+def _resolve_ranges(
+    ranges: Iterable[Tuple[int, Optional[int]]], size: Callable[[], int]
+) -> List[Tuple[int, Optional[int]]]:
+    """Resolve negative offsets relative to the end of the value, like slices.
+
+    ``size`` is only called if there is a negative offset.
+    """
+    resolved = []
+    total = None
+    for start, end in ranges:
+        if start < 0 or (end is not None and end < 0):
+            if total is None:
+                total = size()
+            if start < 0:
+                start = max(0, total + start)
+            if end is not None and end < 0:
+                end = max(0, total + end)
+        resolved.append((start, end))
+    return resolved
+
+
+def _read_range(file: IO, start: int, end: Optional[int]) -> bytes:
+    """Read the bytes from ``start`` up to ``end`` of ``file``."""
+    bufsize = 1024 * 1024
+    try:
+        seekable = file.seekable()
+    except AttributeError:
+        seekable = False
+    if seekable:
+        file.seek(start)
+    else:
+        skip = start
+        while skip > 0:
+            skipped = len(file.read(min(skip, bufsize)))
+            if not skipped:
+                return b""
+            skip -= skipped
+
+    if end is None:
+        return file.read()
+    parts = []
+    remaining = end - start
+    while remaining > 0:
+        buf = file.read(remaining)
+        if not buf:
+            break
+        parts.append(buf)
+        remaining -= len(buf)
+    return b"".join(parts)
+
+
+def _coalesce_ranges(
+    ranges: List[Tuple[int, Optional[int]]], max_gap: int
+) -> List[Tuple[int, Optional[int], List[int]]]:
+    """Merge ranges less than ``max_gap`` bytes apart.
+
+    Returns the merged ranges with the indices of the ranges they cover.
+    """
+    merged: List[Tuple[int, Optional[int], List[int]]] = []
+    for i in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+        start, end = ranges[i]
+        if merged:
+            last_start, last_end, members = merged[-1]
+            if last_end is None or start <= last_end + max_gap:
+                if end is not None and last_end is not None:
+                    end = max(end, last_end)
+                else:
+                    end = None
+                merged[-1] = (last_start, end, members + [i])
+                continue
+        merged.append((start, end, [i]))
+    return merged
+
+
+def _read_concurrently(
+    get_range: Callable[[int, Optional[int]], bytes], max_workers: Optional[int]
+) -> Callable[[List[Tuple[int, Optional[int]]]], List[bytes]]:
+    """Return a function reading ranges with ``get_range`` on a thread pool."""
+
+    def read(ranges: List[Tuple[int, Optional[int]]]) -> List[bytes]:
+        if len(ranges) <= 1:
+            return [get_range(start, end) for start, end in ranges]
+        with ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(lambda r: get_range(*r), ranges))
+
+    return read
+
+
+def _get_ranges(
+    read: Callable[[List[Tuple[int, Optional[int]]]], List[bytes]],
+    ranges: Iterable[Tuple[int, Optional[int]]],
+    size: Callable[[], int],
+    max_gap: int,
+) -> List[bytes]:
+    """Read several ranges, coalescing nearby ones.
+
+    ``read`` is called once with the merged ranges, their offsets are not negative.
+    """
+    resolved = _resolve_ranges(ranges, size)
+    merged = _coalesce_ranges(resolved, max_gap)
+    data = read([(start, end) for start, end, _ in merged])
+
+    result = [b""] * len(resolved)
+    for (offset, _, members), buf in zip(merged, data):
+        for i in members:
+            start, end = resolved[i]
+            if end is None:
+                result[i] = buf[start - offset :]
+            else:
+                result[i] = buf[start - offset : max(start, end) - offset]
+    return result
+
+
+def _byte_view(data) -> Union[bytes, memoryview]:
+    """Return ``data`` as ``bytes`` or a flat byte view, without copying it.
+
+    Raises OSError if ``data`` does not support the buffer protocol.
+    """
+    if isinstance(data, bytes):
+        return data
+    try:
+        view = memoryview(data)
+    except TypeError:
+        raise OSError("Provided data is not a bytes-like object")
+    if not view.c_contiguous:
+        # e.g. a strided numpy array, which has to be copied to be read in order
+        return view.tobytes()
+    return view.cast("B")
+
+
+class _BufferReader(io.BufferedIOBase):
+    """Seekable file reading from a flat byte view, like ``BytesIO`` without a copy."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:  # noqa D
+        return True
+
+    def seekable(self) -> bool:  # noqa D
+        return True
+
+    def tell(self) -> int:  # noqa D
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:  # noqa D
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(f"negative seek value {offset}")
+        self._pos = offset
+        return offset
+
+    def read(self, size: Optional[int] = -1) -> bytes:  # noqa D
+        end = len(self._view)
+        if size is not None and size >= 0:
+            end = min(end, self._pos + size)
+        data = self._view[self._pos : end].tobytes()
+        self._pos += len(data)
+        return data
+
+    read1 = read
+
+    def readinto(self, b) -> int:  # noqa D
+        view = memoryview(b).cast("B")
+        data = self._view[self._pos : self._pos + len(view)]
+        view[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _buffer_file(data: Union[bytes, memoryview]) -> IO:
+    """Return a seekable file reading ``data``, as returned by :func:`_byte_view`."""
+    if isinstance(data, bytes):
+        return BytesIO(data)
+    return cast(IO, _BufferReader(data))
+
+
+class _StreamReader(io.BufferedIOBase):
+    """Unseekable file reading the concatenation of an iterable of bytes-like chunks.
+
+    The chunks are only consumed as far as the data is read.
+    """
+
+    def __init__(self, chunks: Iterable):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b"")
+
+    def readable(self) -> bool:  # noqa D
+        return True
+
+    def _next_chunk(self) -> bool:
+        # skips empty chunks, returns False at the end of the stream
+        while not self._chunk:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                return False
+            self._chunk = memoryview(_byte_view(chunk))
+        return True
+
+    def _take(self, size: int) -> memoryview:
+        part = self._chunk[:size]
+        self._chunk = self._chunk[len(part) :]
+        return part
+
+    def read(self, size: Optional[int] = -1) -> bytes:  # noqa D
+        parts = []
+        remaining = -1 if size is None else size
+        while remaining != 0 and self._next_chunk():
+            if remaining < 0:
+                parts.append(self._take(len(self._chunk)))
+            else:
+                parts.append(self._take(remaining))
+                remaining -= len(parts[-1])
+        return b"".join(parts)
+
+    def read1(self, size: Optional[int] = -1) -> bytes:  # noqa D
+        if not self._next_chunk():
+            return b""
+        if size is None or size < 0:
+            size = len(self._chunk)
+        return self._take(size).tobytes()
+
+    def readinto(self, b) -> int:  # noqa D
+        view = memoryview(b).cast("B")
+        pos = 0
+        while pos < len(view) and self._next_chunk():
+            part = self._take(len(view) - pos)
+            view[pos : pos + len(part)] = part
+            pos += len(part)
+        return pos
+
+
+def _writable_view(buffer) -> memoryview:
+    """Return a flat, writable byte view of ``buffer``."""
+    view = memoryview(buffer)
+    if view.readonly:
+        raise TypeError("buffer is not writable")
+    return view.cast("B")
+
+
+def _readinto(file: IO, view: memoryview, key: str) -> int:
+    """Fill ``view`` from ``file`` and return the number of bytes read.
+
+    Uses ``file.readinto`` if available, so the data is not copied.
+
+    Raises ValueError if ``file`` holds more data than fits into ``view``.
+    """
+    readinto = getattr(file, "readinto", None)
+    pos = 0
+    while pos < len(view):
+        n = None
+        if readinto is not None:
+            try:
+                n = readinto(view[pos:])
+            except (NotImplementedError, io.UnsupportedOperation):
+                readinto = None
+        if readinto is None:
+            data = file.read(len(view) - pos)
+            n = len(data)
+            view[pos : pos + n] = data
+        if not n:
+            return pos
+        pos += n
+    if file.read(1):
+        raise ValueError(f"The value at {key} does not fit into the buffer")
+    return pos
+
+
+def _copy_file(source: IO, file: IO, bufsize: int = 1024 * 1024) -> None:
+    """Copy ``source`` to ``file``, reusing one buffer if ``source`` has ``readinto``."""
+    readinto = getattr(source, "readinto", None)
+    if readinto is not None:
+        buf = memoryview(bytearray(bufsize))
+        try:
+            while True:
+                n = readinto(buf)
+                if not n:
+                    return
+                file.write(buf[:n])
+        except (NotImplementedError, io.UnsupportedOperation):
+            # nothing was read yet, readinto is not supported at all
+            pass
+
+    while True:
+        data = source.read(bufsize)
+        file.write(data)
+        if len(data) < bufsize:
+            return
+
+
+def _get_into_via_open(store, key: str, buffer) -> int:
+    """Read the value at key into ``buffer`` through ``store.open``.
+
+    Used by decorators transforming values.
+    """
+    view = _writable_view(buffer)
+    file = store.open(key)
+    try:
+        return _readinto(file, view, key)
+    finally:
+        file.close()
+
+
+def _get_range_via_open(store, key: str, start: int, end: Optional[int]) -> bytes:
+    """Read a range of the value at key through ``store.open``.
+
+    Used by decorators transforming values, which cannot pass ranges on.
+    """
+    ((start, end),) = _resolve_ranges([(start, end)], lambda: store.stat(key).size)
+    file = store.open(key)
+    try:
+        if end is not None and end <= start:
+            return b""
+        return _read_range(file, start, end)
+    finally:
+        file.close()
+
+
+def _get_ranges_via_get_range(
+    store,
+    key: str,
+    ranges: Iterable[Tuple[int, Optional[int]]],
+    max_gap: int,
+    max_workers: Optional[int],
+) -> List[bytes]:
+    """Read several ranges of the value at key using ``store.get_range``."""
+    return _get_ranges(
+        _read_concurrently(
+            lambda start, end: store.get_range(key, start, end), max_workers
+        ),
+        ranges,
+        lambda: store.stat(key).size,
+        max_gap,
+    )
+
+
 class KeyValueStore:
     """
     Class to access a key-value store.
@@ -45,15 +549,19 @@ class KeyValueStore:
         """
         return self.iter_keys()
 
-    def delete(self, key: str) -> Optional[str]:
+    def delete(self, key: str, if_match: Optional[str] = None) -> Optional[str]:
         """Delete data at key.
 
-        Does not raise an error if the key does not exist.
+        Does not raise an error if the key does not exist, unless ``if_match`` is
+        given.
 
         Parameters
         ----------
         key: str
             The key of data to be deleted.
+        if_match : str, optional
+            Only delete the value if its ETag, as returned by :meth:`stat`, is
+            ``if_match``. The check and the deletion are atomic.
 
         Raises
         ------
@@ -61,8 +569,16 @@ class KeyValueStore:
             If the key is not valid.
         IOError
             If there was an error deleting.
+        PreconditionFailed
+            If ``if_match`` is given and the key does not exist or has a different
+            ETag.
+        NotImplementedError
+            If ``if_match`` is given and the store does not support conditional
+            deletes.
         """
         self._check_valid_key(key)
+        if if_match is not None:
+            return self._delete_conditional(key, if_match)
         return self._delete(key)
 
     def get(self, key: str) -> bytes:
@@ -122,6 +638,126 @@ class KeyValueStore:
         else:
             return self._get_file(key, file)
 
+    def get_into(self, key: str, buffer) -> int:
+        """Read the value at key into a preallocated buffer.
+
+        ``buffer`` can be any writable object supporting the buffer protocol, e.g. a
+        ``bytearray``, a ``memoryview`` or a contiguous NumPy array, and is filled from
+        its start. Use :meth:`stat` to determine the size needed. Backends read into
+        the buffer directly where possible, without intermediate copies.
+
+        Parameters
+        ----------
+        key : str
+            The key to be read.
+        buffer : writable buffer
+            The buffer to read the value into.
+
+        Returns
+        -------
+        int
+            Number of bytes read, the size of the value.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid or the value is larger than the buffer.
+        TypeError
+            If the buffer is not writable.
+        IOError
+            If the value could not be read.
+        KeyError
+            If the key was not found.
+        """
+        self._check_valid_key(key)
+        return self._get_into(key, _writable_view(buffer))
+
+    def get_range(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Return the bytes from ``start`` up to ``end`` of the value at key.
+
+        Offsets behave like slice indices: negative ones count from the end of the
+        value, and the result is shorter than requested if the value is. Backends
+        read only the requested bytes where possible.
+
+        Parameters
+        ----------
+        key : str
+            The key to be read.
+        start : int, optional, default = 0
+            Offset of the first byte to read.
+        end : int, optional
+            Offset after the last byte to read. Read up to the end of the value if
+            not given.
+
+        Returns
+        -------
+        data : bytes
+            The requested part of the value.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If the value could not be read.
+        KeyError
+            If the key was not found.
+        """
+        self._check_valid_key(key)
+        ((start, end),) = _resolve_ranges([(start, end)], lambda: self._stat(key).size)
+        if end is not None and end <= start:
+            if not self._has_key(key):
+                raise KeyError(key)
+            return b""
+        return self._get_range(key, start, end)
+
+    def get_ranges(
+        self,
+        key: str,
+        ranges: Iterable[Tuple[int, Optional[int]]],
+        max_gap: int = _MAX_RANGE_GAP,
+        max_workers: Optional[int] = None,
+    ) -> List[bytes]:
+        """Return several ranges of the value at key.
+
+        Ranges less than ``max_gap`` bytes apart are merged and read at once, the
+        merged ranges are read concurrently using :meth:`get_range`.
+
+        Parameters
+        ----------
+        key : str
+            The key to be read.
+        ranges : iterable of (int, int or None)
+            ``(start, end)`` offsets of the ranges, as for :meth:`get_range`.
+        max_gap : int, optional, default = 64 * 1024
+            Ranges separated by at most this many bytes are read together.
+        max_workers : int, optional
+            Number of threads reading merged ranges concurrently.
+
+        Returns
+        -------
+        list of bytes
+            The data of every range, in the order of ``ranges``.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If the value could not be read.
+        KeyError
+            If the key was not found.
+        """
+        self._check_valid_key(key)
+        return _get_ranges(
+            _read_concurrently(
+                lambda start, end: self.get_range(key, start, end), max_workers
+            ),
+            ranges,
+            lambda: self._stat(key).size,
+            max_gap,
+        )
+
     def iter_keys(self, prefix: str = "") -> Iterator[str]:
         """Iterate over all keys in the store starting with prefix.
 
@@ -187,6 +823,49 @@ class KeyValueStore:
         """
         return list(self.iter_keys(prefix))
 
+    def list_page(
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        limit: int = 1000,
+        token: Optional[str] = None,
+    ) -> KeyPage:
+        """List one page of the keys starting with prefix, in ascending order.
+
+        Passing the ``token`` of a page lists the next one, so a listing can be resumed
+        from the last token after an error. With ``start_after``, a listing can start
+        anywhere, e.g. to split the keys into ranges listed by several workers.
+
+        A page may contain fewer than ``limit`` keys even if more follow, the listing
+        is complete once the token is ``None``.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only list keys starting with prefix. List all keys if empty.
+        start_after : str, optional
+            Only list keys after this one.
+        limit : int, optional, default = 1000
+            Maximum number of keys in the page.
+        token : str, optional
+            The continuation token of the previous page.
+
+        Returns
+        -------
+        KeyPage
+            The keys of the page and the token of the next one.
+
+        Raises
+        ------
+        ValueError
+            If ``limit`` is not positive or both ``start_after`` and ``token`` are
+            given.
+        IOError
+            If there was an error accessing the store.
+        """
+        _check_page_arguments(start_after, limit, token)
+        return self._list_page(prefix, start_after, limit, token)
+
     def open(self, key: str) -> IO:
         """Open record at key.
 
@@ -212,15 +891,85 @@ class KeyValueStore:
         self._check_valid_key(key)
         return self._open(key)
 
-    def put(self, key: str, data: bytes) -> str:
+    def stat(self, key: str) -> KeyStat:
+        """Return the metadata of the value at key without reading the value.
+
+        Stores which cannot determine the size of a value otherwise read it.
+
+        Parameters
+        ----------
+        key : str
+            The key to be examined.
+
+        Returns
+        -------
+        KeyStat
+            Size, time of last modification and ETag of the value, as far as the store
+            provides them.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If there was an error accessing the store.
+        KeyError
+            If the key was not found.
+        """
+        self._check_valid_key(key)
+        return self._stat(key)
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        Stores whose listings include metadata return it in the same pass, others
+        call :meth:`stat` for every key. Keys deleted while iterating are skipped.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        for key in self.iter_keys(prefix):
+            try:
+                yield self._stat(key)
+            except KeyError:
+                pass
+
+    def put(
+        self,
+        key: str,
+        data: bytes,
+        *,
+        if_match: Optional[str] = None,
+        if_none_match: bool = False,
+    ) -> str:
         """Store bytestring data at key.
 
+        ``data`` can be any bytes-like object, e.g. a ``bytearray``, ``memoryview`` or
+        numpy array. Backends accepting buffers store it without copying it first.
+
+        With ``if_match`` or ``if_none_match`` the value is only written if the
+        condition holds, which allows optimistic concurrency control: read a value
+        and its ETag with :meth:`stat`, then write the new value with ``if_match`` and
+        start over on :exc:`PreconditionFailed`. The check and the write are atomic.
+
         Parameters
         ----------
         key : str
             The key under which the data is to be stored.
-        data : bytes
-            Data to be stored at key, must be of type  ``bytes``.
+        data : bytes-like
+            Data to be stored at key, must support the buffer protocol.
+        if_match : str, optional
+            Only overwrite the value if its ETag, as returned by :meth:`stat`, is
+            ``if_match``.
+        if_none_match : bool, optional, default = False
+            Only write the value if the key does not exist yet.
 
         Returns
         -------
@@ -230,14 +979,20 @@ class KeyValueStore:
         Raises
         ------
         ValueError
-            If the key is not valid.
+            If the key is not valid or both conditions are given.
         IOError
             If storing failed or the file could not be read.
+        PreconditionFailed
+            If the condition is not met.
+        NotImplementedError
+            If a condition is given and the store does not support conditional writes.
         """
         self._check_valid_key(key)
-        if not isinstance(data, bytes):
-            raise OSError("Provided data is not of type bytes")
-        return self._put(key, data)
+        if if_match is not None or if_none_match:
+            if if_match is not None and if_none_match:
+                raise ValueError("Only one of if_match and if_none_match can be given")
+            return self._put_conditional(key, _byte_view(data), if_match)
+        return self._put(key, _byte_view(data))
 
     def put_file(self, key: str, file: Union[str, IO]) -> str:
         """Store contents of file at key.
@@ -274,6 +1029,36 @@ class KeyValueStore:
         else:
             return self._put_file(key, file)
 
+    def put_stream(self, key: str, chunks: Iterable) -> str:
+        """Store the concatenation of an iterable of chunks at key.
+
+        The chunks are consumed one after another while storing, so values of unknown
+        size need not be joined in memory first. Backends write them incrementally
+        where possible, e.g. as a multipart upload.
+
+        Parameters
+        ----------
+        key : str
+            The key under which the data is to be stored.
+        chunks : iterable of bytes-like
+            The data to be stored, e.g. a generator of ``bytes`` or ``memoryview``
+            objects.
+
+        Returns
+        -------
+        str
+            The key under which data was stored.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If storing failed or a chunk is not bytes-like.
+        """
+        self._check_valid_key(key)
+        return self._put_stream(key, map(_byte_view, chunks))
+
     def _check_valid_key(self, key: str) -> None:
         """Check if a key is valid and raise a ValueError if it is not.
 
@@ -298,6 +1083,22 @@ class KeyValueStore:
         """Delete the data at key in store."""
         raise NotImplementedError
 
+    def _delete_conditional(self, key: str, if_match: str):
+        """Delete the data at key if its ETag is ``if_match``.
+
+        Raises :exc:`PreconditionFailed` otherwise, also if the key does not exist.
+
+        Parameters
+        ----------
+        key : str
+            Key of the value to be deleted.
+        if_match : str
+            The expected ETag of the value.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support conditional deletes"
+        )
+
     def _get(self, key: str) -> bytes:
         """Read data at key in store.
 
@@ -306,11 +1107,11 @@ class KeyValueStore:
         key : str
             Key of value to be retrieved.
         """
-        buf = BytesIO()
-
-        self._get_file(key, buf)
-
-        return buf.getvalue()
+        source = self._open(key)
+        try:
+            return source.read()
+        finally:
+            source.close()
 
     def _get_file(self, key: str, file: IO) -> str:
         """Write data at key to file-like object file.
@@ -322,20 +1123,13 @@ class KeyValueStore:
         file : file-like
             File-like object with a *write* method to be written.
         """
-        bufsize = 1024 * 1024
-
         # note: we do not use a context manager here or close the source.
         # the source goes out of scope shortly after, taking care of the issue
         # this allows us to support file-like objects without close as well,
         # such as BytesIO.
         source = self.open(key)
         try:
-            while True:
-                buf = source.read(bufsize)
-                file.write(buf)
-
-                if len(buf) < bufsize:
-                    break
+            _copy_file(source, file)
         finally:
             source.close()
 
@@ -354,6 +1148,72 @@ class KeyValueStore:
         with open(filename, "wb") as dest:
             return self._get_file(key, dest)
 
+    def _get_into(self, key: str, view: memoryview) -> int:
+        """Read the value at key into ``view`` and return its size.
+
+        The default implementation reads from :meth:`_open` using ``readinto``.
+
+        Parameters
+        ----------
+        key : str
+            Key of the value.
+        view : memoryview
+            Writable, flat byte view of the buffer.
+        """
+        file = self._open(key)
+        try:
+            return _readinto(file, view, key)
+        finally:
+            file.close()
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        """Return the bytes from ``start`` up to ``end`` of the value at key.
+
+        The default implementation opens the value and seeks to ``start``.
+
+        Parameters
+        ----------
+        key : str
+            Key of the value.
+        start : int
+            Offset of the first byte, not negative.
+        end : int, optional
+            Offset after the last byte, larger than ``start``. Up to the end of the
+            value if ``None``.
+        """
+        file = self._open(key)
+        try:
+            return _read_range(file, start, end)
+        finally:
+            file.close()
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        """List one page of the keys starting with prefix, in ascending order.
+
+        The default implementation selects the page from :meth:`iter_keys`, its token
+        is the last key of the page. Backends able to list keys in order from a given
+        key override this.
+
+        Parameters
+        ----------
+        prefix : str
+            Only list keys starting with prefix.
+        start_after : str, optional
+            Only list keys after this one.
+        limit : int
+            Maximum number of keys in the page, positive.
+        token : str, optional
+            The continuation token of the previous page. Not given together with
+            ``start_after``.
+        """
+        return _sorted_page(self.iter_keys(prefix), start_after, limit, token)
+
     def _has_key(self, key: str) -> bool:
         """Check the existence of key in store.
 
@@ -379,6 +1239,22 @@ class KeyValueStore:
         """
         raise NotImplementedError
 
+    def _stat(self, key: str) -> KeyStat:
+        """Return the metadata of the value at key.
+
+        The default implementation opens the value to determine its size.
+
+        Parameters
+        ----------
+        key : str
+            Key of the value.
+        """
+        file = self._open(key)
+        try:
+            return KeyStat(key, _file_size(file))
+        finally:
+            file.close()
+
     def _put(self, key: str, data: bytes) -> str:
         """Store bytestring data at key.
 
@@ -386,8 +1262,31 @@ class KeyValueStore:
         ----------
         key : str
             Key under which data should be stored.
-        data : bytes
-            Data to be stored.
+        data : bytes or memoryview
+            Data to be stored, a flat byte view if not passed as ``bytes``.
+
+        Returns
+        -------
+        key : str
+            Key where data was stored.
+
+        """
+        return self._put_file(key, _buffer_file(data))
+
+    def _put_conditional(self, key: str, data: bytes, if_match: Optional[str]) -> str:
+        """Store bytestring data at key if the condition holds.
+
+        Raises :exc:`PreconditionFailed` if the condition is not met.
+
+        Parameters
+        ----------
+        key : str
+            Key under which data should be stored.
+        data : bytes or memoryview
+            Data to be stored, a flat byte view if not passed as ``bytes``.
+        if_match : str, optional
+            The expected ETag of the current value. If ``None``, the key must not
+            exist.
 
         Returns
         -------
@@ -395,7 +1294,9 @@ class KeyValueStore:
             Key where data was stored.
 
         """
-        return self._put_file(key, BytesIO(data))
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support conditional writes"
+        )
 
     def _put_file(self, key: str, file: IO) -> str:
         """Store data from file-like object at key.
@@ -415,6 +1316,27 @@ class KeyValueStore:
         """
         raise NotImplementedError
 
+    def _put_stream(self, key: str, chunks: Iterator) -> str:
+        """Store the concatenation of ``chunks`` at key.
+
+        The default implementation passes an unseekable file reading the chunks to
+        :meth:`_put_file`.
+
+        Parameters
+        ----------
+        key : str
+            Key under which data should be stored.
+        chunks : iterator of bytes or memoryview
+            Data to be stored.
+
+        Returns
+        -------
+        key : str
+            Key where data was stored.
+
+        """
+        return self._put_file(key, cast(IO, _StreamReader(chunks)))
+
     def _put_filename(self, key: str, filename: str) -> str:
         """Store data from file at filename at key.
 
@@ -1,5 +1,4 @@
-from io import BytesIO
-from typing import IO, Callable, Optional, Union
+from typing import IO, Callable, Iterable, Iterator, Optional, Union, cast
 
 from minimalkv._constants import FOREVER, NOT_SET, VALID_KEY_RE_EXTENDED
 
@@ -120,7 +119,13 @@ class TimeToLiveMixin:
         return ttl_secs
 
     def put(
-        self, key: str, data: bytes, ttl_secs: Optional[Union[str, float, int]] = None
+        self,
+        key: str,
+        data: bytes,
+        ttl_secs: Optional[Union[str, float, int]] = None,
+        *,
+        if_match: Optional[str] = None,
+        if_none_match: bool = False,
     ) -> str:
         """Store bytestring data at key.
 
@@ -133,10 +138,15 @@ class TimeToLiveMixin:
         ----------
         key : str
             The key under which the data is to be stored.
-        data : bytes
-            Data to be stored at key, must be of types ``bytes``.
+        data : bytes-like
+            Data to be stored at key, must support the buffer protocol.
         ttl_secs : numeric or str
             Number of seconds until the key expires.
+        if_match : str, optional
+            Only overwrite the value if its ETag, as returned by ``stat``, is
+            ``if_match``.
+        if_none_match : bool, optional, default = False
+            Only write the value if the key does not exist yet.
 
         Returns
         -------
@@ -146,17 +156,25 @@ class TimeToLiveMixin:
         Raises
         ------
         ValueError
-            If the key is not valid.
+            If the key is not valid or both conditions are given.
         IOError
             If storing failed or the file could not be read.
         ValueError
             If ``ttl_secs`` is invalid.
+        PreconditionFailed
+            If the condition is not met.
 
         """
+        from minimalkv._key_value_store import _byte_view
+
         self._check_valid_key(key)
-        if not isinstance(data, bytes):
-            raise OSError("Provided data is not of type bytes")
-        return self._put(key, data, self._valid_ttl(ttl_secs))
+        if if_match is not None or if_none_match:
+            if if_match is not None and if_none_match:
+                raise ValueError("Only one of if_match and if_none_match can be given")
+            return self._put_conditional(
+                key, _byte_view(data), if_match, self._valid_ttl(ttl_secs)
+            )
+        return self._put(key, _byte_view(data), self._valid_ttl(ttl_secs))
 
     def put_file(
         self,
@@ -208,6 +226,46 @@ class TimeToLiveMixin:
         else:
             return self._put_file(key, file, self._valid_ttl(ttl_secs))
 
+    def put_stream(
+        self,
+        key: str,
+        chunks: Iterable,
+        ttl_secs: Optional[Union[str, float, int]] = None,
+    ) -> str:
+        """Store the concatenation of an iterable of chunks at key.
+
+        If ``ttl_secs`` is a positive number, the key will expire after ``ttl_secs``.
+        Other possible values for ``ttl_secs`` are as for :meth:`put`.
+
+        Parameters
+        ----------
+        key : str
+            The key under which the data is to be stored.
+        chunks : iterable of bytes-like
+            The data to be stored.
+        ttl_secs : str or numeric or None, optional, default = None
+            Number of seconds until the key expires.
+
+        Returns
+        -------
+        key: str
+            The key under which data was stored.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If storing failed or a chunk is not bytes-like.
+        ValueError
+            If ``ttl_secs`` is invalid.
+
+        """
+        from minimalkv._key_value_store import _byte_view
+
+        self._check_valid_key(key)
+        return self._put_stream(key, map(_byte_view, chunks), self._valid_ttl(ttl_secs))
+
     # default implementations similar to KeyValueStore below:
     def _put(
         self, key: str, data: bytes, ttl_secs: Optional[Union[str, float, int]] = None
@@ -229,7 +287,40 @@ class TimeToLiveMixin:
             Key where data was stored.
 
         """
-        return self._put_file(key, BytesIO(data), ttl_secs)
+        from minimalkv._key_value_store import _buffer_file
+
+        return self._put_file(key, _buffer_file(data), ttl_secs)
+
+    def _put_conditional(
+        self,
+        key: str,
+        data: bytes,
+        if_match: Optional[str],
+        ttl_secs: Optional[Union[str, float, int]] = None,
+    ) -> str:
+        """Store bytestring data at key if the condition holds.
+
+        Parameters
+        ----------
+        key : str
+            Key under which data should be stored.
+        data : bytes or memoryview
+            Data to be stored.
+        if_match : str, optional
+            The expected ETag of the current value. If ``None``, the key must not
+            exist.
+        ttl_secs : str or numeric or None, optional, default = None
+            Number of seconds until the key expires.
+
+        Returns
+        -------
+        key : str
+            Key where data was stored.
+
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support conditional writes"
+        )
 
     def _put_file(
         self, key: str, file: IO, ttl_secs: Optional[Union[str, float, int]] = None
@@ -253,6 +344,33 @@ class TimeToLiveMixin:
         """
         raise NotImplementedError
 
+    def _put_stream(
+        self,
+        key: str,
+        chunks: Iterator,
+        ttl_secs: Optional[Union[str, float, int]] = None,
+    ) -> str:
+        """Store the concatenation of ``chunks`` at key.
+
+        Parameters
+        ----------
+        key : str
+            Key under which data should be stored.
+        chunks : iterator of bytes or memoryview
+            Data to be stored.
+        ttl_secs : str or numeric or None, optional, default = None
+            Number of seconds until the key expires.
+
+        Returns
+        -------
+        key : str
+            Key where data was stored.
+
+        """
+        from minimalkv._key_value_store import _StreamReader
+
+        return self._put_file(key, cast(IO, _StreamReader(chunks)), ttl_secs)
+
     def _put_filename(
         self, key: str, filename: str, ttl_secs: Optional[Union[str, float, int]] = None
     ):
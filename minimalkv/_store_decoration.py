@@ -1,10 +1,14 @@
+from minimalkv.compression import CompressionDecorator
 from minimalkv.decorator import ReadOnlyDecorator, URLEncodeKeysDecorator
 
 
 def decorate_store(store, decoratorname):  # noqa D
-    decoratorname_part = decoratorname.split("(")[0]
+    decoratorname_part, _, argument = decoratorname.partition("(")
+    argument = argument.rstrip(")")
     if decoratorname_part == "urlencode":
         return URLEncodeKeysDecorator(store)
     if decoratorname_part == "readonly":
         return ReadOnlyDecorator(store)
+    if decoratorname_part == "compress":
+        return CompressionDecorator(store, codec=argument or "zlib")
     raise ValueError("Unknown store decorator: " + str(decoratorname))
@@ -0,0 +1,346 @@
+"""
+Answer lookups of missing keys without accessing the store.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.bloom import BloomFilterDecorator
+>>>
+>>> store = BloomFilterDecorator(DictStore())
+>>> key = store.put('key', b'value')
+>>> 'key' in store
+True
+>>> 'missing' in store
+False
+"""
+
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional, Set, Union
+
+from minimalkv._key_value_store import KeyStat
+from minimalkv.decorator import StoreDecorator
+
+_HEADER = struct.Struct(">8sBQBQ")
+_MAGIC = b"MKVBLOOM"
+_VERSION = 1
+
+
+class _BloomFilter:
+    """Bloom filter of ``num_bits`` bits using ``num_hashes`` hash functions."""
+
+    def __init__(self, num_bits: int, num_hashes: int, count: int = 0, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+        self.bits = bytearray((num_bits + 7) // 8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "_BloomFilter":
+        num_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key)
+        )
+
+    def dump(self, file: IO) -> None:
+        file.write(
+            _HEADER.pack(_MAGIC, _VERSION, self.num_bits, self.num_hashes, self.count)
+        )
+        file.write(self.bits)
+
+    @classmethod
+    def load(cls, file: IO) -> "_BloomFilter":
+        header = file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("Invalid bloom filter file")
+        magic, version, num_bits, num_hashes, count = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Invalid bloom filter file")
+        bits = bytearray(file.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError("Invalid bloom filter file")
+        return cls(num_bits, num_hashes, count, bits)
+
+
+class BloomFilterDecorator(StoreDecorator):
+    """Decorator answering lookups of missing keys from a bloom filter.
+
+    A bloom filter of all keys is built from ``iter_keys`` on first use, or when the
+    decorator is created if ``lazy`` is false. Keys which are definitely not in the
+    store are then answered locally: ``in`` returns ``False`` and ``get``, ``open``,
+    ``get_file``, ``get_into``, ``get_range`` and ``stat`` raise a :exc:`KeyError`. Other lookups
+    are passed on to the decorated store, for at most about ``error_rate`` of the
+    missing keys.
+
+    Keys are added to the filter before they are written. The filter cannot remove
+    keys, deleted keys are answered by the decorated store until the filter is
+    rebuilt. :meth:`rebuild` does that, and it is done automatically on the next
+    access once ``rebuild_interval`` seconds passed after a delete. Rebuilding
+    also grows the filter if it holds more keys than its capacity.
+
+    If ``path`` is given, :meth:`save` writes the filter to that file and it is
+    loaded from there instead of listing the keys. As the filter only knows about
+    writes done through this decorator, this is only correct if there are no
+    other writers, or if the filter is rebuilt after they wrote.
+
+    Parameters
+    ----------
+    store : KeyValueStore
+        The store to decorate.
+    capacity : int, optional, default = 1000000
+        Number of keys the filter is sized for.
+    error_rate : float, optional, default = 0.01
+        Probability of a missing key being passed on to the decorated store, as long
+        as there are at most ``capacity`` keys.
+    path : str, optional
+        File to persist the filter in.
+    lazy : bool, optional, default = True
+        Build or load the filter on first use instead of immediately.
+    rebuild_interval : float, optional
+        Seconds after a delete after which the filter is rebuilt.
+
+    """
+
+    def __init__(
+        self,
+        store,
+        capacity: int = 1000000,
+        error_rate: float = 0.01,
+        path: Optional[str] = None,
+        lazy: bool = True,
+        rebuild_interval: Optional[float] = None,
+    ):
+        super().__init__(store)
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.rebuild_interval = rebuild_interval
+
+        self._lock = threading.Lock()
+        # held while building or loading the filter, so it is done only once
+        self._build_lock = threading.Lock()
+        # capacity of the filter, grows when rebuilding a filter holding more keys
+        self._capacity = capacity
+        self._filter: Optional[_BloomFilter] = None
+        # keys written while the filter is rebuilt
+        self._added: Optional[Set[str]] = None
+        # keys being written, which the listing of a rebuild might miss
+        self._writing: "Counter[str]" = Counter()
+        self._last_delete: Optional[float] = None
+
+        if not lazy:
+            self._get_filter()
+
+    def _rebuild_due(self) -> bool:
+        return (
+            self._last_delete is not None
+            and self.rebuild_interval is not None
+            and time.monotonic() - self._last_delete >= self.rebuild_interval
+        )
+
+    def _get_filter(self) -> _BloomFilter:
+        bloom = self._filter
+        if bloom is None or self._rebuild_due():
+            with self._build_lock:
+                # another thread might have built the filter while waiting
+                bloom = self._filter
+                if (
+                    bloom is None
+                    and self.path is not None
+                    and os.path.exists(self.path)
+                ):
+                    with open(self.path, "rb") as f:
+                        bloom = self._filter = _BloomFilter.load(f)
+                elif bloom is None or self._rebuild_due():
+                    bloom = self._rebuild()
+        return bloom
+
+    @contextmanager
+    def _adding(self, key: str) -> Iterator[None]:
+        # adds key to the filter before it is written
+        self._get_filter()
+        with self._lock:
+            # read the filter under the lock, a rebuild might have replaced it
+            assert self._filter is not None
+            self._filter.add(key)
+            if self._added is not None:
+                self._added.add(key)
+            self._writing[key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writing[key] -= 1
+                if not self._writing[key]:
+                    del self._writing[key]
+
+    def _might_contain(self, key: str) -> bool:
+        self._dstore._check_valid_key(key)
+        return key in self._get_filter()
+
+    def rebuild(self) -> None:
+        """Build the filter from the keys in the decorated store.
+
+        Keys written while listing the keys are added to the new filter.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        with self._build_lock:
+            self._rebuild()
+
+    def _rebuild(self) -> _BloomFilter:
+        # must be called with the build lock held
+        with self._lock:
+            # keys still being written might not be listed yet
+            added = set(self._writing)
+            self._added = added
+            self._last_delete = None
+            capacity = self._capacity
+        try:
+            bloom = _BloomFilter.for_capacity(capacity, self.error_rate)
+            for key in self._dstore.iter_keys():
+                bloom.add(key)
+            if bloom.count > capacity:
+                # rebuild with a filter large enough for the keys
+                capacity = 2 * bloom.count
+                bloom = _BloomFilter.for_capacity(capacity, self.error_rate)
+                for key in self._dstore.iter_keys():
+                    bloom.add(key)
+        except BaseException:
+            with self._lock:
+                self._added = None
+            raise
+
+        with self._lock:
+            for key in added:
+                bloom.add(key)
+            self._added = None
+            self._filter = bloom
+            self._capacity = capacity
+        return bloom
+
+    def save(self) -> None:
+        """Write the filter to ``path``.
+
+        Raises
+        ------
+        ValueError
+            If no ``path`` was given.
+        IOError
+            If there was an error writing the file.
+        """
+        if self.path is None:
+            raise ValueError("No path to save the bloom filter to")
+        bloom = self._get_filter()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".bloom-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with self._lock:
+                    bloom.dump(f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __contains__(self, key: str) -> bool:  # noqa D
+        return self._might_contain(key) and key in self._dstore
+
+    def get(self, key: str) -> bytes:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.get(key)
+
+    def get_file(self, key: str, file: Union[str, IO]) -> str:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.get_file(key, file)
+
+    def open(self, key: str) -> IO:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.open(key)
+
+    def get_into(self, key: str, buffer) -> int:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.get_into(key, buffer)
+
+    def get_range(self, key: str, *args, **kwargs) -> bytes:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.get_range(key, *args, **kwargs)
+
+    def get_ranges(self, key: str, *args, **kwargs) -> List[bytes]:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.get_ranges(key, *args, **kwargs)
+
+    def stat(self, key: str) -> KeyStat:  # noqa D
+        if not self._might_contain(key):
+            raise KeyError(key)
+        return self._dstore.stat(key)
+
+    def put(self, key: str, data: bytes, *args, **kwargs) -> str:  # noqa D
+        with self._adding(key):
+            return self._dstore.put(key, data, *args, **kwargs)
+
+    def put_file(  # noqa D
+        self, key: str, file: Union[str, IO], *args, **kwargs
+    ) -> str:
+        with self._adding(key):
+            return self._dstore.put_file(key, file, *args, **kwargs)
+
+    def put_stream(self, key: str, chunks: Iterable, *args, **kwargs) -> str:  # noqa D
+        with self._adding(key):
+            return self._dstore.put_stream(key, chunks, *args, **kwargs)
+
+    def copy(self, source: str, dest: str) -> str:  # noqa D
+        if not self._might_contain(source):
+            raise KeyError(source)
+        with self._adding(dest):
+            return self._dstore.copy(source, dest)  # type: ignore
+
+    def move(self, source: str, dest: str) -> str:  # noqa D
+        if not self._might_contain(source):
+            raise KeyError(source)
+        with self._adding(dest):
+            result = self._dstore.move(source, dest)  # type: ignore
+        self._last_delete = time.monotonic()
+        return result
+
+    def delete(self, key: str, *args, **kwargs) -> Optional[str]:  # noqa D
+        result = self._dstore.delete(key, *args, **kwargs)
+        self._last_delete = time.monotonic()
+        return result
@@ -1,4 +1,4 @@
-from typing import IO, Union
+from typing import IO, Iterable, Union
 
 from minimalkv._key_value_store import KeyValueStore
 from minimalkv.decorator import StoreDecorator
@@ -32,7 +32,7 @@ class CacheDecorator(StoreDecorator):
         super().__init__(store)
         self.cache = cache
 
-    def delete(self, key: str) -> None:
+    def delete(self, key: str, *args, **kwargs) -> None:
         """Delete data at key.
 
         Deletes data from both the cache and the backing store.
@@ -42,7 +42,7 @@ class CacheDecorator(StoreDecorator):
         key : str
             Key of data to be deleted.
         """
-        self._dstore.delete(key)
+        self._dstore.delete(key, *args, **kwargs)
         self.cache.delete(key)
 
     def get(self, key: str) -> bytes:
@@ -181,7 +181,7 @@ class CacheDecorator(StoreDecorator):
                 self.cache.delete(dest)
             return k
 
-    def put(self, key: str, data: bytes) -> str:
+    def put(self, key: str, data: bytes, *args, **kwargs) -> str:
         """Store bytestring data at key.
 
         Will store the value in the backing store. Afterwards delete the (original)
@@ -192,7 +192,7 @@ class CacheDecorator(StoreDecorator):
         key : str
             The key under which the data is to be stored.
         data : bytes
-            Data to be stored at key, must be of type  ``bytes``.
+            Data to be stored at key, must be bytes-like.
 
         Returns
         -------
@@ -201,11 +201,11 @@ class CacheDecorator(StoreDecorator):
 
         """
         try:
-            return self._dstore.put(key, data)
+            return self._dstore.put(key, data, *args, **kwargs)
         finally:
             self.cache.delete(key)
 
-    def put_file(self, key: str, file: Union[str, IO]) -> str:
+    def put_file(self, key: str, file: Union[str, IO], *args, **kwargs) -> str:
         """Store contents of file at key.
 
         Will store the value in the backing store. Afterwards delete the (original)
@@ -225,6 +225,30 @@ class CacheDecorator(StoreDecorator):
 
         """
         try:
-            return self._dstore.put_file(key, file)
+            return self._dstore.put_file(key, file, *args, **kwargs)
+        finally:
+            self.cache.delete(key)
+
+    def put_stream(self, key: str, chunks: Iterable, *args, **kwargs) -> str:
+        """Store the concatenation of an iterable of chunks at key.
+
+        Will store the value in the backing store. Afterwards delete the (original)
+        value at key from the cache.
+
+        Parameters
+        ----------
+        key : str
+            The key under which the data is to be stored.
+        chunks : iterable of bytes-like
+            The data to be stored.
+
+        Returns
+        -------
+        key: str
+            The key under which data was stored.
+
+        """
+        try:
+            return self._dstore.put_stream(key, chunks, *args, **kwargs)
         finally:
             self.cache.delete(key)
@@ -0,0 +1,542 @@
+"""
+Deduplicating storage of values split into content-defined chunks.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.chunking import ChunkingDecorator
+>>>
+>>> store = ChunkingDecorator(DictStore(), avg_chunk_size=1024)
+>>> key = store.put('key', b'my_data' * 1000)
+>>> store.get('key') == b'my_data' * 1000
+True
+"""
+
+import bisect
+import hashlib
+import io
+import json
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from minimalkv._key_value_store import (
+    _MAX_RANGE_GAP,
+    KeyPage,
+    KeyStat,
+    _buffer_file,
+    _byte_view,
+    _get_ranges_via_get_range,
+    _writable_view,
+)
+from minimalkv.decorator import StoreDecorator
+
+try:
+    import numpy as np
+
+    has_numpy = True
+except ImportError:
+    has_numpy = False
+
+#: Manifests start with this line, followed by a JSON document.
+_MANIFEST_MAGIC = b"minimalkv-chunks\n"
+_MANIFEST_VERSION = 1
+
+# the boundaries of chunks must never change, hence the table of the Gear hash is
+# derived deterministically
+_GEAR = [
+    int.from_bytes(hashlib.sha256(bytes((i,))).digest()[:8], "big") for i in range(256)
+]
+_MASK64 = 2**64 - 1
+# the Gear hash at a position depends on the last 64 bytes
+_WINDOW = 64
+
+
+def _find_boundary_py(data: bytearray, begin: int, end: int, mask: int) -> int:
+    # return the first position in [begin, end) where the Gear hash has no bits of
+    # mask set, -1 if there is none
+    gear = _GEAR
+    h = 0
+    for b in data[begin - _WINDOW + 1 : begin]:
+        h = ((h << 1) + gear[b]) & _MASK64
+    for i in range(begin, end):
+        h = ((h << 1) + gear[data[i]]) & _MASK64
+        if not h & mask:
+            return i
+    return -1
+
+
+def _find_boundary_np(data: bytearray, begin: int, end: int, mask: int) -> int:
+    # same as _find_boundary_py, the hash at every position is the sum of the table
+    # values of the last 64 bytes shifted by their distance, which is computed by
+    # doubling the window in every step
+    lo = begin - _WINDOW + 1
+    h = _GEAR_NP[np.frombuffer(data, np.uint8, count=end - lo, offset=lo)]
+    tmp = np.empty_like(h)
+    shift = 1
+    while shift < _WINDOW:
+        n = len(h) - shift
+        np.left_shift(h[:n], np.uint64(shift), out=tmp[:n])
+        np.add(h[shift:], tmp[:n], out=h[shift:])
+        shift *= 2
+
+    hits = np.flatnonzero((h[_WINDOW - 1 :] & np.uint64(mask)) == 0)
+    return begin + int(hits[0]) if len(hits) else -1
+
+
+if has_numpy:
+    _GEAR_NP = np.array(_GEAR, dtype=np.uint64)
+    _find_boundary = _find_boundary_np
+else:
+    _find_boundary = _find_boundary_py
+
+
+class _Chunker:
+    """Split data into content-defined chunks.
+
+    A chunk ends after a position where the top bits of a Gear rolling hash over the
+    last 64 bytes are all zero, so boundaries move along with the content when data
+    is inserted or removed. Chunks are at least ``min_size`` and at most
+    ``max_size`` bytes long and ``avg_size`` bytes on average for random data.
+    """
+
+    def __init__(self, min_size: int, avg_size: int, max_size: int):
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        bits = max(1, round(math.log2(avg_size - min_size)))
+        self.mask = ((1 << bits) - 1) << (64 - bits)
+
+    def split(self, file: IO) -> Iterator[bytes]:
+        buf = bytearray()
+        eof = False
+        while True:
+            while not eof and len(buf) < self.max_size:
+                data = file.read(self.max_size)
+                if data:
+                    buf += data
+                else:
+                    eof = True
+            if not buf:
+                return
+
+            limit = min(len(buf), self.max_size)
+            end = limit
+            # positions are scanned in blocks, a boundary is usually found early
+            begin = self.min_size - 1
+            while begin < limit:
+                block_end = min(limit, begin + self.avg_size)
+                pos = _find_boundary(buf, begin, block_end, self.mask)
+                if pos >= 0:
+                    end = pos + 1
+                    break
+                begin = block_end
+
+            yield bytes(buf[:end])
+            del buf[:end]
+
+
+class _ChunkReader:
+    """Read a value from its chunks, fetching the next chunks concurrently.
+
+    The reader is seekable. ``fetch`` returns the data of a chunk key.
+    """
+
+    def __init__(self, chunks, fetch, executor, readahead):
+        self._keys = [key for key, _ in chunks]
+        self._offsets = [0]
+        for _, size in chunks:
+            self._offsets.append(self._offsets[-1] + size)
+
+        self._fetch = fetch
+        self._executor = executor
+        self._readahead = readahead
+        self._pos = 0
+        # chunks being fetched, by their number
+        self._pending: Dict[int, object] = {}
+        self._data = b""
+        self._data_no = -1
+
+    def _chunk(self, index: int) -> bytes:
+        if index != self._data_no:
+            for i in range(index, min(index + self._readahead, len(self._keys))):
+                if i not in self._pending:
+                    self._pending[i] = self._executor.submit(self._fetch, self._keys[i])
+            # drop chunks that were skipped
+            for i in [i for i in self._pending if i < index]:
+                self._pending.pop(i).cancel()  # type: ignore
+            self._data = self._pending.pop(index).result()  # type: ignore
+            self._data_no = index
+        return self._data
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        chunks = []
+        total = 0
+        while n < 0 or total < n:
+            index = bisect.bisect_right(self._offsets, self._pos) - 1
+            if index >= len(self._keys):
+                break
+            offset = self._pos - self._offsets[index]
+            buf = self._chunk(index)[offset : offset + n - total if n >= 0 else None]
+            if not buf:
+                break
+            self._pos += len(buf)
+            chunks.append(buf)
+            total += len(buf)
+
+        return b"".join(chunks)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._offsets[-1] + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+
+        if pos < 0:
+            raise OSError("seek would move position outside the file")
+        self._pos = pos
+        return pos
+
+    def close(self):
+        for future in self._pending.values():
+            future.cancel()  # type: ignore
+        self._pending.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ChunkingDecorator(StoreDecorator):
+    """Deduplicating decorator storing values in content-defined chunks.
+
+    Values are split into chunks using a rolling hash (see ``avg_chunk_size``). Every
+    chunk is stored in the decorated store under the key ``chunk_prefix`` followed
+    by the SHA-256 of its data, unless it is already present. A small manifest
+    listing the chunks is stored under the key of the value. Hence, the unchanged
+    parts of a slowly changing value are only stored once, even if data was
+    inserted or removed in between.
+
+    :meth:`open` returns a seekable reader fetching the next chunks concurrently,
+    :meth:`get_many` fetches the chunks of several values concurrently. Chunks are
+    verified against their hash when read.
+
+    Keys starting with ``chunk_prefix`` are reserved for chunks and hidden from
+    :meth:`iter_keys`. Deleting a value only deletes its manifest, chunks no longer
+    referenced by any value are removed by :meth:`collect_garbage`.
+
+    Finding chunk boundaries is considerably faster if the optional dependency
+    ``numpy`` is installed.
+
+    Parameters
+    ----------
+    store : KeyValueStore
+        The store to write manifests and chunks to.
+    avg_chunk_size : int, optional, default = 1024 * 1024
+        Average size of chunks in bytes.
+    min_chunk_size : int, optional, default = avg_chunk_size // 4
+        Minimal size of chunks in bytes, at least 64.
+    max_chunk_size : int, optional, default = avg_chunk_size * 4
+        Maximal size of chunks in bytes.
+    chunk_prefix : str, optional, default = "chunk_"
+        Prefix of the keys of chunks.
+    max_workers : int, optional, default = 8
+        Number of threads reading and writing chunks.
+
+    """
+
+    def __init__(
+        self,
+        store,
+        avg_chunk_size: int = 1024 * 1024,
+        min_chunk_size: Optional[int] = None,
+        max_chunk_size: Optional[int] = None,
+        chunk_prefix: str = "chunk_",
+        max_workers: int = 8,
+    ):
+        super().__init__(store)
+
+        if min_chunk_size is None:
+            min_chunk_size = avg_chunk_size // 4
+        if max_chunk_size is None:
+            max_chunk_size = avg_chunk_size * 4
+        if not _WINDOW <= min_chunk_size < avg_chunk_size <= max_chunk_size:
+            raise ValueError(
+                "Chunk sizes must satisfy "
+                f"{_WINDOW} <= min_chunk_size < avg_chunk_size <= max_chunk_size"
+            )
+
+        self.chunk_prefix = chunk_prefix
+        self.max_workers = max_workers
+        self._chunker = _Chunker(min_chunk_size, avg_chunk_size, max_chunk_size)
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def _chunk_key(self, data: bytes) -> str:
+        return self.chunk_prefix + hashlib.sha256(data).hexdigest()
+
+    def _check_key(self, key: str) -> None:
+        self._dstore._check_valid_key(key)  # type: ignore
+        if key.startswith(self.chunk_prefix):
+            raise ValueError(f"Keys starting with {self.chunk_prefix!r} are reserved")
+
+    def _get_chunk(self, key: str) -> bytes:
+        data = self._dstore.get(key)
+        if self._chunk_key(data) != key:
+            raise OSError(f"Chunk {key} is corrupted")
+        return data
+
+    def _put_chunk(self, key: str, data: bytes) -> None:
+        if key not in self._dstore:
+            self._dstore.put(key, data)
+
+    def _read_manifest(self, key: str) -> List[Tuple[str, int]]:
+        self._check_key(key)
+        data = self._dstore.get(key)
+        if not data.startswith(_MANIFEST_MAGIC):
+            raise OSError(f"Value at {key} is not a chunk manifest")
+        manifest = json.loads(data[len(_MANIFEST_MAGIC) :])
+        if manifest["version"] != _MANIFEST_VERSION:
+            raise OSError(f"Unsupported manifest version {manifest['version']}")
+        return [
+            (self.chunk_prefix + digest, size) for digest, size in manifest["chunks"]
+        ]
+
+    def _write_chunks(self, file: IO) -> bytes:
+        # store the chunks of file and return its manifest
+        chunks = []
+        futures: deque = deque()
+        for data in self._chunker.split(file):
+            key = self._chunk_key(data)
+            chunks.append((key[len(self.chunk_prefix) :], len(data)))
+            futures.append(self._executor.submit(self._put_chunk, key, data))
+            # bound the memory held by chunks waiting to be written
+            while len(futures) > 2 * self.max_workers:
+                futures.popleft().result()
+        for future in futures:
+            future.result()
+
+        manifest = {"version": _MANIFEST_VERSION, "chunks": chunks}
+        return _MANIFEST_MAGIC + json.dumps(manifest).encode("ascii")
+
+    def __contains__(self, key: str) -> bool:  # noqa D
+        return key in self._dstore and not key.startswith(self.chunk_prefix)
+
+    def __iter__(self) -> Iterator[str]:  # noqa D
+        return self.iter_keys()
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:  # noqa D
+        for key in self._dstore.iter_keys(prefix):
+            if not key.startswith(self.chunk_prefix):
+                yield key
+
+    def keys(self, prefix: str = "") -> List[str]:  # noqa D
+        return list(self.iter_keys(prefix))
+
+    def list_page(  # noqa D
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        limit: int = 1000,
+        token: Optional[str] = None,
+    ) -> KeyPage:
+        # pages of chunk keys are passed on empty
+        page = self._dstore.list_page(prefix, start_after, limit, token)
+        return page._replace(
+            keys=[k for k in page.keys if not k.startswith(self.chunk_prefix)]
+        )
+
+    def stat(self, key: str) -> KeyStat:  # noqa D
+        # the size of a value is the sum of its chunk sizes
+        chunks = self._read_manifest(key)
+        stat = self._dstore.stat(key)
+        return stat._replace(size=sum(size for _, size in chunks))
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:  # noqa D
+        for stat in self._dstore.iter_stat(prefix):
+            if stat.key.startswith(self.chunk_prefix):
+                continue
+            try:
+                chunks = self._read_manifest(stat.key)
+            except KeyError:
+                continue
+            yield stat._replace(size=sum(size for _, size in chunks))
+
+    def iter_prefixes(  # noqa D
+        self, delimiter: str, prefix: str = ""
+    ) -> Iterator[str]:
+        dlen = len(delimiter)
+        plen = len(prefix)
+        memory = set()
+
+        for k in self.iter_keys(prefix):
+            pos = k.find(delimiter, plen)
+            if pos >= 0:
+                k = k[: pos + dlen]
+
+            if k not in memory:
+                yield k
+                memory.add(k)
+
+    def get(self, key: str) -> bytes:  # noqa D
+        chunks = self._read_manifest(key)
+        return b"".join(self._executor.map(self._get_chunk, [k for k, _ in chunks]))
+
+    def get_into(self, key: str, buffer) -> int:  # noqa D
+        chunks = self._read_manifest(key)
+        view = _writable_view(buffer)
+        size = sum(size for _, size in chunks)
+        if size > len(view):
+            raise ValueError(f"The value at {key} does not fit into the buffer")
+
+        # copy every chunk into place as soon as it was fetched
+        pos = 0
+        for data in self._executor.map(self._get_chunk, [k for k, _ in chunks]):
+            view[pos : pos + len(data)] = data
+            pos += len(data)
+        return pos
+
+    def get_range(  # noqa D
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> bytes:
+        chunks = self._read_manifest(key)
+        start, end, _ = slice(start, end).indices(sum(size for _, size in chunks))
+
+        # fetch only the chunks overlapping the range
+        needed: List[str] = []
+        offset = pos = 0
+        for chunk_key, size in chunks:
+            if pos + size > start and pos < end:
+                if not needed:
+                    offset = pos
+                needed.append(chunk_key)
+            pos += size
+        data = b"".join(self._executor.map(self._get_chunk, needed))
+        return data[start - offset : max(start, end) - offset]
+
+    def get_ranges(  # noqa D
+        self,
+        key: str,
+        ranges: Iterable[Tuple[int, Optional[int]]],
+        max_gap: int = _MAX_RANGE_GAP,
+        max_workers: Optional[int] = None,
+    ) -> List[bytes]:
+        return _get_ranges_via_get_range(self, key, ranges, max_gap, max_workers)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the data at several keys.
+
+        The chunks of all values are fetched concurrently, chunks shared between the
+        values are only fetched once.
+
+        Parameters
+        ----------
+        keys : iterable of str
+            The keys to be read.
+
+        Returns
+        -------
+        dict
+            The data of every key as ``bytes``.
+
+        Raises
+        ------
+        KeyError
+            If one of the keys was not found.
+        IOError
+            If there was an error accessing the store.
+        """
+        keys = list(keys)
+        manifests = list(self._executor.map(self._read_manifest, keys))
+
+        chunk_keys = list({k for chunks in manifests for k, _ in chunks})
+        data = dict(zip(chunk_keys, self._executor.map(self._get_chunk, chunk_keys)))
+        return {
+            key: b"".join(data[k] for k, _ in chunks)
+            for key, chunks in zip(keys, manifests)
+        }
+
+    def get_file(self, key: str, file: Union[str, IO]) -> str:  # noqa D
+        if isinstance(file, str):
+            with open(file, "wb") as f:
+                return self.get_file(key, f)
+
+        with self.open(key) as source:
+            bufsize = 1024 * 1024
+            while True:
+                buf = source.read(bufsize)
+                file.write(buf)
+                if len(buf) < bufsize:
+                    break
+        return key
+
+    def open(self, key: str) -> IO:  # noqa D
+        return _ChunkReader(  # type: ignore
+            self._read_manifest(key),
+            self._get_chunk,
+            self._executor,
+            self.max_workers,
+        )
+
+    def put(self, key: str, data: bytes, *args, **kwargs) -> str:  # noqa D
+        return self.put_file(key, _buffer_file(_byte_view(data)), *args, **kwargs)
+
+    def put_file(  # noqa D
+        self, key: str, file: Union[str, IO], *args, **kwargs
+    ) -> str:
+        self._check_key(key)
+        if isinstance(file, str):
+            with open(file, "rb") as source:
+                manifest = self._write_chunks(source)
+        else:
+            manifest = self._write_chunks(file)
+        return self._dstore.put(key, manifest, *args, **kwargs)  # type: ignore
+
+    def copy(self, source: str, dest: str) -> str:  # noqa D
+        # only the manifest is copied, the chunks are shared
+        self._check_key(dest)
+        self._read_manifest(source)
+        return self._dstore.put(dest, self._dstore.get(source))  # type: ignore
+
+    def delete(self, key: str, *args, **kwargs):  # noqa D
+        self._check_key(key)
+        return self._dstore.delete(key, *args, **kwargs)
+
+    def collect_garbage(self) -> int:
+        """Delete all chunks that are not referenced by any value.
+
+        Must not run concurrently with writes, as the chunks of a value being
+        written are not referenced until its manifest is stored.
+
+        Returns
+        -------
+        int
+            The number of chunks deleted.
+        """
+        referenced: Set[str] = set()
+        for chunks in self._executor.map(self._read_manifest, self.iter_keys()):
+            referenced.update(k for k, _ in chunks)
+
+        deleted = 0
+        for key in list(self._dstore.iter_keys(self.chunk_prefix)):
+            if key not in referenced:
+                self._dstore.delete(key)
+                deleted += 1
+        return deleted
@@ -0,0 +1,560 @@
+"""
+Transparent compression of values.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.compression import CompressionDecorator
+>>>
+>>> store = CompressionDecorator(DictStore())
+>>> key = store.put('key', b'my_data' * 1000)
+>>> len(store._dstore.get('key')) < 100
+True
+>>> store.get('key') == b'my_data' * 1000
+True
+"""
+
+import hashlib
+import io
+import struct
+import zlib
+from typing import (
+    IO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+from minimalkv._key_value_store import (
+    _MAX_RANGE_GAP,
+    KeyStat,
+    _byte_view,
+    _file_size,
+    _get_into_via_open,
+    _get_range_via_open,
+    _get_ranges_via_get_range,
+    _read_at_most,
+)
+from minimalkv.decorator import StoreDecorator
+
+try:
+    import zstandard
+
+    has_zstandard = True
+except ImportError:
+    has_zstandard = False
+
+try:
+    import lz4.frame
+
+    has_lz4 = True
+except ImportError:
+    has_lz4 = False
+
+#: Values written by :class:`CompressionDecorator` start with this header: magic
+#: bytes, format version, codec id (``0`` for uncompressed values), dictionary id
+#: (``0`` if no dictionary was used) and uncompressed size (``_UNKNOWN_SIZE`` if it
+#: was not known when writing).
+_HEADER = struct.Struct(">4sBBIQ")
+_MAGIC = b"\x89MKZ"
+_VERSION = 1
+_RAW = 0
+_UNKNOWN_SIZE = 2**64 - 1
+
+
+class Codec:
+    """Base class of compression codecs for :class:`CompressionDecorator`.
+
+    A codec provides incremental compression and decompression objects. Subclasses
+    need a unique :attr:`codec_id`, which is stored with every value, and have to be
+    registered using :func:`register_codec` to be readable.
+
+    Parameters
+    ----------
+    level : int, optional
+        Compression level, the codec's default if not given.
+
+    """
+
+    #: Identifier of the codec, stored in the header of compressed values.
+    codec_id: int
+    #: Name of the codec, e.g. for ``wrap=compress(zlib)`` in URLs.
+    name: str
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = level
+
+    def compressobj(self, dictionary: Optional[bytes] = None):
+        """Return an object with ``compress(data)`` and ``flush()`` methods."""
+        raise NotImplementedError
+
+    def decompressobj(self, dictionary: Optional[bytes] = None):
+        """Return an object with a ``decompress(data)`` method."""
+        raise NotImplementedError
+
+    def train_dictionary(self, samples: Iterable[bytes], size: int) -> bytes:
+        """Build a dictionary of ``size`` bytes for compressing data like ``samples``.
+
+        The default uses the end of the concatenated samples, as data at the end of a
+        dictionary is cheapest to reference.
+        """
+        return b"".join(samples)[-size:]
+
+
+class ZlibCodec(Codec):
+    """Compression using :mod:`zlib`."""
+
+    codec_id = 1
+    name = "zlib"
+
+    def compressobj(self, dictionary=None):  # noqa D
+        level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+        if dictionary:
+            return zlib.compressobj(level, zdict=dictionary)
+        return zlib.compressobj(level)
+
+    def decompressobj(self, dictionary=None):  # noqa D
+        if dictionary:
+            return zlib.decompressobj(zdict=dictionary)
+        return zlib.decompressobj()
+
+
+class ZstdCodec(Codec):
+    """Compression using Zstandard, requires the optional dependency ``zstandard``."""
+
+    codec_id = 2
+    name = "zstd"
+
+    def __init__(self, level: Optional[int] = None):
+        if not has_zstandard:
+            raise ImportError("Cannot find optional dependency zstandard.")
+        super().__init__(level)
+
+    def compressobj(self, dictionary=None):  # noqa D
+        return zstandard.ZstdCompressor(
+            level=3 if self.level is None else self.level,
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+        ).compressobj()
+
+    def decompressobj(self, dictionary=None):  # noqa D
+        return zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        ).decompressobj()
+
+    def train_dictionary(self, samples, size):  # noqa D
+        return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+
+class _LZ4CompressObj:
+    def __init__(self, level):
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level)
+        self._begun = False
+
+    def compress(self, data):
+        if not self._begun:
+            self._begun = True
+            return self._compressor.begin() + self._compressor.compress(data)
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self.compress(b"") + self._compressor.flush()
+
+
+class LZ4Codec(Codec):
+    """Compression using LZ4 frames, requires the optional dependency ``lz4``.
+
+    Dictionaries are not supported.
+    """
+
+    codec_id = 3
+    name = "lz4"
+
+    def __init__(self, level: Optional[int] = None):
+        if not has_lz4:
+            raise ImportError("Cannot find optional dependency lz4.")
+        super().__init__(level)
+
+    def compressobj(self, dictionary=None):  # noqa D
+        if dictionary:
+            raise ValueError("The lz4 codec does not support dictionaries")
+        return _LZ4CompressObj(0 if self.level is None else self.level)
+
+    def decompressobj(self, dictionary=None):  # noqa D
+        if dictionary:
+            raise ValueError("The lz4 codec does not support dictionaries")
+        return lz4.frame.LZ4FrameDecompressor()
+
+    def train_dictionary(self, samples, size):  # noqa D
+        raise ValueError("The lz4 codec does not support dictionaries")
+
+
+_CODECS: Dict[int, Type[Codec]] = {}
+
+
+def register_codec(codec: Type[Codec]) -> Type[Codec]:
+    """Register a codec class, making values compressed with it readable.
+
+    Parameters
+    ----------
+    codec : type
+        Subclass of :class:`Codec` with a unique ``codec_id`` and ``name``.
+
+    Returns
+    -------
+    type
+        The codec, so this can be used as a class decorator.
+    """
+    if not 0 < codec.codec_id < 256:
+        raise ValueError(f"Invalid codec id {codec.codec_id}")
+    registered = _CODECS.get(codec.codec_id)
+    if registered is not None and registered is not codec:
+        raise ValueError(f"Codec id {codec.codec_id} is used by {registered.name}")
+    _CODECS[codec.codec_id] = codec
+    return codec
+
+
+for _codec in (ZlibCodec, ZstdCodec, LZ4Codec):
+    register_codec(_codec)
+
+
+def _dictionary_id(dictionary: bytes) -> int:
+    # 0 marks values compressed without a dictionary
+    return int.from_bytes(hashlib.sha256(dictionary).digest()[:4], "big") or 1
+
+
+def _parse_header(header: bytes) -> Optional[Tuple[int, int, int]]:
+    # return codec id, dictionary id and uncompressed size of a value starting with
+    # header, None if the value has no header
+    if len(header) != _HEADER.size:
+        return None
+    magic, version, codec_id, dictionary_id, size = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        return None
+    if version != _VERSION:
+        raise OSError(f"Unsupported compression format version {version}")
+    return codec_id, dictionary_id, size
+
+
+def _size_left(file: IO) -> Optional[int]:
+    # return the number of bytes left in file without reading it, None if unknown
+    try:
+        if not file.seekable():
+            return None
+        start = file.tell()
+        end = file.seek(0, io.SEEK_END)
+        file.seek(start)
+    except (AttributeError, OSError):
+        return None
+    return end - start
+
+
+class _CompressingReader:
+    """Read ``head`` and the rest of ``source`` compressed by ``compressor``.
+
+    The output starts with ``header``.
+    """
+
+    bufsize = 1024 * 1024
+
+    def __init__(self, header, compressor, head, source):
+        self.source = source
+        self._compressor = compressor
+        self._buffer = header + compressor.compress(head)
+        self._eof = False
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        chunks = [self._buffer]
+        size = len(self._buffer)
+        while not self._eof and (n < 0 or size < n):
+            data = self.source.read(self.bufsize)
+            buf = self._compressor.compress(data) if data else b""
+            if not data:
+                buf += self._compressor.flush()
+                self._eof = True
+            chunks.append(buf)
+            size += len(buf)
+
+        data = b"".join(chunks)
+        if n < 0:
+            self._buffer = b""
+            return data
+        self._buffer = data[n:]
+        return data[:n]
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _DecompressingReader:
+    """Read ``source`` decompressed by ``decompressor``.
+
+    If ``decompressor`` is ``None``, ``head`` and ``source`` are read unaltered.
+    """
+
+    bufsize = 64 * 1024
+
+    def __init__(self, decompressor, head, source):
+        self.source = source
+        self._decompressor = decompressor
+        self._head = head
+        self._buffer = b""
+        self._eof = False
+
+    def _read_more(self) -> bytes:
+        data = self._head or self.source.read(self.bufsize)
+        self._head = b""
+        if not data:
+            self._eof = True
+            return b""
+        if self._decompressor is None:
+            return data
+        return self._decompressor.decompress(data)
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        chunks = [self._buffer]
+        size = len(self._buffer)
+        while not self._eof and (n < 0 or size < n):
+            buf = self._read_more()
+            chunks.append(buf)
+            size += len(buf)
+
+        data = b"".join(chunks)
+        if n < 0:
+            self._buffer = b""
+            return data
+        self._buffer = data[n:]
+        return data[:n]
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CompressionDecorator(StoreDecorator):
+    """Decorator compressing values with a pluggable codec.
+
+    Every value is written with a short header naming the codec, so values
+    compressed with different codecs can be read regardless of the codec configured.
+    Values not starting with the header are read unaltered, which allows adding
+    compression to a store with existing data. Values smaller than ``min_size``
+    bytes, or which do not shrink, are stored uncompressed (with the header).
+
+    :meth:`put_file` compresses and :meth:`open` decompresses while streaming,
+    :meth:`get_range` decompresses the value up to the end of the range.
+    :meth:`stat` reports the uncompressed size stored in the header. Only values
+    streamed from unseekable files by :meth:`put_file` are decompressed for it.
+
+    Small values compress considerably better with a dictionary trained on similar
+    data (see :meth:`Codec.train_dictionary`). The first of ``dictionaries`` is
+    used for values of up to ``dictionary_max_size`` bytes. The other ones are only
+    used to read values written with them before, so dictionaries can be replaced.
+
+    The decorator can be added to stores created from URLs by ``wrap=compress`` or
+    e.g. ``wrap=compress(zstd)``.
+
+    Parameters
+    ----------
+    store : KeyValueStore
+        The store to write compressed values to.
+    codec : Codec or str, optional, default = "zlib"
+        The codec used for writing, or the name of a registered codec.
+    min_size : int, optional, default = 256
+        Values smaller than this are stored uncompressed.
+    dictionaries : sequence of bytes, optional
+        Dictionaries for small values, the first one is used for writing.
+    dictionary_max_size : int, optional, default = 64 * 1024
+        Values up to this size are compressed using the dictionary.
+
+    """
+
+    def __init__(
+        self,
+        store,
+        codec: Union[Codec, str] = "zlib",
+        min_size: int = 256,
+        dictionaries: Sequence[bytes] = (),
+        dictionary_max_size: int = 64 * 1024,
+    ):
+        super().__init__(store)
+
+        if isinstance(codec, str):
+            codecs = {c.name: c for c in _CODECS.values()}
+            if codec not in codecs:
+                raise ValueError(f"Unknown codec {codec!r}")
+            codec = codecs[codec]()
+        self.codec = codec
+        self.min_size = min_size
+        self.dictionary_max_size = dictionary_max_size
+        self._dictionaries = {_dictionary_id(d): d for d in dictionaries}
+        self._dictionary = dictionaries[0] if dictionaries else None
+
+    def _header(
+        self, codec_id: int, dictionary: Optional[bytes], size: Optional[int]
+    ) -> bytes:
+        dictionary_id = _dictionary_id(dictionary) if dictionary else 0
+        size = _UNKNOWN_SIZE if size is None else size
+        return _HEADER.pack(_MAGIC, _VERSION, codec_id, dictionary_id, size)
+
+    def _compress(self, data: bytes) -> bytes:
+        if len(data) < self.min_size:
+            return self._header(_RAW, None, len(data)) + data
+
+        dictionary = None
+        if len(data) <= self.dictionary_max_size:
+            dictionary = self._dictionary
+        compressor = self.codec.compressobj(dictionary)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) >= len(data):
+            return self._header(_RAW, None, len(data)) + data
+        return self._header(self.codec.codec_id, dictionary, len(data)) + compressed
+
+    def _decompressor(self, header: bytes):
+        # return the decompressor for a value starting with header, None if the
+        # value is not compressed and False if it has no header
+        parsed = _parse_header(header)
+        if parsed is None:
+            return False
+        codec_id, dictionary_id, _ = parsed
+        if codec_id == _RAW:
+            return None
+
+        if codec_id not in _CODECS:
+            raise OSError(f"Unknown compression codec {codec_id}")
+        codec = self.codec if codec_id == self.codec.codec_id else _CODECS[codec_id]()
+
+        dictionary = None
+        if dictionary_id:
+            if dictionary_id not in self._dictionaries:
+                raise OSError(f"Unknown compression dictionary {dictionary_id}")
+            dictionary = self._dictionaries[dictionary_id]
+        return codec.decompressobj(dictionary)
+
+    def get(self, key: str) -> bytes:  # noqa D
+        data = self._dstore.get(key)
+        decompressor = self._decompressor(data[: _HEADER.size])
+        if decompressor is False:
+            return data
+        if decompressor is None:
+            return data[_HEADER.size :]
+        return decompressor.decompress(memoryview(data)[_HEADER.size :])
+
+    def get_file(self, key: str, file: Union[str, IO]) -> str:  # noqa D
+        if isinstance(file, str):
+            with open(file, "wb") as f:
+                return self.get_file(key, f)
+
+        with self.open(key) as source:
+            bufsize = 1024 * 1024
+            while True:
+                buf = source.read(bufsize)
+                file.write(buf)
+                if len(buf) < bufsize:
+                    break
+        return key
+
+    def open(self, key: str) -> IO:  # noqa D
+        source = self._dstore.open(key)
+        header = source.read(_HEADER.size)
+        decompressor = self._decompressor(header)
+        if decompressor is False:
+            return _DecompressingReader(None, header, source)  # type: ignore
+        return _DecompressingReader(decompressor, b"", source)  # type: ignore
+
+    def get_into(self, key: str, buffer) -> int:  # noqa D
+        return _get_into_via_open(self, key, buffer)
+
+    def get_range(  # noqa D
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> bytes:
+        return _get_range_via_open(self, key, start, end)
+
+    def get_ranges(  # noqa D
+        self,
+        key: str,
+        ranges: Iterable[Tuple[int, Optional[int]]],
+        max_gap: int = _MAX_RANGE_GAP,
+        max_workers: Optional[int] = None,
+    ) -> List[bytes]:
+        return _get_ranges_via_get_range(self, key, ranges, max_gap, max_workers)
+
+    def stat(self, key: str) -> KeyStat:  # noqa D
+        return self._value_stat(self._dstore.stat(key))
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:  # noqa D
+        for stat in self._dstore.iter_stat(prefix):
+            try:
+                yield self._value_stat(stat)
+            except KeyError:
+                pass
+
+    def _value_stat(self, stat: KeyStat) -> KeyStat:
+        parsed = _parse_header(self._dstore.get_range(stat.key, 0, _HEADER.size))
+        if parsed is None:
+            return stat
+        _, _, size = parsed
+        if size != _UNKNOWN_SIZE:
+            return stat._replace(size=size)
+
+        # values streamed from unseekable files have to be decompressed
+        source = self._dstore.open(stat.key)
+        try:
+            decompressor = self._decompressor(source.read(_HEADER.size))
+            reader = _DecompressingReader(decompressor, b"", source)
+            return stat._replace(size=_file_size(reader))  # type: ignore
+        finally:
+            source.close()
+
+    def put(self, key: str, data: bytes, *args, **kwargs) -> str:  # noqa D
+        return self._dstore.put(  # type: ignore
+            key, self._compress(_byte_view(data)), *args, **kwargs
+        )
+
+    def put_file(  # noqa D
+        self, key: str, file: Union[str, IO], *args, **kwargs
+    ) -> str:
+        if isinstance(file, str):
+            with open(file, "rb") as source:
+                return self.put_file(key, source, *args, **kwargs)
+
+        # small values are compressed at once, possibly using the dictionary
+        head = _read_at_most(file, max(self.min_size, self.dictionary_max_size + 1))
+        if len(head) <= self.dictionary_max_size or len(head) < self.min_size:
+            return self._dstore.put(  # type: ignore
+                key, self._compress(head), *args, **kwargs
+            )
+
+        size = _size_left(file)
+        if size is not None:
+            size += len(head)
+        compressor = self.codec.compressobj()
+        reader = _CompressingReader(
+            self._header(self.codec.codec_id, None, size), compressor, head, file
+        )
+        return self._dstore.put_file(  # type: ignore
+            key, cast(IO, reader), *args, **kwargs
+        )
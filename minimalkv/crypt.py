@@ -2,11 +2,32 @@
 
 import hashlib
 import hmac
+import io
 import os
-import tempfile
-
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+from minimalkv._key_value_store import (
+    _MAX_RANGE_GAP,
+    _buffer_file,
+    _byte_view,
+    _get_into_via_open,
+    _get_range_via_open,
+    _get_ranges_via_get_range,
+    _writable_view,
+)
 from minimalkv.decorator import StoreDecorator
 
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+    has_cryptography = True
+except ImportError:
+    has_cryptography = False
+
 
 class _HMACFileReader:
     def __init__(self, hm, source):
@@ -26,14 +47,17 @@ class _HMACFileReader:
 
         new_read = self.source.read(n) if n is not None else self.source.read()
         finished = n is None or len(new_read) != n
-        self.buffer += new_read
 
-        if n is not None:
-            offset = min(n, len(self.buffer) - self.hm.digest_size)
+        # the buffer always holds the last digest_size bytes read, which are held
+        # back as they might be the hash
+        digest_size = self.hm.digest_size
+        if len(new_read) >= digest_size:
+            view = memoryview(new_read)
+            rv = b"".join((self.buffer, view[:-digest_size]))
+            self.buffer = bytes(view[-digest_size:])
         else:
-            offset = len(self.buffer) - self.hm.digest_size
-
-        rv, self.buffer = self.buffer[:offset], self.buffer[offset:]
+            combined = self.buffer + new_read
+            rv, self.buffer = combined[: len(new_read)], combined[len(new_read) :]
 
         # update hmac
         self.hm.update(rv)
@@ -55,6 +79,591 @@ class _HMACFileReader:
         self.close()
 
 
+class _HMACSigningReader:
+    """Read data from ``source`` with its HMAC appended.
+
+    The HMAC is updated while the data is read, so the signed value can be handed to
+    any ``put_file`` implementation without a temporary copy. If ``source`` is
+    seekable, so is the reader; seeking backwards restarts hashing from the beginning
+    of the data.
+    """
+
+    bufsize = 1024 * 1024
+
+    def __init__(self, hm, source):
+        self._initial_hm = hm.copy()
+        self.hm = hm
+        self.source = source
+
+        # number of bytes of data that were hashed and the position of the reader
+        self._hashed = 0
+        self._pos = 0
+
+        try:
+            self._start = source.tell()
+            self._size = source.seek(0, io.SEEK_END) - self._start
+            source.seek(self._start)
+        except (AttributeError, OSError, ValueError):
+            self._size = None
+
+    def _restart(self):
+        self.source.seek(self._start)
+        self.hm = self._initial_hm.copy()
+        self._hashed = 0
+
+    def _read_data(self, n):
+        # read and hash up to n bytes (all if n is negative), b"" at the end of data
+        if self._size is not None:
+            left = self._size - self._hashed
+            n = left if n < 0 else min(n, left)
+            if n == 0:
+                return b""
+
+        buf = self.source.read(n)
+        if not buf and self._size is not None:
+            raise OSError("Source is shorter than expected")
+        self.hm.update(buf)
+        self._hashed += len(buf)
+        return buf
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        if self._pos < self._hashed:
+            self._restart()
+        # skip data that was seeked over, it needs to be hashed nonetheless
+        while self._hashed < self._pos and self._read_data(
+            min(self.bufsize, self._pos - self._hashed)
+        ):
+            pass
+
+        chunks = []
+        total = 0
+        while n < 0 or total < n:
+            if self._pos == self._hashed:
+                buf = self._read_data(n - total if n >= 0 else -1)
+                if buf:
+                    self._pos += len(buf)
+                    chunks.append(buf)
+                    total += len(buf)
+                    continue
+                # end of data, the size is known now
+                self._size = self._hashed
+
+            offset = self._pos - self._hashed
+            end = offset + (n - total) if n >= 0 else None
+            buf = self.hm.digest()[offset:end]
+            if not buf:
+                break
+            self._pos += len(buf)
+            chunks.append(buf)
+            total += len(buf)
+
+        return b"".join(chunks)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._size is not None
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._size is None:
+            raise io.UnsupportedOperation("Source is not seekable")
+
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + self.hm.digest_size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+
+        if pos < 0:
+            raise OSError("seek would move position outside the file")
+        # data is only read (and hashed) on the next read
+        self._pos = pos
+        return pos
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+#: Values in the chunked HMAC format start with this header: magic bytes, format
+#: version and chunk size.
+_CHUNKED_HEADER = struct.Struct(">7sBI")
+_CHUNKED_MAGIC = b"MKVHMAC"
+_CHUNKED_VERSION = 1
+
+
+def _read_exactly(source, n):
+    # read n bytes, fewer only if the end of source is reached
+    chunks = []
+    while n > 0:
+        buf = source.read(n)
+        if not buf:
+            break
+        chunks.append(buf)
+        n -= len(buf)
+    return b"".join(chunks)
+
+
+def _read_header(source, header_struct, magic, version):
+    # read and check a header starting with magic bytes and the format version
+    header = _read_exactly(source, header_struct.size)
+    if len(header) != header_struct.size:
+        raise VerificationException("Source does not contain a header (too small)")
+    fields = header_struct.unpack(header)
+    if fields[0] != magic:
+        raise VerificationException(f"Source is not in the {magic!r} format")
+    if fields[1] != version:
+        raise VerificationException(
+            f"Unsupported version {fields[1]} of the {magic!r} format"
+        )
+    return header, fields
+
+
+def _unsealed_size(stored_size, chunk_size, overhead):
+    # return the number of chunks and the size of the data sealed in stored_size
+    # bytes following the header
+    if not chunk_size:
+        raise VerificationException("Invalid chunk size 0")
+    frame_size = chunk_size + overhead
+    chunks = -(-stored_size // frame_size)
+    last_size = stored_size - (chunks - 1) * frame_size
+    if not chunks or last_size < overhead:
+        raise VerificationException("Source is too small")
+    return chunks, stored_size - chunks * overhead
+
+
+def _chunk_digest(hm, header, index, final, data):
+    # the MAC of a chunk covers the header, its position and whether it is the last
+    # chunk, so chunks cannot be reordered, mixed between values or cut off
+    hm = hm.copy()
+    hm.update(header)
+    hm.update(struct.pack(">QB", index, final))
+    hm.update(data)
+    return hm.digest()
+
+
+class _ChunkSealingReader:
+    """Read data from ``source`` split into individually sealed chunks.
+
+    The output is ``header`` followed by the data in chunks of ``chunk_size`` bytes,
+    each of them passed through :meth:`_seal`, which adds ``overhead`` bytes. If
+    ``source`` is seekable, so is the reader and only the chunks that are read are
+    fetched from ``source``. Up to ``batch`` chunks are sealed at once using
+    ``map_``, which may run them in parallel.
+    """
+
+    def __init__(self, header, chunk_size, overhead, source, map_=map, batch=1):
+        self.header = header
+        self.chunk_size = chunk_size
+        self.source = source
+
+        self._map = map_
+        self._batch = batch
+        self._frame_size = chunk_size + overhead
+        self._pos = 0
+        # the sealed chunks of the last batch by their number
+        self._frames = {}
+        # data read ahead from an unseekable source to detect its last chunk
+        self._lookahead = b""
+
+        try:
+            self._start = source.tell()
+            size = source.seek(0, io.SEEK_END) - self._start
+            source.seek(self._start)
+        except (AttributeError, OSError, ValueError):
+            # the number of chunks is known once the last one was read
+            self._chunks = None
+            self._size = None
+        else:
+            # empty data is stored as a single empty chunk
+            self._chunks = max(1, -(-size // chunk_size))
+            self._size = len(header) + size + self._chunks * overhead
+
+    def _seal(self, index, final, data):
+        raise NotImplementedError
+
+    def _load_frames(self, first, count):
+        if self._chunks is not None:
+            count = min(count, self._chunks - first)
+        count = max(1, min(count, self._batch))
+
+        indices, finals, datas = [], [], []
+        if self._size is not None:
+            self.source.seek(self._start + first * self.chunk_size)
+            for index in range(first, first + count):
+                data = _read_exactly(self.source, self.chunk_size)
+                final = index == self._chunks - 1
+                if not final and len(data) != self.chunk_size:
+                    raise OSError("Source is shorter than expected")
+                indices.append(index)
+                finals.append(final)
+                datas.append(data)
+        else:
+            # without seeking, chunks are read in order
+            for index in range(first, first + count):
+                data = self._lookahead + _read_exactly(
+                    self.source, self.chunk_size + 1 - len(self._lookahead)
+                )
+                data, self._lookahead = (
+                    data[: self.chunk_size],
+                    data[self.chunk_size :],
+                )
+                final = not self._lookahead
+                indices.append(index)
+                finals.append(final)
+                datas.append(data)
+                if final:
+                    self._chunks = index + 1
+                    break
+
+        self._frames = dict(zip(indices, self._map(self._seal, indices, finals, datas)))
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        chunks = []
+        total = 0
+        while n < 0 or total < n:
+            if self._pos < len(self.header):
+                source, offset = self.header, self._pos
+            else:
+                index, offset = divmod(self._pos - len(self.header), self._frame_size)
+                if self._chunks is not None and index >= self._chunks:
+                    break
+                if index not in self._frames:
+                    count = (
+                        -(-(offset + n - total) // self._frame_size)
+                        if n >= 0
+                        else self._batch
+                    )
+                    self._load_frames(index, count)
+                source = self._frames[index]
+
+            buf = source[offset : offset + n - total if n >= 0 else None]
+            if not buf:
+                break
+            self._pos += len(buf)
+            chunks.append(buf)
+            total += len(buf)
+
+        return b"".join(chunks)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._size is not None
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._size is None:
+            raise io.UnsupportedOperation("Source is not seekable")
+
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+
+        if pos < 0:
+            raise OSError("seek would move position outside the file")
+        self._pos = pos
+        return pos
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ChunkOpeningReader:
+    """Read the data sealed by a :class:`_ChunkSealingReader` from ``source``.
+
+    ``source`` has to be positioned after the header. If it is seekable, so is the
+    reader. Only the chunks that are read are fetched from ``source`` and opened by
+    :meth:`_unseal`, up to ``batch`` of them at once using ``map_``. The size of the
+    value is authenticated by the last chunk, which is opened once it is read or the
+    reader seeks relative to the end.
+    """
+
+    def __init__(self, header, chunk_size, overhead, source, map_=map, batch=1):
+        if not chunk_size:
+            raise VerificationException("Invalid chunk size 0")
+
+        self.header = header
+        self.chunk_size = chunk_size
+        self.source = source
+
+        self._map = map_
+        self._batch = batch
+        self._overhead = overhead
+        self._frame_size = chunk_size + overhead
+        self._pos = 0
+        # the opened chunks of the last batch by their number
+        self._data = {}
+        self._size_verified = False
+        # data read ahead from an unseekable source to detect its last chunk
+        self._lookahead = b""
+
+        try:
+            self._start = source.tell()
+            stored_size = source.seek(0, io.SEEK_END) - self._start
+        except (AttributeError, OSError, ValueError):
+            # the number of chunks is known once the last one was read
+            self._chunks = None
+            self._size = None
+        else:
+            self._chunks, self._size = _unsealed_size(stored_size, chunk_size, overhead)
+
+    def _unseal(self, index, final, frame):
+        raise NotImplementedError
+
+    def _load_chunks(self, first, count):
+        if self._chunks is not None:
+            count = min(count, self._chunks - first)
+        count = max(1, min(count, self._batch))
+
+        indices, finals, frames = [], [], []
+        if self._size is not None:
+            self.source.seek(self._start + first * self._frame_size)
+            for index in range(first, first + count):
+                indices.append(index)
+                finals.append(index == self._chunks - 1)
+                frames.append(_read_exactly(self.source, self._frame_size))
+        else:
+            # without seeking, chunks are read in order
+            for index in range(first, first + count):
+                frame = self._lookahead + _read_exactly(
+                    self.source, self._frame_size + 1 - len(self._lookahead)
+                )
+                frame, self._lookahead = (
+                    frame[: self._frame_size],
+                    frame[self._frame_size :],
+                )
+                final = not self._lookahead
+                indices.append(index)
+                finals.append(final)
+                frames.append(frame)
+                if final:
+                    self._chunks = index + 1
+                    break
+
+        for frame in frames:
+            if len(frame) < self._overhead:
+                raise VerificationException("Source is too small")
+
+        self._data = dict(
+            zip(indices, self._map(self._unseal, indices, finals, frames))
+        )
+        self._size_verified = self._size_verified or finals[-1]
+
+    def read(self, n=-1):
+        if n is None:
+            n = -1
+
+        chunks = []
+        total = 0
+        while n < 0 or total < n:
+            index, offset = divmod(self._pos, self.chunk_size)
+            if self._chunks is not None and index >= self._chunks:
+                break
+            if index not in self._data:
+                count = (
+                    -(-(offset + n - total) // self.chunk_size)
+                    if n >= 0
+                    else self._batch
+                )
+                self._load_chunks(index, count)
+
+            buf = self._data[index][offset : offset + n - total if n >= 0 else None]
+            if not buf:
+                break
+            self._pos += len(buf)
+            chunks.append(buf)
+            total += len(buf)
+
+        return b"".join(chunks)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self._size is not None
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._size is None:
+            raise io.UnsupportedOperation("Source is not seekable")
+
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            if not self._size_verified:
+                if self._chunks is None:
+                    # the number of chunks is known whenever the size is
+                    raise io.UnsupportedOperation("Number of chunks is unknown")
+                self._load_chunks(self._chunks - 1, 1)
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+
+        if pos < 0:
+            raise OSError("seek would move position outside the file")
+        self._pos = pos
+        return pos
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _ChunkedHMACSigningReader(_ChunkSealingReader):
+    """Read data from ``source`` in the chunked HMAC format.
+
+    Every chunk is followed by its HMAC.
+    """
+
+    def __init__(self, hm, chunk_size, source):
+        self.hm = hm
+        super().__init__(
+            _CHUNKED_HEADER.pack(_CHUNKED_MAGIC, _CHUNKED_VERSION, chunk_size),
+            chunk_size,
+            hm.digest_size,
+            source,
+        )
+
+    def _seal(self, index, final, data):
+        return data + _chunk_digest(self.hm, self.header, index, final, data)
+
+
+class _ChunkedHMACFileReader(_ChunkOpeningReader):
+    """Verify and read a value in the chunked HMAC format from ``source``."""
+
+    def __init__(self, hm, source):
+        self.hm = hm
+        header, (_, _, chunk_size) = _read_header(
+            source, _CHUNKED_HEADER, _CHUNKED_MAGIC, _CHUNKED_VERSION
+        )
+        super().__init__(header, chunk_size, hm.digest_size, source)
+
+    def _unseal(self, index, final, frame):
+        data, digest = frame[: -self._overhead], frame[-self._overhead :]
+        if not hmac.compare_digest(
+            digest, _chunk_digest(self.hm, self.header, index, final, data)
+        ):
+            raise VerificationException(f"HMAC verification of chunk {index} failed.")
+        return data
+
+
+#: Encrypted values start with this header: magic bytes, format version, algorithm,
+#: chunk size and the salt used to derive the key of the value.
+_ENCRYPTED_HEADER = struct.Struct(">7sBBI16s")
+_ENCRYPTED_MAGIC = b"MKVAEAD"
+_ENCRYPTED_VERSION = 1
+_AEAD_ALGORITHMS = {"aes-gcm": 1, "chacha20-poly1305": 2}
+_AEAD_TAG_SIZE = 16
+
+
+def _aead_nonce(index, final):
+    # nonces only have to be unique per derived key, i.e. per value
+    return index.to_bytes(11, "big") + bytes((final,))
+
+
+class _EncryptingReader(_ChunkSealingReader):
+    """Read data from ``source`` encrypted in chunks with ``aead``."""
+
+    def __init__(self, aead, header, chunk_size, source, map_=map, batch=1):
+        self.aead = aead
+        super().__init__(header, chunk_size, _AEAD_TAG_SIZE, source, map_, batch)
+
+    def _seal(self, index, final, data):
+        return self.aead.encrypt(_aead_nonce(index, final), data, self.header)
+
+
+class _DecryptingReader(_ChunkOpeningReader):
+    """Decrypt and read a value encrypted by :class:`_EncryptingReader`."""
+
+    def __init__(self, aead, header, chunk_size, source, map_=map, batch=1):
+        self.aead = aead
+        super().__init__(header, chunk_size, _AEAD_TAG_SIZE, source, map_, batch)
+
+    def _unseal(self, index, final, frame):
+        try:
+            return self.aead.decrypt(_aead_nonce(index, final), frame, self.header)
+        except InvalidTag:
+            raise VerificationException(f"Decryption of chunk {index} failed.")
+
+
+def _get_file_via_open(store, key, file):
+    # copy the value of key to file, verifying it by reading it through open
+    if isinstance(file, str):
+        try:
+            f = open(file, "wb")
+        except OSError as e:
+            raise OSError(f"Error opening {file} for writing: {e!r}")
+
+        # file is open, now we call ourself again with a proper file
+        try:
+            _get_file_via_open(store, key, f)
+        finally:
+            f.close()
+    else:
+        with store.open(key) as source:
+            bufsize = 1024 * 1024
+
+            # copy
+            while True:
+                buf = source.read(bufsize)
+                file.write(buf)
+
+                if len(buf) != bufsize:
+                    break
+
+
+def _read_stored_header(store, key, header_struct, magic, version):
+    # read and check the header of the value stored at key without reading the rest
+    return _read_header(
+        io.BytesIO(store.get_range(key, 0, header_struct.size)),
+        header_struct,
+        magic,
+        version,
+    )
+
+
 class VerificationException(Exception):
     """Exception thrown if there was an error checking authenticity."""
 
@@ -86,13 +695,28 @@ class HMACDecorator(StoreDecorator):
     can alter any data. The key used to store data is also used to extend the
     HMAC secret key, making it impossible to copy a valid message over to a
     different key.
+
+    If ``chunk_size`` is given, values are stored in a versioned, chunked format
+    instead: a short header is followed by the data in chunks of ``chunk_size``
+    bytes, each of them followed by its own HMAC. The HMAC of a chunk also covers
+    its position and whether it is the last one. :meth:`.KeyValueStore.open` then
+    returns a seekable reader (if the decorated store's is seekable) that only
+    reads and verifies the chunks actually accessed, so ranged reads of large
+    values do not need to read the whole value. Values in the two formats cannot
+    be read by a decorator configured for the other one.
     """
 
-    def __init__(self, secret_key, decorated_store, hashfunc=hashlib.sha256):
+    def __init__(
+        self, secret_key, decorated_store, hashfunc=hashlib.sha256, chunk_size=None
+    ):
         super().__init__(decorated_store)
 
+        if chunk_size is not None and not 0 < chunk_size < 2**32:
+            raise ValueError(f"Invalid chunk size {chunk_size}")
+
         self.__hashfunc = hashfunc
         self.__secret_key = bytes(secret_key)
+        self.chunk_size = chunk_size
 
     def __new_hmac(self, key, msg=None):
         # TODO: Comment / Docstring to describe function
@@ -108,12 +732,25 @@ class HMACDecorator(StoreDecorator):
 
         return hm
 
+    def __signing_reader(self, key, source):
+        if self.chunk_size is not None:
+            return _ChunkedHMACSigningReader(
+                self.__new_hmac(key), self.chunk_size, source
+            )
+        return _HMACSigningReader(self.__new_hmac(key), source)
+
     def get(self, key):  # noqa D
-        buf = self._dstore.get(key)
+        if self.chunk_size is not None:
+            reader = _ChunkedHMACFileReader(
+                self.__new_hmac(key), io.BytesIO(self._dstore.get(key))
+            )
+            return reader.read()
+
+        buf = memoryview(self._dstore.get(key))
         hm = self.__new_hmac(key)
         hash = buf[-hm.digest_size :]
 
-        # shorten buf
+        # shorten buf, slicing the memoryview does not copy the data
         buf = buf[: -hm.digest_size]
 
         hm.update(buf)
@@ -121,81 +758,254 @@ class HMACDecorator(StoreDecorator):
         if not hm.digest() == hash:
             raise VerificationException("Invalid hash on key %r" % key)
 
-        return buf
+        return buf.tobytes()
 
     def get_file(self, key, file):  # noqa D
-        if isinstance(file, str):
-            try:
-                f = open(file, "wb")
-            except OSError as e:
-                raise OSError(f"Error opening {file} for writing: {e!r}")
-
-            # file is open, now we call ourself again with a proper file
-            try:
-                self.get_file(key, f)
-            finally:
-                f.close()
-        else:
-            # need to use open, no way around it it seems
-            # this will check the HMAC as well
-            source = self.open(key)
-
-            bufsize = 1024 * 1024
-
-            # copy
-            while True:
-                buf = source.read(bufsize)
-                file.write(buf)
-
-                if len(buf) != bufsize:
-                    break
+        # need to use open, no way around it it seems
+        # this will check the HMAC as well
+        return _get_file_via_open(self, key, file)
 
     def open(self, key):  # noqa D
         source = self._dstore.open(key)
+        if self.chunk_size is not None:
+            return _ChunkedHMACFileReader(self.__new_hmac(key), source)
         return _HMACFileReader(self.__new_hmac(key), source)
 
+    def get_into(self, key, buffer):  # noqa D
+        if self.chunk_size is None:
+            # the HMAC covers the whole value
+            data = self.get(key)
+            view = _writable_view(buffer)
+            if len(data) > len(view):
+                raise ValueError(f"The value at {key} does not fit into the buffer")
+            view[: len(data)] = data
+            return len(data)
+        return _get_into_via_open(self, key, buffer)
+
+    def get_range(self, key, start=0, end=None):  # noqa D
+        if self.chunk_size is None:
+            # the HMAC covers the whole value
+            return self.get(key)[start:end]
+        return _get_range_via_open(self, key, start, end)
+
+    def get_ranges(  # noqa D
+        self, key, ranges, max_gap=_MAX_RANGE_GAP, max_workers=None
+    ):
+        if self.chunk_size is None:
+            data = self.get(key)
+            return [data[start:end] for start, end in ranges]
+        return _get_ranges_via_get_range(self, key, ranges, max_gap, max_workers)
+
+    def stat(self, key):  # noqa D
+        return self.__value_stat(self._dstore.stat(key))
+
+    def iter_stat(self, prefix=""):  # noqa D
+        for stat in self._dstore.iter_stat(prefix):
+            try:
+                yield self.__value_stat(stat)
+            except KeyError:
+                pass
+
+    def __value_stat(self, stat):
+        # the value is followed by its HMAC, or each of its chunks is
+        digest_size = self.__new_hmac(stat.key).digest_size
+        if self.chunk_size is None:
+            return stat._replace(size=stat.size - digest_size)
+        header, (_, _, chunk_size) = _read_stored_header(
+            self._dstore, stat.key, _CHUNKED_HEADER, _CHUNKED_MAGIC, _CHUNKED_VERSION
+        )
+        _, size = _unsealed_size(stat.size - len(header), chunk_size, digest_size)
+        return stat._replace(size=size)
+
     def put(self, key, value, *args, **kwargs):  # noqa D
+        value = _byte_view(value)
+        if self.chunk_size is not None:
+            data = self.__signing_reader(key, _buffer_file(value)).read()
+            return self._dstore.put(key, data, *args, **kwargs)  # type: ignore
+
         # just append hmac and put
-        data = value + self.__new_hmac(key, value).digest()
+        data = b"".join((value, self.__new_hmac(key, value).digest()))
         return self._dstore.put(key, data, *args, **kwargs)  # type: ignore
 
     def copy(self, source, dest):  # noqa D
         raise NotImplementedError
 
-    def put_file(self, key, file, *args, **kwargs):  # noqa D
-        hm = self.__new_hmac(key)
-        bufsize = 1024 * 1024
+    def move(self, source, dest):  # noqa D
+        raise NotImplementedError
 
+    def put_file(self, key, file, *args, **kwargs):  # noqa D
+        # the hmac is computed while the decorated store reads the data
         if isinstance(file, str):
-            # we read the file once, then write the hash at the end, before
-            # handing it over to the original backend
-            with open(file, "rb+") as source:
-                while True:
-                    buf = source.read(bufsize)
-                    hm.update(buf)
+            with open(file, "rb") as source:
+                return self._dstore.put_file(  # type: ignore
+                    key, self.__signing_reader(key, source), *args, **kwargs
+                )
+        return self._dstore.put_file(  # type: ignore
+            key, self.__signing_reader(key, file), *args, **kwargs
+        )
+
 
-                    if len(buf) < bufsize:
-                        break
+class EncryptionDecorator(StoreDecorator):
+    """Authenticated encryption decorator.
+
+    Values are encrypted in chunks of ``chunk_size`` bytes with an AEAD cipher,
+    either AES-GCM or ChaCha20-Poly1305. The key of every value is derived from
+    ``secret_key``, a random salt stored in the header of the value and the key the
+    value is stored under, so values cannot be copied to a different key. The
+    position of a chunk and whether it is the last one are part of its nonce, hence
+    chunks cannot be reordered and truncated values are detected.
+
+    :meth:`.KeyValueStore.put_file` and :meth:`.KeyValueStore.open` stream the data
+    and only keep a few chunks in memory. The reader returned by
+    :meth:`.KeyValueStore.open` is seekable if the decorated store's is, and only
+    reads and decrypts the chunks accessed. If ``max_workers`` is given, chunks
+    spanned by large reads are encrypted and decrypted in parallel on a thread
+    pool. Any chunk failing authentication raises a :class:`VerificationException`.
+
+    Requires the optional dependency ``cryptography``.
+
+    Parameters
+    ----------
+    secret_key : bytes
+        The secret key, should be at least 32 random bytes.
+    decorated_store : KeyValueStore
+        The store to write the encrypted values to.
+    algorithm : str, optional, default = "aes-gcm"
+        The AEAD cipher, ``"aes-gcm"`` or ``"chacha20-poly1305"``. Values written
+        with either one can be read regardless of this setting.
+    chunk_size : int, optional, default = 64 * 1024
+        Size of the encrypted chunks in bytes.
+    max_workers : int, optional
+        Number of threads used to encrypt and decrypt chunks. Chunks are processed
+        in the calling thread if not given.
+    """
 
-                # file has been read, append hash
-                source.write(hm.digest())
+    def __init__(
+        self,
+        secret_key,
+        decorated_store,
+        algorithm="aes-gcm",
+        chunk_size=64 * 1024,
+        max_workers=None,
+    ):
+        if not has_cryptography:
+            raise ImportError("Cannot find optional dependency cryptography.")
+        if algorithm not in _AEAD_ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}")
+        if not 0 < chunk_size < 2**32:
+            raise ValueError(f"Invalid chunk size {chunk_size}")
 
-            # after the file has been closed, hand it over
-            return self._dstore.put_file(key, file, *args, **kwargs)  # type: ignore
-        else:
-            tmpfile = tempfile.NamedTemporaryFile(delete=False)
+        super().__init__(decorated_store)
+
+        self.__secret_key = bytes(secret_key)
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.__executor = ThreadPoolExecutor(max_workers) if max_workers else None
+
+    def __parallel(self):
+        if self.__executor is None:
+            return {}
+        return {"map_": self.__executor.map, "batch": self.max_workers}
+
+    def __new_aead(self, key, algorithm_id, salt):
+        derived_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            info=key.encode("utf-8"),
+        ).derive(self.__secret_key)
+        if algorithm_id == _AEAD_ALGORITHMS["aes-gcm"]:
+            return AESGCM(derived_key)
+        if algorithm_id == _AEAD_ALGORITHMS["chacha20-poly1305"]:
+            return ChaCha20Poly1305(derived_key)
+        raise VerificationException(f"Unknown algorithm {algorithm_id}")
+
+    def __encrypting_reader(self, key, source):
+        algorithm_id = _AEAD_ALGORITHMS[self.algorithm]
+        salt = os.urandom(16)
+        header = _ENCRYPTED_HEADER.pack(
+            _ENCRYPTED_MAGIC, _ENCRYPTED_VERSION, algorithm_id, self.chunk_size, salt
+        )
+        return _EncryptingReader(
+            self.__new_aead(key, algorithm_id, salt),
+            header,
+            self.chunk_size,
+            source,
+            **self.__parallel(),
+        )
+
+    def __decrypting_reader(self, key, source):
+        header, (_, _, algorithm_id, chunk_size, salt) = _read_header(
+            source, _ENCRYPTED_HEADER, _ENCRYPTED_MAGIC, _ENCRYPTED_VERSION
+        )
+        return _DecryptingReader(
+            self.__new_aead(key, algorithm_id, salt),
+            header,
+            chunk_size,
+            source,
+            **self.__parallel(),
+        )
+
+    def get(self, key):  # noqa D
+        return self.__decrypting_reader(key, io.BytesIO(self._dstore.get(key))).read()
+
+    def get_file(self, key, file):  # noqa D
+        return _get_file_via_open(self, key, file)
+
+    def open(self, key):  # noqa D
+        return self.__decrypting_reader(key, self._dstore.open(key))
+
+    def get_into(self, key, buffer):  # noqa D
+        return _get_into_via_open(self, key, buffer)
+
+    def get_range(self, key, start=0, end=None):  # noqa D
+        return _get_range_via_open(self, key, start, end)
+
+    def get_ranges(  # noqa D
+        self, key, ranges, max_gap=_MAX_RANGE_GAP, max_workers=None
+    ):
+        return _get_ranges_via_get_range(self, key, ranges, max_gap, max_workers)
+
+    def stat(self, key):  # noqa D
+        return self.__value_stat(self._dstore.stat(key))
+
+    def iter_stat(self, prefix=""):  # noqa D
+        for stat in self._dstore.iter_stat(prefix):
             try:
-                while True:
-                    buf = file.read(bufsize)
-                    hm.update(buf)
-                    tmpfile.write(buf)
+                yield self.__value_stat(stat)
+            except KeyError:
+                pass
+
+    def __value_stat(self, stat):
+        # the size is derived from the stored size without decrypting the value
+        header, (_, _, _, chunk_size, _) = _read_stored_header(
+            self._dstore,
+            stat.key,
+            _ENCRYPTED_HEADER,
+            _ENCRYPTED_MAGIC,
+            _ENCRYPTED_VERSION,
+        )
+        _, size = _unsealed_size(stat.size - len(header), chunk_size, _AEAD_TAG_SIZE)
+        return stat._replace(size=size)
 
-                    if len(buf) < bufsize:
-                        break
+    def put(self, key, value, *args, **kwargs):  # noqa D
+        data = self.__encrypting_reader(key, _buffer_file(_byte_view(value))).read()
+        return self._dstore.put(key, data, *args, **kwargs)  # type: ignore
 
-                tmpfile.write(hm.digest())
-                tmpfile.close()
+    def put_file(self, key, file, *args, **kwargs):  # noqa D
+        # the data is encrypted while the decorated store reads it
+        if isinstance(file, str):
+            with open(file, "rb") as source:
+                return self._dstore.put_file(  # type: ignore
+                    key, self.__encrypting_reader(key, source), *args, **kwargs
+                )
+        return self._dstore.put_file(  # type: ignore
+            key, self.__encrypting_reader(key, file), *args, **kwargs
+        )
 
-                return self._dstore.put_file(key, tmpfile.name, *args, **kwargs)  # type: ignore
-            finally:
-                os.unlink(tmpfile.name)
+    def copy(self, source, dest):  # noqa D
+        raise NotImplementedError
+
+    def move(self, source, dest):  # noqa D
+        raise NotImplementedError
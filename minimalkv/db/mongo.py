@@ -1,54 +1,239 @@
 import pickle
 import re
+import uuid
+from datetime import timezone
 from io import BytesIO
-from typing import IO, Iterator
+from typing import IO, Any, Dict, Iterator, Optional
 
+import gridfs
 from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
 
-from minimalkv._key_value_store import KeyValueStore
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    _buffer_file,
+    _key_page,
+    _read_at_most,
+)
+from minimalkv._mixins import CopyMixin
 
+#: Values larger than this are stored in GridFS by default. MongoDB limits documents
+#: to 16 MiB, some headroom is left for the pickle framing and the document itself.
+DEFAULT_GRIDFS_THRESHOLD = 15 * 1024 * 1024
 
-class MongoStore(KeyValueStore):
+
+class MongoStore(KeyValueStore, CopyMixin):
     """Uses a MongoDB collection as the backend, using pickle as a serializer.
 
+    Values larger than ``gridfs_threshold`` bytes are not stored inside the document
+    but in a GridFS bucket named after the collection (i.e. in the ``<collection>.files``
+    and ``<collection>.chunks`` collections). The document then only references the
+    GridFS file. Such values are uploaded in chunks by :meth:`put_file` and
+    :meth:`open` returns a streaming :class:`gridfs.grid_file.GridOut`.
+
+    Every write sets a random ETag in the document, which conditional writes and
+    deletes compare atomically with ``find_one_and_update`` and ``find_one_and_delete``.
+
     Parameters
     ----------
     db :
         An authenticated pymongo database.
     collection : str
         A MongoDB collection name.
+    gridfs_threshold : int or None, optional, default = DEFAULT_GRIDFS_THRESHOLD
+        Size in bytes above which values are stored in GridFS. ``None`` disables GridFS.
+    chunk_size : int, optional, default = 255 * 1024
+        Chunk size used for GridFS files.
 
     """
 
-    def __init__(self, db, collection):
+    def __init__(
+        self,
+        db,
+        collection,
+        gridfs_threshold: Optional[int] = DEFAULT_GRIDFS_THRESHOLD,
+        chunk_size: int = gridfs.DEFAULT_CHUNK_SIZE,
+    ):
 
         self.db = db
         self.collection = collection
+        self.gridfs_threshold = gridfs_threshold
+        self.chunk_size = chunk_size
+
+    @property
+    def _bucket(self) -> gridfs.GridFSBucket:
+        return gridfs.GridFSBucket(
+            self.db, bucket_name=self.collection, chunk_size_bytes=self.chunk_size
+        )
+
+    def _find(self, key: str) -> Dict[str, Any]:
+        item = self.db[self.collection].find_one({"_id": key})
+        if item is None:
+            raise KeyError(key)
+        return item
 
     def _has_key(self, key: str) -> bool:
         return self.db[self.collection].count_documents({"_id": key}) > 0
 
-    def _delete(self, key: str) -> str:
-        return self.db[self.collection].delete_one({"_id": key})
+    def _delete(self, key: str) -> None:
+        item = self.db[self.collection].find_one_and_delete({"_id": key})
+        if item is not None and "f" in item:
+            self._delete_gridfs(item["f"])
+
+    def _delete_gridfs(self, file_id: ObjectId) -> None:
+        # remove the file document first, so that readers never see a partial file
+        self.db[self.collection + ".files"].delete_one({"_id": file_id})
+        self.db[self.collection + ".chunks"].delete_many({"files_id": file_id})
+
+    def _copy_gridfs(self, file_id: ObjectId, filename: str) -> ObjectId:
+        files = self.db[self.collection + ".files"]
+        chunks = self.db[self.collection + ".chunks"]
+
+        file_doc = files.find_one({"_id": file_id})
+        if file_doc is None:
+            raise OSError(f"GridFS file {file_id} is missing")
+
+        # chunks are read and written back one at a time through the client, so at
+        # most one chunk of the value is held in memory
+        new_id = ObjectId()
+        for chunk in chunks.find({"files_id": file_id}):
+            chunks.insert_one(
+                {"files_id": new_id, "n": chunk["n"], "data": chunk["data"]}
+            )
+
+        # the file document is written last, completing the file
+        file_doc.update({"_id": new_id, "filename": filename})
+        files.insert_one(file_doc)
+        return new_id
 
     def _get(self, key: str) -> bytes:
-        try:
-            item = next(self.db[self.collection].find({"_id": key}))
-            return pickle.loads(item["v"])
-        except StopIteration:
-            raise KeyError(key)
+        item = self._find(key)
+        if "f" in item:
+            with self._bucket.open_download_stream(item["f"]) as grid_out:
+                return grid_out.read()
+        return pickle.loads(item["v"])
+
+    def _stat(self, key: str) -> KeyStat:
+        return self._stat_item(self._find(key))
+
+    def _stat_item(self, item: Dict[str, Any]) -> KeyStat:
+        if "f" not in item:
+            return KeyStat(
+                item["_id"], len(pickle.loads(item["v"])), etag=item.get("e")
+            )
+
+        file_doc = self.db[self.collection + ".files"].find_one({"_id": item["f"]})
+        if file_doc is None:
+            # the value was deleted concurrently
+            raise KeyError(item["_id"])
+        upload_date = file_doc.get("uploadDate")
+        if upload_date is not None and upload_date.tzinfo is None:
+            upload_date = upload_date.replace(tzinfo=timezone.utc)
+        return KeyStat(item["_id"], file_doc["length"], upload_date, item.get("e"))
 
     def _open(self, key: str) -> IO:
-        return BytesIO(self._get(key))
+        item = self._find(key)
+        if "f" in item:
+            return self._bucket.open_download_stream(item["f"])
+        return BytesIO(pickle.loads(item["v"]))
 
-    def _put(self, key: str, value: bytes) -> str:
-        self.db[self.collection].update_one(
-            {"_id": key}, {"$set": {"v": Binary(pickle.dumps(value))}}, upsert=True
+    def _copy(self, source: str, dest: str) -> str:
+        item = self._find(source)
+        if "f" in item:
+            self._update(dest, {"f": self._copy_gridfs(item["f"], dest)})
+        else:
+            self._update(dest, {"v": item["v"]})
+        return dest
+
+    def _value_update(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        # set the value stored inline ("v") or in GridFS ("f") and a new ETag
+        unset = {"f": ""} if "v" in fields else {"v": ""}
+        return {"$set": dict(fields, e=uuid.uuid4().hex), "$unset": unset}
+
+    def _update(self, key: str, fields: Dict[str, Any]) -> None:
+        # upsert the document and clean up the GridFS file it referenced before
+        old = self.db[self.collection].find_one_and_update(
+            {"_id": key}, self._value_update(fields), upsert=True
         )
+        if old is not None and "f" in old:
+            self._delete_gridfs(old["f"])
+
+    def _value_fields(self, key: str, value: bytes) -> Dict[str, Any]:
+        # the fields of a document holding value, uploaded to GridFS if it is large
+        if self.gridfs_threshold is not None and len(value) > self.gridfs_threshold:
+            if isinstance(value, memoryview):
+                # GridFS only writes bytes or files
+                return {"f": self._upload(key, b"", _buffer_file(value))}
+            return {"f": self._upload(key, value, None)}
+        return {"v": Binary(pickle.dumps(bytes(value)))}
+
+    def _put(self, key: str, value: bytes) -> str:
+        self._update(key, self._value_fields(key, value))
+        return key
+
+    def _put_conditional(self, key: str, data: bytes, if_match: Optional[str]) -> str:
+        fields = self._value_fields(key, data)
+        try:
+            if if_match is None:
+                # the unique _id rejects the insert if the key exists
+                try:
+                    self.db[self.collection].insert_one(
+                        dict(self._value_update(fields)["$set"], _id=key)
+                    )
+                except DuplicateKeyError:
+                    raise PreconditionFailed(f"The key {key} already exists")
+                return key
+
+            old = self.db[self.collection].find_one_and_update(
+                {"_id": key, "e": if_match}, self._value_update(fields)
+            )
+            if old is None:
+                raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+        except PreconditionFailed:
+            if "f" in fields:
+                self._delete_gridfs(fields["f"])
+            raise
+
+        if "f" in old:
+            self._delete_gridfs(old["f"])
         return key
 
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        item = self.db[self.collection].find_one_and_delete({"_id": key, "e": if_match})
+        if item is None:
+            raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+        if "f" in item:
+            self._delete_gridfs(item["f"])
+
     def _put_file(self, key: str, file: IO) -> str:
-        return self._put(key, file.read())
+        if self.gridfs_threshold is None:
+            return self._put(key, file.read())
+
+        # only read as much as needed to decide where the value goes
+        head = _read_at_most(file, self.gridfs_threshold + 1)
+        if len(head) <= self.gridfs_threshold:
+            return self._put(key, head)
+        return self._put_gridfs(key, head, file)
+
+    def _put_gridfs(self, key: str, head: bytes, file: Optional[IO]) -> str:
+        self._update(key, {"f": self._upload(key, head, file)})
+        return key
+
+    def _upload(self, key: str, head: bytes, file: Optional[IO]) -> ObjectId:
+        # upload head and the rest of file to a new GridFS file
+        file_id = ObjectId()
+        with self._bucket.open_upload_stream_with_id(file_id, key) as grid_in:
+            grid_in.write(head)
+            while file is not None:
+                buf = file.read(self.chunk_size)
+                if not buf:
+                    break
+                grid_in.write(buf)
+        return file_id
 
     def iter_keys(self, prefix: str = "") -> Iterator[str]:
         """Iterate over all keys in the store starting with prefix.
@@ -67,3 +252,45 @@ class MongoStore(KeyValueStore):
             {"_id": {"$regex": "^" + re.escape(prefix)}}
         ):
             yield item["_id"]
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # keyset pagination on the _id index, the token is the last key of the page
+        if token is not None:
+            start_after = token
+        query: Dict[str, Any] = {"$regex": "^" + re.escape(prefix)}
+        if start_after is not None:
+            query["$gt"] = start_after
+        items = (
+            self.db[self.collection]
+            .find({"_id": query}, {"_id": 1})
+            .sort("_id", 1)
+            .limit(limit + 1)
+        )
+        return _key_page([item["_id"] for item in items], limit)
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        for item in self.db[self.collection].find(
+            {"_id": {"$regex": "^" + re.escape(prefix)}}
+        ):
+            try:
+                yield self._stat_item(item)
+            except KeyError:
+                pass
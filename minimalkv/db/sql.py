@@ -1,23 +1,56 @@
+import uuid
 from io import BytesIO
-from typing import IO, Iterator
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from sqlalchemy import Column, LargeBinary, String, Table, exists, select
+from sqlalchemy import Column, LargeBinary, String, Table, and_, exists, func, select
+from sqlalchemy.exc import IntegrityError
 
-from minimalkv import CopyMixin, KeyValueStore
+from minimalkv import CopyMixin, KeyPage, KeyStat, KeyValueStore, PreconditionFailed
+from minimalkv._key_value_store import _MAX_RANGE_GAP, _get_ranges, _key_page
 
 
-class SQLAlchemyStore(KeyValueStore, CopyMixin):  # noqa D
-    def __init__(self, bind, metadata, tablename):
+class SQLAlchemyStore(KeyValueStore, CopyMixin):
+    """Store data in a table of an SQL database.
+
+    Parameters
+    ----------
+    bind : sqlalchemy.engine.Engine
+        The engine of the database.
+    metadata : sqlalchemy.MetaData
+        The metadata the table is added to.
+    tablename : str
+        The name of the table.
+    etags : bool, optional, default = False
+        Add an ``etag`` column, set to a random ETag on every write. It is needed for
+        :meth:`stat` to return ETags and for conditional writes with ``if_match``.
+        Tables created without it must be migrated before enabling it.
+    """
+
+    def __init__(self, bind, metadata, tablename, etags: bool = False):
         self.bind = bind
+        self.etags = etags
 
-        self.table = Table(
-            tablename,
-            metadata,
+        columns = [
             # 250 characters is the maximum key length that we guarantee can be
             # handled by any kind of backend
             Column("key", String(250), primary_key=True),
             Column("value", LargeBinary, nullable=False),
-        )
+        ]
+        if etags:
+            columns.append(Column("etag", String(32), nullable=True))
+        self.table = Table(tablename, metadata, *columns)
+
+    def _row(self, key: str, data: bytes) -> Dict[str, Any]:
+        row = {"key": key, "value": data}
+        if self.etags:
+            row["etag"] = uuid.uuid4().hex
+        return row
+
+    def _check_etags(self) -> None:
+        if not self.etags:
+            raise NotImplementedError(
+                "Conditional writes with if_match require a store with etags=True"
+            )
 
     def _has_key(self, key: str) -> bool:
         return self.bind.execute(
@@ -27,16 +60,116 @@ class SQLAlchemyStore(KeyValueStore, CopyMixin):  # noqa D
     def _delete(self, key: str) -> None:
         self.bind.execute(self.table.delete(self.table.c.key == key))
 
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        self._check_etags()
+        result = self.bind.execute(
+            self.table.delete(
+                and_(self.table.c.key == key, self.table.c.etag == if_match)
+            )
+        )
+        if result.rowcount == 0:
+            raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+
     def _get(self, key: str) -> bytes:
         rv = self.bind.execute(
             select([self.table.c.value], self.table.c.key == key).limit(1)
         ).scalar()
 
-        if not rv:
+        if rv is None:
             raise KeyError(key)
 
         return rv
 
+    def _stat_columns(self) -> list:
+        columns = [self.table.c.key, func.length(self.table.c.value)]
+        if self.etags:
+            columns.append(self.table.c.etag)
+        return columns
+
+    def _stat(self, key: str) -> KeyStat:
+        row = self.bind.execute(
+            select(self._stat_columns(), self.table.c.key == key).limit(1)
+        ).first()
+
+        if row is None:
+            raise KeyError(key)
+
+        return self._row_stat(row)
+
+    def _row_stat(self, row) -> KeyStat:
+        return KeyStat(str(row[0]), row[1], etag=row[2] if self.etags else None)
+
+    def _substr(self, start: int, end: Optional[int]):
+        # SQL substrings start at 1
+        if end is None:
+            return func.substr(self.table.c.value, start + 1)
+        return func.substr(self.table.c.value, start + 1, max(0, end - start))
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        return self._read_ranges(key, [(start, end)])[0]
+
+    def _read_ranges(
+        self, key: str, ranges: List[Tuple[int, Optional[int]]]
+    ) -> List[bytes]:
+        if not ranges:
+            return []
+        row = self.bind.execute(
+            select(
+                [self._substr(start, end) for start, end in ranges],
+                self.table.c.key == key,
+            ).limit(1)
+        ).first()
+
+        if row is None:
+            raise KeyError(key)
+
+        return [bytes(part or b"") for part in row]
+
+    def get_ranges(
+        self,
+        key: str,
+        ranges: Iterable[Tuple[int, Optional[int]]],
+        max_gap: int = _MAX_RANGE_GAP,
+        max_workers: Optional[int] = None,
+    ) -> List[bytes]:
+        """Return several ranges of the value at key.
+
+        Ranges less than ``max_gap`` bytes apart are merged, all ranges are read with
+        a single query.
+
+        Parameters
+        ----------
+        key : str
+            The key to be read.
+        ranges : iterable of (int, int or None)
+            ``(start, end)`` offsets of the ranges, as for :meth:`get_range`.
+        max_gap : int, optional, default = 64 * 1024
+            Ranges separated by at most this many bytes are read together.
+        max_workers : int, optional
+            Ignored.
+
+        Returns
+        -------
+        list of bytes
+            The data of every range, in the order of ``ranges``.
+
+        Raises
+        ------
+        ValueError
+            If the key is not valid.
+        IOError
+            If the value could not be read.
+        KeyError
+            If the key was not found.
+        """
+        self._check_valid_key(key)
+        return _get_ranges(
+            lambda merged: self._read_ranges(key, merged),
+            ranges,
+            lambda: self._stat(key).size,
+            max_gap,
+        )
+
     def _open(self, key: str) -> IO:
         return BytesIO(self._get(key))
 
@@ -46,19 +179,12 @@ class SQLAlchemyStore(KeyValueStore, CopyMixin):  # noqa D
             data = self.bind.execute(
                 select([self.table.c.value], self.table.c.key == source).limit(1)
             ).scalar()
-            if not data:
+            if data is None:
                 raise KeyError(source)
 
             # delete the potential existing previous key
             con.execute(self.table.delete(self.table.c.key == dest))
-            con.execute(
-                self.table.insert(
-                    {
-                        "key": dest,
-                        "value": data,
-                    }
-                )
-            )
+            con.execute(self.table.insert(self._row(dest, data)))
         con.close()
         return dest
 
@@ -69,7 +195,7 @@ class SQLAlchemyStore(KeyValueStore, CopyMixin):  # noqa D
             con.execute(self.table.delete(self.table.c.key == key))
 
             # insert new
-            con.execute(self.table.insert({"key": key, "value": data}))
+            con.execute(self.table.insert(self._row(key, data)))
 
             # commit happens here
 
@@ -79,8 +205,53 @@ class SQLAlchemyStore(KeyValueStore, CopyMixin):  # noqa D
     def _put_file(self, key: str, file: IO) -> str:
         return self._put(key, file.read())
 
+    def _put_conditional(self, key: str, data: bytes, if_match: Optional[str]) -> str:
+        if if_match is None:
+            # the primary key rejects the insert if the key exists
+            try:
+                self.bind.execute(self.table.insert(self._row(key, data)))
+            except IntegrityError:
+                raise PreconditionFailed(f"The key {key} already exists")
+            return key
+
+        self._check_etags()
+        row = self._row(key, data)
+        del row["key"]
+        result = self.bind.execute(
+            self.table.update(
+                and_(self.table.c.key == key, self.table.c.etag == if_match)
+            ).values(row)
+        )
+        if result.rowcount == 0:
+            raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+        return key
+
     def iter_keys(self, prefix: str = "") -> Iterator[str]:  # noqa D
         query = select([self.table.c.key])
         if prefix != "":
             query = query.where(self.table.c.key.like(prefix + "%"))
         return map(lambda v: str(v[0]), self.bind.execute(query))
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # keyset pagination on the primary key, the token is the last key of the page
+        if token is not None:
+            start_after = token
+        query = select([self.table.c.key])
+        if prefix != "":
+            query = query.where(self.table.c.key.like(prefix + "%"))
+        if start_after is not None:
+            query = query.where(self.table.c.key > start_after)
+        query = query.order_by(self.table.c.key).limit(limit + 1)
+        return _key_page([str(v[0]) for v in self.bind.execute(query)], limit)
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:  # noqa D
+        query = select(self._stat_columns())
+        if prefix != "":
+            query = query.where(self.table.c.key.like(prefix + "%"))
+        return map(self._row_stat, self.bind.execute(query))
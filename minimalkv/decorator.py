@@ -1,7 +1,13 @@
-from typing import Iterable
+from typing import Iterable, Optional
 from urllib.parse import quote_plus, unquote_plus
 
-from minimalkv._key_value_store import KeyValueStore
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyValueStore,
+    _check_page_arguments,
+    _sorted_page,
+    _StreamReader,
+)
 
 
 class StoreDecorator:
@@ -38,10 +44,21 @@ class StoreDecorator:
     def __iter__(self) -> Iterable[str]:  # noqa D
         return self._dstore.__iter__()
 
+    def put_stream(self, key: str, chunks: Iterable, *args, **kwargs):  # noqa D
+        # Streams go through put_file, so decorators transforming values need not
+        # handle them separately. Passing them on as they are would store the data
+        # untransformed.
+        return self.put_file(key, _StreamReader(chunks), *args, **kwargs)
+
 
 class KeyTransformingDecorator(StoreDecorator):  # noqa D
     # TODO Document KeyTransformingDecorator.
     # currently undocumented (== not advertised as a feature)
+
+    # whether mapped keys sort like the keys, so pages can be listed by the
+    # decorated store
+    _preserves_order = False
+
     def _map_key(self, key: str) -> str:
         return key
 
@@ -60,8 +77,8 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
     def __iter__(self) -> Iterable[str]:  # noqa D
         return self.iter_keys()
 
-    def delete(self, key: str):  # noqa D
-        return self._dstore.delete(self._map_key(key))
+    def delete(self, key: str, *args, **kwargs):  # noqa D
+        return self._dstore.delete(self._map_key(key), *args, **kwargs)
 
     def get(self, key, *args, **kwargs):  # noqa D
         return self._dstore.get(self._map_key(key), *args, **kwargs)  # type: ignore
@@ -69,6 +86,15 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
     def get_file(self, key: str, *args, **kwargs):  # noqa D
         return self._dstore.get_file(self._map_key(key), *args, **kwargs)
 
+    def get_into(self, key: str, buffer):  # noqa D
+        return self._dstore.get_into(self._map_key(key), buffer)
+
+    def get_range(self, key: str, *args, **kwargs):  # noqa D
+        return self._dstore.get_range(self._map_key(key), *args, **kwargs)
+
+    def get_ranges(self, key: str, *args, **kwargs):  # noqa D
+        return self._dstore.get_ranges(self._map_key(key), *args, **kwargs)
+
     def iter_keys(self, prefix: str = "") -> Iterable[str]:  # noqa D
         return (
             self._unmap_key(k)
@@ -76,6 +102,28 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
             if self._filter(k)
         )
 
+    def list_page(  # noqa D
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        limit: int = 1000,
+        token: Optional[str] = None,
+    ) -> KeyPage:
+        if not self._preserves_order:
+            # the keys are listed in the order of the mapped keys, so the page is
+            # selected from all keys
+            _check_page_arguments(start_after, limit, token)
+            return _sorted_page(self.iter_keys(prefix), start_after, limit, token)
+
+        if start_after is not None:
+            start_after = self._map_key_prefix(start_after)
+        page = self._dstore.list_page(
+            self._map_key_prefix(prefix), start_after, limit, token
+        )
+        return page._replace(
+            keys=[self._unmap_key(k) for k in page.keys if self._filter(k)]
+        )
+
     def iter_prefixes(  # noqa D
         self, delimiter: str, prefix: str = ""
     ) -> Iterable[str]:
@@ -98,6 +146,16 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
     def open(self, key: str):  # noqa D
         return self._dstore.open(self._map_key(key))
 
+    def stat(self, key: str):  # noqa D
+        return self._dstore.stat(self._map_key(key))._replace(key=key)
+
+    def iter_stat(self, prefix: str = ""):  # noqa D
+        return (
+            st._replace(key=self._unmap_key(st.key))
+            for st in self._dstore.iter_stat(self._map_key_prefix(prefix))
+            if self._filter(st.key)
+        )
+
     def put(self, key: str, *args, **kwargs):  # noqa D
         return self._unmap_key(self._dstore.put(self._map_key(key), *args, **kwargs))
 
@@ -106,6 +164,11 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
             self._dstore.put_file(self._map_key(key), *args, **kwargs)
         )
 
+    def put_stream(self, key: str, *args, **kwargs):  # noqa D
+        return self._unmap_key(
+            self._dstore.put_stream(self._map_key(key), *args, **kwargs)
+        )
+
     # support for UrlMixin
     def url_for(self, key: str, *args, **kwargs) -> str:  # noqa D
         return self._dstore.url_for(self._map_key(key), *args, **kwargs)  # type: ignore
@@ -114,6 +177,11 @@ class KeyTransformingDecorator(StoreDecorator):  # noqa D
     def copy(self, source: str, dest: str):  # noqa D
         return self._dstore.copy(self._map_key(source), self._map_key(dest))  # type: ignore
 
+    def move(self, source: str, dest: str):  # noqa D
+        return self._unmap_key(
+            self._dstore.move(self._map_key(source), self._map_key(dest))  # type: ignore
+        )
+
 
 class PrefixDecorator(KeyTransformingDecorator):
     """
@@ -130,6 +198,8 @@ class PrefixDecorator(KeyTransformingDecorator):
 
     """
 
+    _preserves_order = True
+
     def __init__(self, prefix: str, store: KeyValueStore):
         super().__init__(store)
         self.prefix = prefix
@@ -172,7 +242,9 @@ class ReadOnlyDecorator(StoreDecorator):
     """A read-only view of an underlying minimalkv store.
 
     Provides only access to the following methods/attributes of the underlying store:
-    ``get``, ``iter_keys``, ``keys``, ``open``, ``get_file`` and ``__contains__``.
+    ``get``, ``get_into``, ``get_range``, ``get_ranges``, ``iter_keys``, ``keys``,
+    ``list_page``, ``open``, ``get_file``, ``stat``, ``iter_stat`` and
+    ``__contains__``.
     Accessing any other method will raise ``AttributeError``.
 
     Note that the original store for read / write can still be accessed, so using this
@@ -182,7 +254,19 @@ class ReadOnlyDecorator(StoreDecorator):
     """
 
     def __getattr__(self, attr):  # noqa D
-        if attr in ("get", "iter_keys", "keys", "open", "get_file"):
+        if attr in (
+            "get",
+            "get_into",
+            "get_range",
+            "get_ranges",
+            "iter_keys",
+            "keys",
+            "list_page",
+            "open",
+            "get_file",
+            "stat",
+            "iter_stat",
+        ):
             return super().__getattr__(attr)
         else:
             raise AttributeError
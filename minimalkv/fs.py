@@ -1,12 +1,57 @@
+import itertools
 import os
 import os.path
 import shutil
+import tempfile
 import urllib.parse
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from typing import IO, Any, Callable, Iterator, List, Optional, Union, cast
 
-from minimalkv._key_value_store import KeyValueStore
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    _check_precondition,
+    _key_page,
+    _readinto,
+)
 from minimalkv._mixins import CopyMixin, UrlMixin
 
+try:
+    import fcntl
+
+    has_fcntl = True
+except ImportError:  # pragma: no cover
+    has_fcntl = False
+
+
+#: Extended attribute holding the random ETag of files written by the store.
+_ETAG_ATTR = "user.minimalkv.etag"
+
+
+def _set_etag(file: Union[int, str]) -> None:
+    # filesystems without extended attributes fall back to the ETag of the metadata
+    try:
+        os.setxattr(file, _ETAG_ATTR, os.urandom(16).hex().encode("ascii"))
+    except (AttributeError, OSError):
+        pass
+
+
+def _stat_etag(file: Union[int, str], st: os.stat_result) -> str:
+    try:
+        return os.getxattr(file, _ETAG_ATTR).decode("ascii")
+    except (AttributeError, OSError):
+        # like the ETags of web servers, files are replaced rather than rewritten
+        return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
 
 class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
     """Store data in files on the filesystem under a common directory.
@@ -18,6 +63,13 @@ class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
     will be made. Permissions and ownership of the file will be preserved that way. If
     ``perm`` is set, permissions will be changed.
 
+    Values are written to a temporary file which then replaces the file of the key.
+    Every write stores a random ETag in an extended attribute of the file. On
+    filesystems without extended attributes, the ETag is derived from the inode,
+    modification time and size of the file instead. Conditional writes of existing
+    keys and conditional deletes lock the file with ``flock``, so they are only
+    atomic with respect to other conditional writes and require ``fcntl``.
+
     The method :meth:`.url_for` can be used to get a `file://`-URL pointing to the
     internal storage.
 
@@ -86,14 +138,131 @@ class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
             else:
                 raise
 
+    def _get_into(self, key: str, view: memoryview) -> int:
+        # unbuffered, so the data is read into the buffer directly
+        try:
+            f = open(self._build_filename(key), "rb", buffering=0)
+        except OSError as e:
+            if 2 == e.errno:
+                raise KeyError(key)
+            else:
+                raise
+        with f:
+            return _readinto(f, view, key)
+
+    def _stat(self, key: str) -> KeyStat:
+        try:
+            st = os.stat(self._build_filename(key))
+        except OSError as e:
+            if 2 == e.errno:
+                raise KeyError(key)
+            else:
+                raise
+        return KeyStat(
+            key,
+            st.st_size,
+            datetime.fromtimestamp(st.st_mtime, timezone.utc),
+            _stat_etag(self._build_filename(key), st),
+        )
+
+    @contextmanager
+    def _replacing(self, target: str) -> Iterator[IO]:
+        """Write to a temporary file replacing ``target`` once it is complete.
+
+        Readers never see partially written values. The temporary file exists next to
+        the old one, so the new file never reuses the inode of the file it replaces.
+        """
+        self._ensure_dir_exists(os.path.dirname(target))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(target), prefix=".minimalkv-"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                yield f
+                _set_etag(f.fileno())
+            self._fix_permissions(tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def _locked(self, key: str, if_match: str) -> Iterator[int]:
+        """Open and lock the file of key for writing if its ETag is ``if_match``."""
+        if not has_fcntl:
+            raise NotImplementedError(
+                "Conditional writes of existing keys require fcntl"
+            )
+
+        target = self._build_filename(key)
+        while True:
+            try:
+                fd = os.open(target, os.O_RDWR | getattr(os, "O_BINARY", 0))
+            except FileNotFoundError:
+                raise PreconditionFailed(f"The key {key} does not exist")
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                st = os.fstat(fd)
+                try:
+                    current = os.stat(target)
+                except FileNotFoundError:
+                    raise PreconditionFailed(f"The key {key} does not exist")
+                # otherwise the file was deleted and recreated while waiting for the lock
+                if (current.st_dev, current.st_ino) == (st.st_dev, st.st_ino):
+                    _check_precondition(key, _stat_etag(fd, st), if_match)
+                    yield fd
+                    return
+            finally:
+                os.close(fd)
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        if not hasattr(os, "pread"):
+            return super()._get_range(key, start, end)
+
+        try:
+            fd = os.open(self._build_filename(key), os.O_RDONLY)
+        except OSError as e:
+            if 2 == e.errno:
+                raise KeyError(key)
+            else:
+                raise
+        try:
+            if end is None:
+                end = os.fstat(fd).st_size
+            # pread does not move the file position and may return less than asked
+            parts = []
+            while start < end:
+                buf = os.pread(fd, min(end - start, self.bufsize), start)
+                if not buf:
+                    break
+                parts.append(buf)
+                start += len(buf)
+            return b"".join(parts)
+        finally:
+            os.close(fd)
+
     def _copy(self, source: str, dest: str) -> str:
+        try:
+            source_file = open(self._build_filename(source), "rb")
+        except OSError as e:
+            if 2 == e.errno:
+                raise KeyError(source)
+            else:
+                raise
+        with source_file, self._replacing(self._build_filename(dest)) as f:
+            shutil.copyfileobj(source_file, f, self.bufsize)
+        return dest
+
+    def _move(self, source: str, dest: str) -> str:
         try:
             source_file_name = self._build_filename(source)
             dest_file_name = self._build_filename(dest)
 
             self._ensure_dir_exists(os.path.dirname(dest_file_name))
-            shutil.copy(source_file_name, dest_file_name)
-            self._fix_permissions(dest_file_name)
+            # a rename within the store, the data is not copied
+            os.replace(source_file_name, dest_file_name)
+            self._remove_empty_parents(source_file_name)
             return dest
         except OSError as e:
             if 2 == e.errno:
@@ -109,26 +278,66 @@ class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
                 if not os.path.isdir(path):
                     raise e
 
+    def _put(self, key: str, data: bytes, *args, **kwargs) -> str:
+        # buffers are written as they are, without wrapping them in a file
+        return self._put_stream(key, iter((data,)))
+
     def _put_file(self, key: str, file: IO, *args, **kwargs) -> str:
         bufsize = self.bufsize
 
-        target = self._build_filename(key)
-        self._ensure_dir_exists(os.path.dirname(target))
-
-        with open(target, "wb") as f:
+        def chunks():
             while True:
                 buf = file.read(bufsize)
-                f.write(buf)
+                yield buf
                 if len(buf) < bufsize:
-                    break
+                    return
+
+        return self._put_stream(key, chunks())
+
+    def _put_stream(self, key: str, chunks: Iterator, *args, **kwargs) -> str:
+        with self._replacing(self._build_filename(key)) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return key
+
+    def _put_conditional(
+        self, key: str, data: bytes, if_match: Optional[str], *args, **kwargs
+    ) -> str:
+        if if_match is not None:
+            # replaced while locked, writers waiting for the lock notice the new file
+            with self._locked(key, if_match):
+                self._put_stream(key, iter((data,)))
+            return key
+
+        target = self._build_filename(key)
+        self._ensure_dir_exists(os.path.dirname(target))
+        try:
+            fd = os.open(
+                target,
+                os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0),
+                0o666,
+            )
+        except FileExistsError:
+            raise PreconditionFailed(f"The key {key} already exists")
+        try:
+            _write_all(fd, data)
+            _set_etag(fd)
+        except BaseException:
+            os.close(fd)
+            os.unlink(target)
+            raise
+        os.close(fd)
 
-        # when using umask, correct permissions are automatically applied
-        # only chmod is necessary
         if self.perm is not None:
             self._fix_permissions(target)
-
         return key
 
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        target = self._build_filename(key)
+        with self._locked(key, if_match):
+            os.unlink(target)
+        self._remove_empty_parents(target)
+
     def _put_filename(self, key: str, filename: str, *args, **kwargs) -> str:
         target = self._build_filename(key)
         self._ensure_dir_exists(os.path.dirname(target))
@@ -136,6 +345,7 @@ class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
 
         # we do not know the permissions of the source file, rectify
         self._fix_permissions(target)
+        _set_etag(target)
         return key
 
     def _url_for(self, key: str) -> str:
@@ -173,6 +383,54 @@ class FilesystemStore(KeyValueStore, UrlMixin, CopyMixin):
         """
         return iter(self.keys(prefix))
 
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # the token is the last key of the page
+        if token is not None:
+            start_after = token
+        keys = self._iter_sorted_keys(
+            os.path.abspath(self.root), "", prefix, start_after
+        )
+        return _key_page(list(itertools.islice(keys, limit + 1)), limit)
+
+    def _iter_sorted_keys(
+        self, path: str, base: str, prefix: str, start_after: Optional[str]
+    ) -> Iterator[str]:
+        # A directory sorts as its name followed by the separator, like the keys in it,
+        # so walking the sorted entries yields the keys in order. Directories without
+        # keys starting with prefix or after start_after are skipped.
+        try:
+            with os.scandir(path) as it:
+                entries = [
+                    (entry.name + os.sep if entry.is_dir() else entry.name, entry)
+                    for entry in it
+                ]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda item: item[0])
+
+        for name, entry in entries:
+            key = base + name
+            if not name.endswith(os.sep):
+                if key.startswith(prefix) and (
+                    start_after is None or key > start_after
+                ):
+                    yield key
+            elif entry.is_symlink():
+                # like os.walk, links to directories are not followed
+                continue
+            elif not (key.startswith(prefix) or prefix.startswith(key)):
+                continue
+            elif (
+                start_after is None or key > start_after or start_after.startswith(key)
+            ):
+                yield from self._iter_sorted_keys(entry.path, key, prefix, start_after)
+
     def iter_prefixes(self, delimiter: str, prefix: str = "") -> Iterator[str]:
         """
         Iterate over unique prefixes in the store up to delimiter, starting with prefix.
@@ -1,13 +1,14 @@
 import io
+from datetime import datetime, timezone
 from functools import partial
-from typing import IO, Iterator, Optional
+from typing import IO, Any, Dict, Iterator, Optional
 from urllib.parse import quote as _quote
 from urllib.parse import unquote
 
 from fsspec import AbstractFileSystem
 from fsspec.spec import AbstractBufferedFile
 
-from minimalkv import KeyValueStore
+from minimalkv import KeyStat, KeyValueStore
 from minimalkv.net._net_common import LAZY_PROPERTY_ATTR_PREFIX, lazy_property
 
 quote = partial(_quote, safe="")
@@ -18,6 +19,30 @@ quote = partial(_quote, safe="")
 # If desired to be a directory, the prefix should end in a slash.
 
 
+def _info_stat(key: str, info: Dict[str, Any]) -> KeyStat:
+    """Convert the ``info`` of an fsspec file to a :class:`KeyStat`.
+
+    Filesystems name the modification time and ETag differently.
+    """
+    last_modified = None
+    for name in ("mtime", "LastModified", "last_modified", "updated"):
+        value = info.get(name)
+        if value is None:
+            continue
+        if isinstance(value, (int, float)):
+            last_modified = datetime.fromtimestamp(value, timezone.utc)
+        elif isinstance(value, str):
+            last_modified = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        elif isinstance(value, datetime):
+            last_modified = value
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        break
+
+    etag = info.get("ETag") or info.get("etag")
+    return KeyStat(key, info["size"], last_modified, etag.strip('"') if etag else None)
+
+
 class FSSpecStoreEntry(io.BufferedIOBase):
     """A file-like object for reading from an entry in an FSSpecStore."""
 
@@ -70,6 +95,21 @@ class FSSpecStoreEntry(io.BufferedIOBase):
         """
         return self._file.read(size)
 
+    def readinto(self, b) -> int:
+        """Read bytes into a pre-allocated, writable buffer.
+
+        Parameters
+        ----------
+        b : writable buffer
+            The buffer to read into.
+
+        Returns
+        -------
+        int
+            Number of bytes read.
+        """
+        return self._file.readinto(b)
+
     def seekable(self) -> bool:
         """Whether the file is seekable."""
         return self._file.seekable()
@@ -137,6 +177,34 @@ class FSSpecStore(KeyValueStore):
             lambda k: unquote(k.replace(f"{self.prefix}", "")), all_files_and_dirs
         )
 
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        The metadata is taken from the listing of the filesystem.
+
+        Parameters
+        ----------
+        prefix: str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        infos = self._fs.find(f"{self.prefix}", prefix=quote(prefix), detail=True)
+        return (
+            _info_stat(unquote(path.replace(f"{self.prefix}", "")), info)
+            for path, info in infos.items()
+        )
+
+    def _stat(self, key: str) -> KeyStat:
+        try:
+            info = self._fs.info(f"{self.prefix}{quote(key)}")
+        except FileNotFoundError:
+            raise KeyError(key)
+        return _info_stat(key, info)
+
     def _delete(self, key: str) -> None:
         try:
             self._fs.rm_file(f"{self.prefix}{quote(key)}")
@@ -149,10 +217,30 @@ class FSSpecStore(KeyValueStore):
         except FileNotFoundError:
             raise KeyError(key)
 
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        try:
+            return self._fs.cat_file(f"{self.prefix}{quote(key)}", start, end)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def _put(self, key: str, data: bytes) -> str:
+        if isinstance(data, bytes):
+            self._fs.pipe_file(f"{self.prefix}{quote(key)}", data)
+            return key
+        # buffers are written as they are instead of copying them to bytes
+        return self._put_stream(key, iter((data,)))
+
     def _put_file(self, key: str, file: IO) -> str:
         self._fs.pipe_file(f"{self.prefix}{quote(key)}", file.read())
         return key
 
+    def _put_stream(self, key: str, chunks: Iterator) -> str:
+        # the file uploads its blocks while writing, e.g. as a multipart upload
+        with self._fs.open(f"{self.prefix}{quote(key)}", "wb") as file:
+            for chunk in chunks:
+                file.write(chunk)
+        return key
+
     def _has_key(self, key: str) -> bool:
         return self._fs.exists(f"{self.prefix}{quote(key)}")
 
@@ -1,86 +1,407 @@
+import hashlib
+import io
+import os
 import re
+import tempfile
 import time
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 from io import BytesIO
-from typing import IO, Iterator, List, Optional, Union
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
 
 from dulwich.objects import Blob, Commit, Tree
 from dulwich.repo import Repo
 
 from minimalkv import __version__
-from minimalkv._key_value_store import KeyValueStore
+from minimalkv._key_value_store import KeyStat, KeyValueStore, _buffer_file
 
+if TYPE_CHECKING:
+    from dulwich.object_store import DiskObjectStore
+    from dulwich.objects import ObjectID
 
-def _on_tree(
-    repo: Repo,
-    tree: Tree,
-    components: List[bytes],
-    obj: Optional[Union[Blob, Tree]],
-) -> List[Tree]:
-    """Mount an object on a tree, using the given path components.
+_TREE_MODE = 0o040000
+_BLOB_MODE = 0o100644
+
+
+def _write_loose_blob(objects_path: str, file: IO, size: int, bufsize: int) -> bytes:
+    """Write ``size`` bytes from ``file`` as a loose blob object.
+
+    The data is hashed and compressed chunk by chunk, so it is never held in memory
+    completely.
 
     Parameters
     ----------
-    repo : dulwich.objects.Repo
-        Repository.
-    tree : dulwich.objects.Tree
-        Tree object to mount on.
-    components : list of str
-        A list of strings (or bytes) of subpaths (e.g. ['foo', 'bar'] is equivalent to
-        '/foo/bar').
-    obj : dulwich.objects.Blob or dulwich.objects.Tree or None
-        Object to mount. If None, removes the object found at path and prunes the tree
-        downwards.
+    objects_path : str
+        Path to the ``objects`` directory of the repository.
+    file : file-like
+        File to read the data from.
+    size : int
+        Number of bytes to read from ``file``.
+    bufsize : int
+        Size of the chunks that are read.
 
     Returns
     -------
-    list of dulwich.objects:
-        A list of new entities that need to be added to the object store, where the last
-        one is the new tree.
+    sha : bytes
+        Hex SHA of the new blob.
 
     """
-    # pattern-matching:
-    if len(components) == 1:
-        if isinstance(obj, Blob):
-            mode: Optional[int] = 0o100644
-        elif isinstance(obj, Tree):
-            mode = 0o040000
-        elif obj is None:
-            mode = None
+    header = b"blob %d\0" % size
+    sha = hashlib.sha1(header)
+    compressor = zlib.compressobj()
+
+    fd, tmp_path = tempfile.mkstemp(dir=objects_path, prefix="tmp_obj_")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(compressor.compress(header))
+            remaining = size
+            while remaining > 0:
+                buf = file.read(min(bufsize, remaining))
+                if not buf:
+                    raise OSError("File ended before all data was read")
+                sha.update(buf)
+                tmp.write(compressor.compress(buf))
+                remaining -= len(buf)
+            tmp.write(compressor.flush())
+
+        hexsha = sha.hexdigest()
+        path = os.path.join(objects_path, hexsha[:2], hexsha[2:])
+        if os.path.exists(path):
+            os.unlink(tmp_path)
         else:
-            raise TypeError("Can only mount Blobs or Trees")
-        name = components[0]
-
-        if mode is not None:
-            assert obj is not None
-            tree[name] = mode, obj.id
-            return [tree]
-        if name in tree:
-            del tree[name]
-        return [tree]
-    elif len(components) > 1:
-        a, bc = components[0], components[1:]
-        if a in tree:
-            a_tree = repo[tree[a][1]]
-            if not isinstance(a_tree, Tree):
-                a_tree = Tree()
-        else:
-            a_tree = Tree()
-        res = _on_tree(repo, a_tree, bc, obj)
-        a_tree_new = res[-1]
-
-        if a_tree_new.items():
-            tree[a] = 0o040000, a_tree_new.id
-            return res + [tree]
-
-        # tree is empty
-        if a in tree:
-            del tree[a]
-        return [tree]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return hexsha.encode("ascii")
+
+
+# types of deltified objects in packs
+_OFS_DELTA = 6
+_REF_DELTA = 7
+
+
+def _inflate_head(file: IO, size: int) -> bytes:
+    """Decompress the zlib stream at the position of ``file`` up to ``size`` bytes."""
+    decompressor = zlib.decompressobj()
+    data = b""
+    while len(data) < size:
+        buf = file.read(64)
+        if not buf:
+            break
+        data += decompressor.decompress(buf, size - len(data))
+    return data
+
+
+def _read_size(data: Iterator[int]) -> int:
+    """Decode a size stored in little-endian groups of 7 bits."""
+    size = shift = 0
+    for byte in data:
+        size |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size
+    raise OSError("Truncated object header")
+
+
+def _pack_entry_size(file: IO, sha_size: int) -> int:
+    """Return the size of the object whose pack entry starts at the position of ``file``.
+
+    The entry header holds the type and size of the object. Deltified objects
+    are followed by their base and the compressed delta, which starts with the size
+    of the base and of the object.
+    """
+    byte = file.read(1)[0]
+    type_num = (byte >> 4) & 0x07
+    size = byte & 0x0F
+    shift = 4
+    while byte & 0x80:
+        byte = file.read(1)[0]
+        size |= (byte & 0x7F) << shift
+        shift += 7
+
+    if type_num == _OFS_DELTA:
+        while file.read(1)[0] & 0x80:
+            pass
+    elif type_num == _REF_DELTA:
+        file.read(sha_size)
     else:
-        raise ValueError("Components can't be empty.")
+        return size
+
+    delta = iter(_inflate_head(file, 20))
+    _read_size(delta)
+    return _read_size(delta)
+
+
+def _object_size(repo: Repo, sha: bytes) -> int:
+    """Return the size of the object ``sha`` without decompressing all of it.
+
+    The size is read from the header of loose objects or the pack entry. Objects
+    of repositories not stored on disk are read completely.
+    """
+    object_store = cast("DiskObjectStore", repo.object_store)
+    objects_path = getattr(object_store, "path", None)
+    if objects_path is None:
+        return repo[sha].raw_length()
+
+    hexsha = sha.decode("ascii")
+    try:
+        with open(os.path.join(objects_path, hexsha[:2], hexsha[2:]), "rb") as f:
+            header = _inflate_head(f, 32)
+    except FileNotFoundError:
+        pass
+    else:
+        # loose objects start with b"<type> <size>\0"
+        return int(header[: header.index(b"\0")].split(b" ")[1])
+
+    for pack in object_store.packs:
+        try:
+            offset = pack.index.object_offset(cast("ObjectID", sha))
+        except KeyError:
+            continue
+        filename = os.path.basename(pack.data.filename)
+        with open(os.path.join(object_store.pack_dir, filename), "rb") as f:
+            f.seek(offset)
+            return _pack_entry_size(f, len(sha) // 2)
+
+    # e.g. objects of alternate repositories
+    return repo[sha].raw_length()
+
+
+class _TreeCache:
+    """LRU cache of decoded tree objects, keyed by their SHA.
+
+    Trees are immutable, so entries never have to be invalidated.
+    """
+
+    def __init__(self, repo: Repo, maxsize: int):
+        self.repo = repo
+        self.maxsize = maxsize
+        self._trees: "OrderedDict[bytes, Tree]" = OrderedDict()
+
+    def __getitem__(self, sha: bytes) -> Tree:
+        try:
+            self._trees.move_to_end(sha)
+            return self._trees[sha]
+        except KeyError:
+            tree = self.repo[sha]
+            if not isinstance(tree, Tree):
+                raise KeyError(sha)
+            self.add(tree)
+            return tree
+
+    def add(self, tree: Tree) -> None:
+        """Add a tree to the cache, evicting the least recently used one if full."""
+        self._trees[tree.id] = tree
+        if len(self._trees) > self.maxsize:
+            self._trees.popitem(last=False)
+
+
+class _CommitIndex:
+    """Commit times along the first-parent history of a branch.
+
+    Commit times are assumed to increase along the history, which allows finding the
+    commit at a point in time by bisection. The index is extended incrementally when
+    new commits are added to the branch.
+    """
+
+    def __init__(self):
+        self.head: Optional[bytes] = None
+        self.times: List[int] = []
+        self.commit_ids: List[bytes] = []
+
+    def update(self, repo: Repo, head: bytes) -> None:
+        """Index all commits up to ``head`` that have not been indexed yet."""
+        new_commits = []
+        commit_id: Optional[bytes] = head
+        while commit_id is not None and commit_id != self.head:
+            commit = cast(Commit, repo[commit_id])
+            new_commits.append((commit.commit_time, commit_id))
+            commit_id = commit.parents[0] if commit.parents else None
+
+        if commit_id is None:
+            # the previous head is not part of the history (anymore)
+            self.times, self.commit_ids = [], []
+
+        for commit_time, commit_id in reversed(new_commits):
+            self.times.append(commit_time)
+            self.commit_ids.append(commit_id)
+        self.head = head
+
+    def find(self, timestamp: float) -> Optional[bytes]:
+        """Return the id of the last commit made at or before ``timestamp``."""
+        pos = bisect_right(self.times, timestamp)
+        return self.commit_ids[pos - 1] if pos else None
+
+
+class _TreeChanges(Dict[bytes, Union[bytes, None, "_TreeChanges"]]):
+    """Pending changes to a tree.
+
+    Maps names to blob ids, ``None`` (deleted) or to the changes of a subtree. If
+    ``replace`` is set, the changes are applied to an empty tree instead of the existing
+    one, e.g. if a key that was deleted before is turned into a directory.
+    """
+
+    def __init__(self, replace: bool = False):
+        super().__init__()
+        self.replace = replace
+
+    def record(self, components: List[bytes], blob_id: Optional[bytes]) -> None:
+        """Record the blob ``blob_id`` to be mounted at the path of ``components``."""
+        changes = self
+        for name in components[:-1]:
+            sub = changes.get(name)
+            if not isinstance(sub, _TreeChanges):
+                # a blob (or nothing) at this path is replaced by a tree
+                sub = changes[name] = _TreeChanges(replace=name in changes)
+            changes = sub
+        changes[components[-1]] = blob_id
+
 
+class _GitTreeStore(KeyValueStore):
+    """Base class for stores reading keys from the tree returned by ``_root_tree_id``."""
 
-class GitCommitStore(KeyValueStore):
+    repo: Repo
+    subdir: str
+    _trees: _TreeCache
+
+    @property
+    def _subdir_components(self) -> List[bytes]:
+        return [c.encode("ascii") for c in self.subdir.split("/")]
+
+    def _key_components(self, key: str) -> List[bytes]:
+        return [c.encode("ascii") for c in key.split("/")]
+
+    def _root_tree_id(self) -> Optional[bytes]:
+        # the tree keys are read from, None if there is none
+        raise NotImplementedError
+
+    def _lookup(
+        self, tree_id: Optional[bytes], components: List[bytes]
+    ) -> Optional[Tuple[int, bytes]]:
+        # returns mode and sha of the entry at the given path or None if there is none
+        entry = None
+        for name in components:
+            if tree_id is None:
+                return None
+            tree = self._trees[tree_id]
+            if name not in tree:
+                return None
+            entry = tree[name]
+            tree_id = entry[1] if entry[0] == _TREE_MODE else None
+        return entry
+
+    def _lookup_tree(
+        self, tree_id: Optional[bytes], components: List[bytes]
+    ) -> Optional[bytes]:
+        entry = self._lookup(tree_id, components)
+        if entry is None or entry[0] != _TREE_MODE:
+            return None
+        return entry[1]
+
+    def _get(self, key: str) -> bytes:
+        entry = self._lookup(self._root_tree_id(), self._key_components(key))
+        if entry is None or entry[0] == _TREE_MODE:
+            raise KeyError(key)
+        return cast(Blob, self.repo[entry[1]]).data
+
+    def _has_key(self, key: str) -> bool:
+        entry = self._lookup(self._root_tree_id(), self._key_components(key))
+        return entry is not None and entry[0] != _TREE_MODE
+
+    def _stat(self, key: str) -> KeyStat:
+        entry = self._lookup(self._root_tree_id(), self._key_components(key))
+        if entry is None or entry[0] == _TREE_MODE:
+            raise KeyError(key)
+        # the blob id identifies the content
+        return KeyStat(
+            key, _object_size(self.repo, entry[1]), etag=entry[1].decode("ascii")
+        )
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        """Iterate over all keys in the store starting with prefix.
+
+        Only subtrees that can contain keys starting with ``prefix`` are read.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        """
+        tree_id = self._root_tree_id()
+        if tree_id is not None:
+            yield from self._iter_tree(tree_id, "", prefix)
+
+    def _iter_tree(self, tree_id: bytes, path: str, prefix: str) -> Iterator[str]:
+        for entry in self._trees[tree_id].iteritems():
+            name = path + entry.path.decode("ascii")
+            if entry.mode == _TREE_MODE:
+                name += "/"
+                if name.startswith(prefix) or prefix.startswith(name):
+                    yield from self._iter_tree(entry.sha, name, prefix)
+            elif name.startswith(prefix):
+                yield name
+
+    def iter_prefixes(self, delimiter: str, prefix: str = "") -> Iterator[str]:
+        """
+        Iterate over unique prefixes in the store up to delimiter, starting with prefix.
+
+        If ``prefix`` contains ``delimiter``, return the prefix up to the first
+        occurence of delimiter after the prefix.
+
+        If ``delimiter`` is ``/``, only the tree containing ``prefix`` is read.
+
+        Parameters
+        ----------
+        delimiter : str, optional, default = ''
+            Delimiter up to which to iterate over prefixes.
+        prefix : str, optional, default = ''
+            Only iterate over prefixes starting with prefix.
+
+        """
+        if delimiter != "/":
+            yield from super().iter_prefixes(delimiter, prefix)
+            return
+
+        dirname = prefix[: prefix.rfind("/") + 1]
+        tree_id = self._root_tree_id()
+        if dirname:
+            tree_id = self._lookup_tree(tree_id, self._key_components(dirname[:-1]))
+        if tree_id is None:
+            return
+
+        for entry in self._trees[tree_id].iteritems():
+            name = dirname + entry.path.decode("ascii")
+            if entry.mode == _TREE_MODE:
+                name += "/"
+            if name.startswith(prefix):
+                yield name
+
+    def _open(self, key: str) -> IO:
+        return BytesIO(self._get(key))
+
+
+class GitCommitStore(_GitTreeStore):
     """Store using git.
 
     Parameters
@@ -91,31 +412,103 @@ class GitCommitStore(KeyValueStore):
         Branch to use.
     subdir : bytes, optional, default = b""
         Subdirectory of the repository to use.
+    pack : bool, optional, default = False
+        Write all objects of a commit as a single pack file instead of loose objects.
+        The blobs of a commit are held in memory until it is written.
 
     """
 
     AUTHOR = f"GitCommitStore (minimalkv {__version__}) <>"
     TIMEZONE = None
-
-    def __init__(self, repo_path: str, branch: bytes = b"master", subdir: bytes = b""):
+    TREE_CACHE_SIZE = 1024
+
+    def __init__(
+        self,
+        repo_path: str,
+        branch: bytes = b"master",
+        subdir: bytes = b"",
+        pack: bool = False,
+    ):
         self.repo = Repo(repo_path)
         self.branch = branch
+        self.pack = pack
+        self.bufsize = 1024 * 1024  # 1m
+        # blobs waiting to be packed with the next commit
+        self._pending_blobs: List[Blob] = []
+        self._changes: Optional[_TreeChanges] = None
+        self._num_changes = 0
+        self._trees = _TreeCache(self.repo, self.TREE_CACHE_SIZE)
+        # (commit id, tree id of subdir) of the last resolved head
+        self._resolved_head: Optional[Tuple[bytes, Optional[bytes]]] = None
+        self._commit_index = _CommitIndex()
 
         # cleans up subdir, to a form of 'a/b/c' (no duplicate, leading or
         # trailing slashes)
         self.subdir = re.sub("#/+#", "/", subdir.decode("ascii").strip("/"))
 
-    @property
-    def _subdir_components(self) -> List[bytes]:
-        return [c.encode("ascii") for c in self.subdir.split("/")]
-
-    def _key_components(self, key: str) -> List[bytes]:
-        return [c.encode("ascii") for c in key.split("/")]
-
     @property
     def _refname(self):
         return b"refs/heads/" + self.branch
 
+    def _root_tree_id(self) -> Optional[bytes]:
+        # resolves the tree of the subdir at the head of the branch. the result is
+        # reused until the branch moves.
+        try:
+            commit_id = self.repo.refs[self._refname]
+        except KeyError:
+            return None
+
+        if self._resolved_head is None or self._resolved_head[0] != commit_id:
+            tree_id: Optional[bytes] = cast(Commit, self.repo[commit_id]).tree
+            if self.subdir:
+                tree_id = self._lookup_tree(tree_id, self._subdir_components)
+            self._resolved_head = (commit_id, tree_id)
+        return self._resolved_head[1]
+
+    def at(
+        self, commit_or_time: Union[bytes, str, float, datetime]
+    ) -> "GitSnapshotStore":
+        """Return a read-only view of the store as of a commit or point in time.
+
+        The snapshot shares the tree cache of this store. Points in time are looked up
+        in an index of the commit times of the branch, which is built on first use.
+
+        Parameters
+        ----------
+        commit_or_time : bytes or str or int or float or datetime
+            Hex SHA of a commit, or a point in time as a UNIX timestamp or ``datetime``.
+            For a point in time, the last commit on the branch made at or before it
+            is used.
+
+        Returns
+        -------
+        store : GitSnapshotStore
+            Read-only store of the keys at that commit.
+
+        Raises
+        ------
+        ValueError
+            If the commit does not exist or there is no commit at or before the point
+            in time.
+        """
+        if isinstance(commit_or_time, (bytes, str)):
+            if isinstance(commit_or_time, str):
+                commit_or_time = commit_or_time.encode("ascii")
+            return GitSnapshotStore(self, commit_or_time)
+
+        if isinstance(commit_or_time, datetime):
+            timestamp = commit_or_time.timestamp()
+        else:
+            timestamp = commit_or_time
+
+        commit_id = None
+        if self._refname in self.repo.refs:
+            self._commit_index.update(self.repo, self.repo.refs[self._refname])
+            commit_id = self._commit_index.find(timestamp)
+        if commit_id is None:
+            raise ValueError(f"No commit at or before {commit_or_time}")
+        return GitSnapshotStore(self, commit_id)
+
     def _create_top_commit(self):
         # get the top commit, create empty one if it does not exist
         commit = Commit()
@@ -134,110 +527,263 @@ class GitCommitStore(KeyValueStore):
 
         return commit
 
-    def _delete(self, key: str) -> None:
+    @contextmanager
+    def transaction(self, message: Optional[str] = None) -> Iterator["GitCommitStore"]:
+        """Batch all puts and deletes inside the ``with`` block into a single commit.
+
+        Changes are collected in memory and applied when the block is left, writing
+        every modified tree only once and moving the branch once. If the block raises
+        an exception, no commit is created. Reads inside the block return the state
+        of the last commit. Nested transactions are merged into the outermost one.
+
+        Parameters
+        ----------
+        message : str, optional
+            The commit message. Defaults to a summary of the number of changed keys.
+
+        Example
+        -------
+        >>> with store.transaction(message="Import data"):  # doctest: +SKIP
+        ...     for key, value in data.items():
+        ...         store.put(key, value)
+
+        """
+        if self._changes is not None:
+            yield self
+            return
+
+        self._changes = _TreeChanges()
+        self._num_changes = 0
         try:
-            commit = self.repo[self._refname]
-            tree = self.repo[commit.tree]
-        except KeyError:
-            return  # not-found key errors are ignored
-
-        commit = self._create_top_commit()
-        objects_to_add = []
-
+            yield self
+            changes = self._changes
+        except BaseException:
+            self._pending_blobs = []
+            raise
+        finally:
+            self._changes = None
+
+        if changes:
+            if message is None:
+                message = f"Updated {self._num_changes} keys"
+            self._commit(changes, message)
+
+    def commit_many(
+        self,
+        puts: Optional[Mapping[str, bytes]] = None,
+        deletes: Iterable[str] = (),
+        message: Optional[str] = None,
+    ) -> None:
+        """Store and delete many keys in a single commit.
+
+        Parameters
+        ----------
+        puts : dict, optional
+            Mapping of keys to the data to store at them.
+        deletes : iterable of str, optional
+            Keys to delete.
+        message : str, optional
+            The commit message.
+
+        Raises
+        ------
+        ValueError
+            If any of the keys is not valid.
+        IOError
+            If the data is not of type ``bytes``.
+        """
+        with self.transaction(message=message):
+            for key, data in (puts or {}).items():
+                self.put(key, data)
+            for key in deletes:
+                self.delete(key)
+
+    def _record(self, key: str, blob_id: Optional[bytes], message: str) -> None:
         components = self._key_components(key)
         if self.subdir:
             components = self._subdir_components + components
 
-        res = _on_tree(self.repo, tree, components, None)
-        objects_to_add.extend(res)
-        tree = res[-1]
+        with self.transaction(message=message):
+            assert self._changes is not None
+            self._changes.record(components, blob_id)
+            self._num_changes += 1
+
+    def _apply_changes(
+        self,
+        tree_id: Optional[bytes],
+        changes: _TreeChanges,
+        objects: List[Union[Tree, Commit]],
+    ) -> Optional[bytes]:
+        # returns the id of the new tree or None if it ended up empty. new trees are
+        # appended to objects, children before their parents.
+        if tree_id is None or changes.replace:
+            tree = Tree()
+        else:
+            tree = cast(Tree, self._trees[tree_id].copy())
+
+        for name, change in changes.items():
+            if isinstance(change, _TreeChanges):
+                subtree_id = None
+                if name in tree:
+                    mode, sha = tree[name]
+                    if mode == _TREE_MODE:
+                        subtree_id = sha
+                new_id = self._apply_changes(subtree_id, change, objects)
+                if new_id is not None:
+                    tree[name] = _TREE_MODE, cast("ObjectID", new_id)
+                elif name in tree:
+                    del tree[name]
+            elif change is None:
+                if name in tree:
+                    del tree[name]
+            else:
+                tree[name] = _BLOB_MODE, cast("ObjectID", change)
+
+        if not tree.items():
+            return None
+        objects.append(tree)
+        return tree.id
+
+    def _commit(self, changes: _TreeChanges, message: str) -> None:
+        commit = self._create_top_commit()
+        commit.message = message.encode("utf8")
 
-        commit.tree = tree.id
-        commit.message = ("Deleted key {}".format(self.subdir + "/" + key)).encode(
-            "utf8"
-        )
+        try:
+            parent_commit = cast(Commit, self.repo[self._refname])
+        except KeyError:
+            # branch does not exist, start with an empty tree
+            tree_id = None
+        else:
+            commit.parents = [parent_commit.id]
+            tree_id = parent_commit.tree
 
+        objects_to_add: List[Union[Tree, Commit]] = []
+        new_tree_id = self._apply_changes(tree_id, changes, objects_to_add)
+        if new_tree_id is None:
+            empty_tree = Tree()
+            objects_to_add.append(empty_tree)
+            new_tree_id = empty_tree.id
+
+        commit.tree = new_tree_id
         objects_to_add.append(commit)
 
+        # add objects
+        if self.pack:
+            objects = self._pending_blobs + objects_to_add
+            self.repo.object_store.add_objects([(obj, None) for obj in objects])
+            self._pending_blobs = []
+        else:
+            for obj in objects_to_add:
+                self.repo.object_store.add_object(obj)
+
         for obj in objects_to_add:
-            self.repo.object_store.add_object(obj)
+            if isinstance(obj, Tree):
+                self._trees.add(obj)
 
+        # update refs
         self.repo.refs[self._refname] = commit.id
 
-    def _get(self, key: str) -> bytes:
-        # might raise key errors, except block corrects param
-        try:
-            commit = self.repo[self._refname]
-            tree = self.repo[commit.tree]
-            fn = self.subdir + "/" + key
-            _, blob_id = tree.lookup_path(self.repo.__getitem__, fn.encode("ascii"))
-            blob = self.repo[blob_id]
-        except KeyError:
-            raise KeyError(key)
-
-        return blob.data
+    def _delete(self, key: str) -> None:
+        if self._changes is None and self._refname not in self.repo.refs:
+            return  # not-found key errors are ignored
 
-    def iter_keys(self, prefix: str = "") -> Iterator[str]:  # noqa D
-        try:
-            commit = self.repo[self._refname]
-            tree = self.repo[commit.tree]
+        self._record(key, None, "Deleted key {}".format(self.subdir + "/" + key))
 
-            if self.subdir:
-                tree = self.repo[
-                    tree.lookup_path(
-                        self.repo.__getitem__, self.subdir.encode("ascii")
-                    )[1]
-                ]
-        except KeyError:
-            pass
+    def _add_blob(self, blob: Blob) -> bytes:
+        if self.pack:
+            self._pending_blobs.append(blob)
         else:
-            for o in self.repo.object_store.iter_tree_contents(
-                tree.sha().hexdigest().encode("ascii")
-            ):
-                if o.path.decode("ascii").startswith(prefix):
-                    yield o.path.decode("ascii")
+            # blobs are added right away, only trees and commits wait for the commit
+            self.repo.object_store.add_object(blob)
+        return blob.id
 
-    def _open(self, key: str) -> IO:
-        return BytesIO(self._get(key))
+    def _add_blob_from_file(self, file: IO) -> bytes:
+        objects_path = getattr(self.repo.object_store, "path", None)
+        if self.pack or objects_path is None:
+            return self._add_blob(Blob.from_string(file.read()))
+
+        try:
+            start = file.tell()
+            size = file.seek(0, io.SEEK_END) - start
+            file.seek(start)
+        except (AttributeError, OSError, ValueError):
+            # the size is needed before writing, so unseekable files are spooled first
+            with tempfile.SpooledTemporaryFile(max_size=self.bufsize) as spool:
+                while True:
+                    buf = file.read(self.bufsize)
+                    if not buf:
+                        break
+                    spool.write(buf)
+                size = spool.tell()
+                spool.seek(0)
+                return _write_loose_blob(objects_path, spool, size, self.bufsize)
+
+        return _write_loose_blob(objects_path, file, size, self.bufsize)
 
     def _put_file(self, key: str, file: IO) -> str:
-        # FIXME: it may be worth to try to move large files directly into the
-        #        store here
-        return self._put(key, file.read())
+        blob_id = self._add_blob_from_file(file)
+        self._record(key, blob_id, "Updated key {}".format(self.subdir + "/" + key))
+        return key
 
     def _put(self, key: str, data: bytes) -> str:
-        commit = self._create_top_commit()
-        commit.message = ("Updated key {}".format(self.subdir + "/" + key)).encode(
-            "utf8"
-        )
+        if isinstance(data, memoryview):
+            return self._put_file(key, _buffer_file(data))
+        blob_id = self._add_blob(Blob.from_string(data))
+        self._record(key, blob_id, "Updated key {}".format(self.subdir + "/" + key))
+        return key
 
-        blob = Blob.from_string(data)
+    def repack(self) -> int:
+        """Pack all loose objects and existing packs of the repository into one pack.
 
-        try:
-            parent_commit = self.repo[self._refname]
-        except KeyError:
-            # branch does not exist, start with an empty tree
-            tree = Tree()
-        else:
-            commit.parents = [parent_commit.id]
-            tree = self.repo[parent_commit.tree]
+        Loose objects accumulate with every put. Reads get slower the more loose
+        objects and packs there are, so this should be called periodically.
 
-        objects_to_add = [blob]
+        Returns
+        -------
+        int
+            The number of objects that were packed.
 
-        components = self._key_components(key)
-        if self.subdir:
-            components = self._subdir_components + components
-        res = _on_tree(self.repo, tree, components, blob)
-        objects_to_add.extend(res)
+        """
+        return self.repo.object_store.repack()
 
-        commit.tree = res[-1].id
-        objects_to_add.append(commit)
 
-        # add objects
-        for obj in objects_to_add:
-            self.repo.object_store.add_object(obj)
+class GitSnapshotStore(_GitTreeStore):
+    """Read-only view of a :class:`GitCommitStore` at a single commit.
 
-        # update refs
-        self.repo.refs[self._refname] = commit.id
+    Use :meth:`GitCommitStore.at` to create snapshots. Writing to a snapshot raises
+    :exc:`NotImplementedError`.
 
-        return key
+    Parameters
+    ----------
+    store : GitCommitStore
+        The store to take the snapshot of.
+    commit_id : bytes
+        Hex SHA of the commit.
+
+    """
+
+    def __init__(self, store: GitCommitStore, commit_id: bytes):
+        self.repo = store.repo
+        self.subdir = store.subdir
+        self.commit_id = commit_id
+        self._store = store
+        self._trees = store._trees
+
+        try:
+            commit = self.repo[commit_id]
+        except (KeyError, ValueError):
+            raise ValueError(f"Unknown commit {commit_id!r}")
+        if not isinstance(commit, Commit):
+            raise ValueError(f"{commit_id!r} is not a commit")
+
+        self._tree_id: Optional[bytes] = commit.tree
+        if self.subdir:
+            self._tree_id = self._lookup_tree(self._tree_id, self._subdir_components)
+
+    def _check_valid_key(self, key: str) -> None:
+        # keys are valid if they are valid for the store, e.g. if it uses the
+        # extended keyspace
+        self._store._check_valid_key(key)
+
+    def _root_tree_id(self) -> Optional[bytes]:
+        return self._tree_id
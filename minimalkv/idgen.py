@@ -18,9 +18,172 @@ import hashlib
 import os
 import tempfile
 import uuid
-from typing import IO, Optional, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterator, Optional, Set, Union, cast
+
+from minimalkv._mixins import CopyMixin
+from minimalkv.decorator import KeyTransformingDecorator, StoreDecorator
+
+
+def _iter_chunks(file: IO, bufsize: int) -> Iterator[Union[bytes, memoryview]]:
+    # yield the data of file in chunks of up to bufsize bytes, reading into a single
+    # reused buffer if possible; a chunk is only valid until the next one is read
+    readinto = getattr(file, "readinto", None)
+    if readinto is None:
+        while True:
+            buf = file.read(bufsize)
+            if not buf:
+                break
+            yield buf
+        return
+
+    buf = bytearray(bufsize)
+    view = memoryview(buf)
+    while True:
+        n = readinto(buf)
+        if not n:
+            break
+        yield view[:n]
+
+
+class Blake2bTreeHash:
+    """BLAKE2b tree hash that hashes large data on several cores.
+
+    The data is split into leaves of ``leaf_size`` bytes, which are hashed in
+    parallel using the tree hashing mode of :func:`hashlib.blake2b`. The digests of
+    the leaves are hashed into the root node. The object provides the interface of
+    the :mod:`hashlib` hash objects used by :class:`HashDecorator`, e.g.
+    ``HashDecorator(store, hashfunc=Blake2bTreeHash)``.
+
+    The digest of data differs from the plain BLAKE2b digest and depends on
+    ``leaf_size`` and ``digest_size``, but not on how the data is passed to
+    :meth:`update` or the number of threads.
 
-from minimalkv.decorator import StoreDecorator
+    Parameters
+    ----------
+    data : bytes, optional
+        Initial data to hash.
+    leaf_size : int, optional, default = 1024 * 1024
+        Size of the leaves in bytes.
+    digest_size : int, optional, default = 32
+        Size of the digest in bytes.
+    max_workers : int or None, optional, default = None
+        Number of threads hashing leaves, ``os.cpu_count()`` if ``None``.
+
+    """
+
+    name = "blake2b-tree"
+
+    def __init__(
+        self,
+        data: bytes = b"",
+        leaf_size: int = 1024 * 1024,
+        digest_size: int = 32,
+        max_workers: Optional[int] = None,
+    ):
+        self.leaf_size = leaf_size
+        self.digest_size = digest_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        self._pending = bytearray()
+        self._leaves = 0
+        # the digests of the leaves are hashed into the root node in order, leaves
+        # being hashed by the executor are kept as futures
+        self._root = self._node(1, 0, True)
+        self._futures: deque = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._digest: Optional[bytes] = None
+
+        self.update(data)
+
+    def _node(self, depth: int, offset: int, last: bool):
+        return hashlib.blake2b(
+            digest_size=self.digest_size if depth else 64,
+            fanout=0,
+            depth=2,
+            leaf_size=self.leaf_size,
+            node_offset=offset,
+            node_depth=depth,
+            inner_size=64,
+            last_node=last,
+        )
+
+    def _hash_leaf(self, offset: int, data: bytes, last: bool) -> bytes:
+        node = self._node(0, offset, last)
+        node.update(data)
+        return node.digest()
+
+    def _collect(self, limit: int) -> None:
+        # hash finished leaves into the root, until at most limit are in flight
+        while len(self._futures) > limit:
+            self._root.update(self._futures.popleft().result())
+
+    def update(self, data) -> None:
+        """Hash ``data`` in addition to the data hashed so far."""
+        if self._digest is not None:
+            raise ValueError("Cannot update a finalized hash")
+        self._pending += data
+
+        # the last leaf is only known when the digest is requested, hence a leaf
+        # is only hashed once data beyond it is available
+        while len(self._pending) > self.leaf_size:
+            leaf = bytes(self._pending[: self.leaf_size])
+            del self._pending[: self.leaf_size]
+
+            if self.max_workers > 1:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+                self._futures.append(
+                    self._executor.submit(self._hash_leaf, self._leaves, leaf, False)
+                )
+                # bound the memory held by leaves waiting to be hashed
+                self._collect(2 * self.max_workers)
+            else:
+                self._root.update(self._hash_leaf(self._leaves, leaf, False))
+            self._leaves += 1
+
+    def digest(self) -> bytes:
+        """Return the digest of the data hashed so far."""
+        if self._digest is None:
+            self._collect(0)
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            self._root.update(self._hash_leaf(self._leaves, self._pending, True))
+            self._digest = self._root.digest()
+            self._pending = bytearray()
+        return self._digest
+
+    def hexdigest(self) -> str:
+        """Return the digest as a string of hexadecimal digits."""
+        return self.digest().hex()
+
+
+def _moves_values(store) -> bool:
+    """Whether ``store.move`` renames keys without changing their values.
+
+    This is the case for stores supporting :meth:`~minimalkv._mixins.CopyMixin.move`
+    that are only wrapped in decorators transforming keys. Other decorators might
+    pass ``move`` through while their values depend on the key, e.g. if they are
+    signed or encrypted.
+    """
+    while isinstance(store, KeyTransformingDecorator):
+        store = store._dstore
+    return isinstance(store, CopyMixin)
+
+
+class _HashingReader:
+    """Read from ``source`` while updating ``phash`` with the data read."""
+
+    def __init__(self, source: IO, phash):
+        self.source = source
+        self.phash = phash
+
+    def read(self, n: int = -1) -> bytes:
+        buf = self.source.read(n)
+        self.phash.update(buf)
+        return buf
 
 
 class HashDecorator(StoreDecorator):
@@ -28,6 +191,20 @@ class HashDecorator(StoreDecorator):
 
     Overwrites :meth:`.KeyValueStore.put` and :meth:`.KeyValueStore.put_file`.
 
+    If ``staging_prefix`` is given and the decorated store supports
+    :meth:`~minimalkv._mixins.CopyMixin.move` with only decorators transforming keys
+    in between, :meth:`put_file` with a file-like object uploads the data to a
+    temporary key starting with ``staging_prefix`` while hashing it and moves it to
+    its final key afterwards. Otherwise, the data is written to a local temporary
+    file first.
+
+    If ``dedup`` is enabled, data whose hash key is already present in the decorated
+    store is not written again. Keys known to be present are cached locally, other
+    keys are looked up in the decorated store. The cache assumes that keys are only
+    deleted through this decorator. The number of bytes not written is counted in
+    :attr:`bytes_saved`. Data uploaded in a single pass is always transferred, an
+    existing key is merely not overwritten.
+
     Parameters
     ----------
     decorated_store : KeyValueStore
@@ -36,15 +213,53 @@ class HashDecorator(StoreDecorator):
         Function used for hashing.
     template : str, optional, default = u"{}"
         Template to format hashes.
+    bufsize : int, optional, default = 1024 * 1024
+        Size of the chunks in which files are read for hashing.
+    staging_prefix : str or None, optional, default = None
+        Prefix of the temporary keys used to upload data in a single pass.
+    dedup : bool, optional, default = False
+        Skip writing data that is already stored.
 
     """
 
-    def __init__(self, decorated_store, hashfunc=hashlib.sha1, template="{}"):
+    def __init__(
+        self,
+        decorated_store,
+        hashfunc=hashlib.sha1,
+        template="{}",
+        staging_prefix: Optional[str] = None,
+        dedup: bool = False,
+        bufsize: int = 1024 * 1024,
+    ):
 
         self.hashfunc = hashfunc
         self._template = template
+        self.bufsize = bufsize
+        self.staging_prefix = staging_prefix
+        self.dedup = dedup
+        #: Number of bytes not written as they were already stored.
+        self.bytes_saved = 0
+        self._known_keys: Set[str] = set()
         super().__init__(decorated_store)
 
+    def _is_stored(self, key: str) -> bool:
+        if not self.dedup:
+            return False
+        if key not in self._known_keys:
+            if key not in self._dstore:
+                return False
+            self._known_keys.add(key)
+        return True
+
+    def _stored(self, key: str) -> str:
+        if self.dedup:
+            self._known_keys.add(key)
+        return key
+
+    def delete(self, key: str, *args, **kwargs):  # noqa D
+        self._known_keys.discard(key)
+        return self._dstore.delete(key, *args, **kwargs)
+
     def put(self, key: Optional[str], data: bytes, *args, **kwargs):
         """Store bytestring data at key.
 
@@ -70,6 +285,12 @@ class HashDecorator(StoreDecorator):
         """
         if key is None:
             key = self._template.format(self.hashfunc(data).hexdigest())
+            if self._is_stored(key):
+                self.bytes_saved += len(data)
+                return key
+            return self._stored(
+                self._dstore.put(key, data, *args, **kwargs)  # type: ignore
+            )
 
         return self._dstore.put(key, data, *args, **kwargs)  # type: ignore
 
@@ -103,40 +324,43 @@ class HashDecorator(StoreDecorator):
             If there was a problem moving the file in.
 
         """
-        bufsize = 1024 * 1024
         phash = self.hashfunc()
+        size = 0
 
         if key is None:
             if isinstance(file, str):
                 with open(file, "rb") as source:
-                    while True:
-                        buf = source.read(bufsize)
+                    for buf in _iter_chunks(source, self.bufsize):
                         phash.update(buf)
-
-                        if len(buf) < bufsize:
-                            break
-
-                    return self._dstore.put_file(
-                        self._template.format(phash.hexdigest()), file, *args, **kwargs
-                    )  # type: ignore
+                        size += len(buf)
+
+                    key = self._template.format(phash.hexdigest())
+                    if self._is_stored(key):
+                        self.bytes_saved += size
+                        return key
+                    return self._stored(
+                        self._dstore.put_file(key, file, *args, **kwargs)  # type: ignore
+                    )
+            elif self.staging_prefix is not None and _moves_values(self._dstore):
+                return self._put_file_staged(file, *args, **kwargs)
             else:
                 tmpfile = tempfile.NamedTemporaryFile(delete=False)
                 try:
-                    while True:
-                        buf = file.read(bufsize)
+                    for buf in _iter_chunks(file, self.bufsize):
                         phash.update(buf)
                         tmpfile.write(buf)
-
-                        if len(buf) < bufsize:
-                            break
+                        size += len(buf)
 
                     tmpfile.close()
-                    return self._dstore.put_file(
-                        self._template.format(phash.hexdigest()),
-                        tmpfile.name,
-                        *args,
-                        **kwargs,
-                    )  # type: ignore
+                    key = self._template.format(phash.hexdigest())
+                    if self._is_stored(key):
+                        self.bytes_saved += size
+                        return key
+                    return self._stored(
+                        self._dstore.put_file(  # type: ignore
+                            key, tmpfile.name, *args, **kwargs
+                        )
+                    )
                 finally:
                     try:
                         os.unlink(tmpfile.name)
@@ -147,6 +371,24 @@ class HashDecorator(StoreDecorator):
                             raise
         return self._dstore.put_file(key, file, *args, **kwargs)  # type: ignore
 
+    def _put_file_staged(self, file: IO, *args, **kwargs) -> str:
+        phash = self.hashfunc()
+        staging_key = f"{self.staging_prefix}{uuid.uuid4().hex}"
+
+        try:
+            # the data is hashed while the decorated store reads it
+            self._dstore.put_file(  # type: ignore
+                staging_key, cast(IO, _HashingReader(file, phash)), *args, **kwargs
+            )
+            key = self._template.format(phash.hexdigest())
+            if self._is_stored(key):
+                self._dstore.delete(staging_key)
+                return key
+            return self._stored(self._dstore.move(staging_key, key))  # type: ignore
+        except BaseException:
+            self._dstore.delete(staging_key)
+            raise
+
 
 class UUIDDecorator(StoreDecorator):
     """UUID generating decorator.
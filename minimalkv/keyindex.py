@@ -0,0 +1,296 @@
+"""
+Serve key listings from a local index.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.keyindex import KeyIndexDecorator
+>>>
+>>> store = KeyIndexDecorator(DictStore())
+>>> key = store.put('a_b', b'value')
+>>> key = store.put('c', b'value')
+>>> list(store.iter_prefixes('_'))
+['a_', 'c']
+"""
+
+import sqlite3
+import threading
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from minimalkv._key_value_store import KeyPage, _key_page
+from minimalkv.decorator import StoreDecorator
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    # smallest string larger than all strings starting with prefix
+    while prefix:
+        if ord(prefix[-1]) < 0x10FFFF:
+            return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+class KeyIndexDecorator(StoreDecorator):
+    """Decorator keeping a sorted index of the keys in SQLite.
+
+    ``iter_keys``, ``keys`` and ``iter_prefixes`` are answered from the index with
+    range scans and return keys in sorted order. ``iter_prefixes`` only needs one
+    lookup per prefix, regardless of the number of keys sharing it. The index is
+    updated by ``put``, ``put_file``, ``copy``, ``move`` and ``delete``.
+
+    A new index is filled from the keys in the decorated store on first use. As the
+    index only knows about writes done through this decorator, :meth:`reconcile`
+    has to be called to pick up changes made otherwise.
+
+    Parameters
+    ----------
+    store : KeyValueStore
+        The store to decorate.
+    path : str, optional, default = ":memory:"
+        The SQLite database file holding the index. The default keeps the index in
+        memory.
+    page_size : int, optional, default = 1000
+        Number of keys read from the index at once.
+
+    """
+
+    def __init__(self, store, path: str = ":memory:", page_size: int = 1000):
+        super().__init__(store)
+        self.path = path
+        self.page_size = page_size
+
+        self._lock = threading.Lock()
+        # held while reconciling, which uses a single temporary table
+        self._reconcile_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value)"
+            )
+        self._reconciled = (
+            self._db.execute("SELECT 1 FROM meta WHERE name = 'reconciled'").fetchone()
+            is not None
+        )
+
+    def _execute(self, sql: str, *parameters) -> List[Tuple]:
+        if not self._reconciled:
+            with self._reconcile_lock:
+                # another thread might have reconciled while waiting
+                if not self._reconciled:
+                    self._reconcile()
+        with self._lock, self._db:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def reconcile(self) -> Tuple[int, int]:
+        """Update the index to the keys listed by the decorated store.
+
+        Keys written or deleted concurrently through this decorator may be
+        missing from or left in the index.
+
+        Returns
+        -------
+        (int, int)
+            Numbers of keys added to and removed from the index.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        with self._reconcile_lock:
+            return self._reconcile()
+
+    def _reconcile(self) -> Tuple[int, int]:
+        # must be called with the reconcile lock held
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS listing "
+                "(key TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            self._db.execute("DELETE FROM listing")
+
+        batch: List[Tuple[str]] = []
+        for key in self._dstore.iter_keys():
+            batch.append((key,))
+            if len(batch) >= self.page_size:
+                with self._lock, self._db:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO listing VALUES (?)", batch
+                    )
+                batch = []
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO listing VALUES (?)", batch)
+            removed = self._db.execute(
+                "DELETE FROM keys WHERE key NOT IN (SELECT key FROM listing)"
+            ).rowcount
+            added = self._db.execute(
+                "INSERT OR IGNORE INTO keys SELECT key FROM listing"
+            ).rowcount
+            self._db.execute("DROP TABLE listing")
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('reconciled', datetime('now'))"
+            )
+        self._reconciled = True
+        return added, removed
+
+    def close(self) -> None:
+        """Close the index database."""
+        self._db.close()
+
+    def _index(self, key: str) -> None:
+        self._execute("INSERT OR IGNORE INTO keys VALUES (?)", key)
+
+    def _unindex(self, key: str) -> None:
+        self._execute("DELETE FROM keys WHERE key = ?", key)
+
+    def _first_key(
+        self, start: str, end: Optional[str], inclusive: bool = True
+    ) -> Optional[str]:
+        # first key after start (or equal to it if inclusive) and before end
+        condition = "key >= ?" if inclusive else "key > ?"
+        bounds: Tuple[str, ...] = (start,)
+        if end is not None:
+            condition += " AND key < ?"
+            bounds += (end,)
+        rows = self._execute(
+            f"SELECT key FROM keys WHERE {condition} ORDER BY key LIMIT 1", *bounds
+        )
+        return rows[0][0] if rows else None
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        """Iterate over all keys in the store starting with prefix, in sorted order.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+        """
+        end = _prefix_end(prefix)
+        condition = "key >= ?" if end is None else "key >= ? AND key < ?"
+        bounds = (prefix,) if end is None else (prefix, end)
+
+        rows = self._execute(
+            f"SELECT key FROM keys WHERE {condition} ORDER BY key LIMIT ?",
+            *bounds,
+            self.page_size,
+        )
+        while rows:
+            for (key,) in rows:
+                yield key
+            rows = self._execute(
+                f"SELECT key FROM keys WHERE {condition} AND key > ? "
+                "ORDER BY key LIMIT ?",
+                *bounds,
+                rows[-1][0],
+                self.page_size,
+            )
+
+    def list_page(
+        self,
+        prefix: str = "",
+        start_after: Optional[str] = None,
+        limit: int = 1000,
+        token: Optional[str] = None,
+    ) -> KeyPage:
+        """List one page of the keys starting with prefix, in ascending order.
+
+        The token is the last key of the page.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only list keys starting with prefix. List all keys if empty.
+        start_after : str, optional
+            Only list keys after this one.
+        limit : int, optional, default = 1000
+            Maximum number of keys in the page.
+        token : str, optional
+            The continuation token of the previous page.
+        """
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        if start_after is not None and token is not None:
+            raise ValueError("Only one of start_after and token can be given")
+        if token is not None:
+            start_after = token
+
+        end = _prefix_end(prefix)
+        condition = "key >= ?" if end is None else "key >= ? AND key < ?"
+        bounds: Tuple[str, ...] = (prefix,) if end is None else (prefix, end)
+        if start_after is not None:
+            condition += " AND key > ?"
+            bounds += (start_after,)
+        rows = self._execute(
+            f"SELECT key FROM keys WHERE {condition} ORDER BY key LIMIT ?",
+            *bounds,
+            limit + 1,
+        )
+        return _key_page([key for (key,) in rows], limit)
+
+    def iter_prefixes(self, delimiter: str, prefix: str = "") -> Iterator[str]:
+        """Iterate over unique prefixes up to delimiter starting with prefix, in sorted order.
+
+        Parameters
+        ----------
+        delimiter : str
+            Delimiter up to which to iterate over prefixes.
+        prefix : str, optional, default = ''
+            Only iterate over prefixes starting with prefix.
+        """
+        end = _prefix_end(prefix)
+        key = self._first_key(prefix, end)
+        while key is not None:
+            pos = key.find(delimiter, len(prefix))
+            if pos < 0:
+                yield key
+                key = self._first_key(key, end, inclusive=False)
+                continue
+
+            found = key[: pos + len(delimiter)]
+            yield found
+            # skip all other keys starting with found
+            skip_to = _prefix_end(found)
+            if skip_to is None:
+                break
+            key = self._first_key(skip_to, end)
+
+    def keys(self, prefix: str = "") -> List[str]:  # noqa D
+        return list(self.iter_keys(prefix))
+
+    def __iter__(self) -> Iterator[str]:  # noqa D
+        return self.iter_keys()
+
+    def put(self, key: str, data: bytes, *args, **kwargs) -> str:  # noqa D
+        result = self._dstore.put(key, data, *args, **kwargs)
+        self._index(key)
+        return result
+
+    def put_file(  # noqa D
+        self, key: str, file: Union[str, IO], *args, **kwargs
+    ) -> str:
+        result = self._dstore.put_file(key, file, *args, **kwargs)
+        self._index(key)
+        return result
+
+    def put_stream(self, key: str, chunks: Iterable, *args, **kwargs) -> str:  # noqa D
+        result = self._dstore.put_stream(key, chunks, *args, **kwargs)
+        self._index(key)
+        return result
+
+    def copy(self, source: str, dest: str) -> str:  # noqa D
+        result = self._dstore.copy(source, dest)  # type: ignore
+        self._index(dest)
+        return result
+
+    def move(self, source: str, dest: str) -> str:  # noqa D
+        result = self._dstore.move(source, dest)  # type: ignore
+        self._unindex(source)
+        self._index(dest)
+        return result
+
+    def delete(self, key: str, *args, **kwargs) -> Optional[str]:  # noqa D
+        result = self._dstore.delete(key, *args, **kwargs)
+        self._unindex(key)
+        return result
@@ -1,7 +1,15 @@
+import hashlib
+import threading
 from io import BytesIO
 from typing import Dict, Iterator, Optional
 
-from minimalkv import CopyMixin, KeyValueStore
+from minimalkv import CopyMixin, KeyStat, KeyValueStore
+from minimalkv._key_value_store import _check_precondition
+
+
+def _etag(value: bytes) -> str:
+    # the MD5 digest of the value, like the ETag of S3 objects
+    return hashlib.md5(value).hexdigest()
 
 
 class DictStore(KeyValueStore, CopyMixin):
@@ -16,21 +24,71 @@ class DictStore(KeyValueStore, CopyMixin):
 
     def __init__(self, d: Optional[Dict[str, bytes]] = None):
         self.d = d or {}
+        # conditional writes check and change the dictionary under this lock, which
+        # other writes take as well
+        self._lock = threading.Lock()
+
+    def __getstate__(self):  # noqa D
+        # locks cannot be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):  # noqa D
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def _delete(self, key: str) -> None:
-        self.d.pop(key, None)
+        with self._lock:
+            self.d.pop(key, None)
+
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        with self._lock:
+            value = self.d.get(key)
+            _check_precondition(key, None if value is None else _etag(value), if_match)
+            del self.d[key]
 
     def _has_key(self, key: str) -> bool:
         return key in self.d
 
+    def _get(self, key: str) -> bytes:
+        return self.d[key]
+
+    def _get_into(self, key: str, view: memoryview) -> int:
+        data = self.d[key]
+        if len(data) > len(view):
+            raise ValueError(f"The value at {key} does not fit into the buffer")
+        view[: len(data)] = data
+        return len(data)
+
     def _open(self, key: str):
         return BytesIO(self.d[key])
 
+    def _stat(self, key: str) -> KeyStat:
+        value = self.d[key]
+        return KeyStat(key, len(value), etag=_etag(value))
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        return self.d[key][start:end]
+
     def _copy(self, source: str, dest: str) -> None:
-        self.d[dest] = self.d[source]
+        with self._lock:
+            self.d[dest] = self.d[source]
 
     def _put_file(self, key: str, file, *args, **kwargs) -> str:
-        self.d[key] = file.read()
+        data = file.read()
+        with self._lock:
+            self.d[key] = data
+        return key
+
+    def _put_conditional(
+        self, key: str, data: bytes, if_match: Optional[str], *args, **kwargs
+    ) -> str:
+        data = bytes(data)
+        with self._lock:
+            value = self.d.get(key)
+            _check_precondition(key, None if value is None else _etag(value), if_match)
+            self.d[key] = data
         return key
 
     def iter_keys(self, prefix: str = "") -> Iterator[str]:
@@ -7,9 +7,34 @@ if TYPE_CHECKING:
     from redis import StrictRedis
 
 from minimalkv._constants import FOREVER, NOT_SET
-from minimalkv._key_value_store import KeyValueStore
+from minimalkv._key_value_store import KeyStat, KeyValueStore, PreconditionFailed
 from minimalkv._mixins import TimeToLiveMixin
 
+# The ETag of a value is its SHA-1 digest. It is computed by Lua scripts on the server,
+# which also check the conditions of conditional writes atomically.
+_STAT_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value then return false end
+return {string.len(value), redis.sha1hex(value)}
+"""
+
+_PUT_IF_MATCH_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value or redis.sha1hex(value) ~= ARGV[1] then return 0 end
+if ARGV[3] == '' then
+    redis.call('SET', KEYS[1], ARGV[2])
+else
+    redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3])
+end
+return 1
+"""
+
+_DELETE_IF_MATCH_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if not value or redis.sha1hex(value) ~= ARGV[1] then return 0 end
+return redis.call('DEL', KEYS[1])
+"""
+
 
 class RedisStore(TimeToLiveMixin, KeyValueStore):
     """Uses a redis-database as the backend.
@@ -27,6 +52,12 @@ class RedisStore(TimeToLiveMixin, KeyValueStore):
     def _delete(self, key: str) -> int:
         return self.redis.delete(key)
 
+    def _delete_conditional(self, key: str, if_match: str) -> int:
+        delete = self.redis.register_script(_DELETE_IF_MATCH_SCRIPT)
+        if not delete(keys=[key], args=[if_match]):
+            raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+        return 1
+
     def keys(self, prefix: str = "") -> List[str]:
         """List all keys in the store starting with prefix.
 
@@ -65,6 +96,50 @@ class RedisStore(TimeToLiveMixin, KeyValueStore):
             raise KeyError(key)
         return val
 
+    def _stat(self, key: str) -> KeyStat:
+        stat = self.redis.register_script(_STAT_SCRIPT)
+        result = stat(keys=[key])
+        if result is None:
+            raise KeyError(key)
+        size, etag = result
+        return KeyStat(key, size, etag=etag.decode())
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        The sizes and ETags are requested in pipelined batches.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        """
+        stat = self.redis.register_script(_STAT_SCRIPT)
+        keys = self.keys(prefix)
+        batch_size = 1000
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            with self.redis.pipeline() as pipe:
+                for key in batch:
+                    stat(keys=[key], client=pipe)
+                results = pipe.execute()
+            for key, result in zip(batch, results):
+                # skip keys deleted in the meantime
+                if result is not None:
+                    size, etag = result
+                    yield KeyStat(key, size, etag=etag.decode())
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        # GETRANGE includes the end offset and returns b"" for missing keys
+        with self.redis.pipeline() as pipe:
+            pipe.exists(key)
+            pipe.getrange(key, start, -1 if end is None else end - 1)
+            exists, data = pipe.execute()
+        if not exists:
+            raise KeyError(key)
+        return data
+
     def _get_file(self, key: str, file: IO) -> str:
         file.write(self._get(key))
         return key
@@ -96,6 +171,29 @@ class RedisStore(TimeToLiveMixin, KeyValueStore):
 
         return key
 
+    def _put_conditional(
+        self,
+        key: str,
+        value: bytes,
+        if_match: Optional[str],
+        ttl_secs: Optional[Union[str, int, float]] = None,
+    ) -> str:
+        assert ttl_secs is not None
+        if ttl_secs in (NOT_SET, FOREVER):
+            px = None
+        else:
+            px = int(float(ttl_secs) * 1000)
+
+        if if_match is None:
+            if not self.redis.set(key, value, px=px, nx=True):
+                raise PreconditionFailed(f"The key {key} already exists")
+            return key
+
+        put = self.redis.register_script(_PUT_IF_MATCH_SCRIPT)
+        if not put(keys=[key], args=[if_match, value, "" if px is None else px]):
+            raise PreconditionFailed(f"The ETag of {key} does not match {if_match}")
+        return key
+
     def _put_file(
         self, key: str, file: IO, ttl_secs: Optional[Union[str, int, float]] = None
     ) -> str:
@@ -2,6 +2,7 @@
 
 import base64
 import hashlib
+import uuid
 
 
 def _file_md5(file_, b64encode=True):
@@ -36,3 +37,17 @@ def _byte_buffer_md5(buffer_, b64encode=True):
         return base64.b64encode(byte_digest).decode()
     else:
         return byte_digest
+
+
+def _block_ids():
+    """Generate the ids of the blocks of one upload.
+
+    The ids start with an id of the upload, so concurrent uploads to the same blob
+    do not stage blocks under the same ids. All ids have the same length, as
+    required by Azure, and are base64 encoded.
+    """
+    upload_id = uuid.uuid4().hex
+    index = 0
+    while True:
+        yield base64.b64encode(f"{upload_id}-{index:08d}".encode()).decode()
+        index += 1
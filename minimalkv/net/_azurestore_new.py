@@ -1,9 +1,18 @@
 """Implement the AzureBlockBlobStore for `azure-storage-blob~=12`."""
+import hashlib
 import io
 from contextlib import contextmanager
-
-from minimalkv._key_value_store import KeyValueStore
-from minimalkv.net._azurestore_common import _byte_buffer_md5, _file_md5
+from typing import List
+
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    _buffer_file,
+    _StreamReader,
+)
+from minimalkv.net._azurestore_common import _block_ids, _byte_buffer_md5, _file_md5
 from minimalkv.net._net_common import LAZY_PROPERTY_ATTR_PREFIX, lazy_property
 
 
@@ -23,6 +32,40 @@ def map_azure_exceptions(key=None, error_codes_pass=()):
         raise OSError(str(ex))
 
 
+@contextmanager
+def map_precondition_failed(key):
+    """Map the errors of conditional requests to PreconditionFailed."""
+    from azure.core.exceptions import AzureError
+
+    try:
+        yield
+    except AzureError as ex:
+        if getattr(ex, "error_code", None) in (
+            "ConditionNotMet",
+            "BlobAlreadyExists",
+            "BlobNotFound",
+        ):
+            raise PreconditionFailed(str(ex))
+        raise
+
+
+def _condition_args(if_match):
+    from azure.core import MatchConditions
+
+    if if_match is None:
+        return {"overwrite": False}
+    return {"etag": f'"{if_match}"', "match_condition": MatchConditions.IfNotModified}
+
+
+# size of the blocks staged by put_stream if max_block_size is not set
+_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def _blob_stat(key, properties):
+    etag = properties.etag.strip('"') if properties.etag else None
+    return KeyStat(key, properties.size, properties.last_modified, etag)
+
+
 class AzureBlockBlobStore(KeyValueStore):  # noqa D
     def __init__(
         self,
@@ -77,12 +120,27 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
         with map_azure_exceptions(key, error_codes_pass=("BlobNotFound",)):
             self.blob_container_client.delete_blob(key)
 
+    def _delete_conditional(self, key, if_match):
+        with map_azure_exceptions(key), map_precondition_failed(key):
+            self.blob_container_client.delete_blob(key, **_condition_args(if_match))
+
     def _get(self, key):
         with map_azure_exceptions(key):
             blob_client = self.blob_container_client.get_blob_client(key)
             downloader = blob_client.download_blob(max_concurrency=self.max_connections)
             return downloader.readall()
 
+    def _get_range(self, key, start, end):
+        length = None if end is None else end - start
+        with map_azure_exceptions(key, ("InvalidRange",)):
+            blob_client = self.blob_container_client.get_blob_client(key)
+            downloader = blob_client.download_blob(
+                start, length, max_concurrency=self.max_connections
+            )
+            return downloader.readall()
+        # start is beyond the end of the blob
+        return b""
+
     def _has_key(self, key):
         blob_client = self.blob_container_client.get_blob_client(key)
         with map_azure_exceptions(key, ("BlobNotFound",)):
@@ -101,6 +159,37 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
 
         return gen_names()
 
+    def _list_page(self, prefix, start_after, limit, token):
+        # The token is the continuation token of the listing. Blobs cannot be listed
+        # from a given name, so the pages up to start_after are skipped.
+        with map_azure_exceptions():
+            pages = self.blob_container_client.list_blobs(
+                name_starts_with=prefix or None, results_per_page=limit
+            ).by_page(continuation_token=token)
+            for page in pages:
+                keys = [blob.name for blob in page]
+                if start_after is not None:
+                    keys = [key for key in keys if key > start_after]
+                if keys or not pages.continuation_token:
+                    return KeyPage(keys, pages.continuation_token or None)
+        return KeyPage([])
+
+    def iter_stat(self, prefix=""):  # noqa D
+        with map_azure_exceptions():
+            blobs = self.blob_container_client.list_blobs(name_starts_with=prefix)
+
+        def gen_stats():  # noqa D
+            with map_azure_exceptions():
+                for blob in blobs:
+                    yield _blob_stat(blob.name, blob)
+
+        return gen_stats()
+
+    def _stat(self, key):
+        with map_azure_exceptions(key):
+            blob_client = self.blob_container_client.get_blob_client(key)
+            return _blob_stat(key, blob_client.get_blob_properties())
+
     def iter_prefixes(self, delimiter, prefix=""):  # noqa D
         return (
             blob_prefix.name
@@ -117,6 +206,10 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
     def _put(self, key, data):
         from azure.storage.blob import ContentSettings
 
+        if isinstance(data, memoryview):
+            # a memoryview would be taken for an iterable of chunks
+            return self._put_file(key, _buffer_file(data))
+
         if self.checksum:
             content_settings = ContentSettings(
                 content_md5=_byte_buffer_md5(data, b64encode=False)
@@ -156,6 +249,55 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
             )
         return key
 
+    def _put_conditional(self, key, data, if_match):
+        from azure.storage.blob import ContentSettings
+
+        if self.checksum:
+            content_settings = ContentSettings(
+                content_md5=_byte_buffer_md5(data, b64encode=False)
+            )
+        else:
+            content_settings = ContentSettings()
+
+        with map_azure_exceptions(key), map_precondition_failed(key):
+            blob_client = self.blob_container_client.get_blob_client(key)
+
+            blob_client.upload_blob(
+                _buffer_file(data) if isinstance(data, memoryview) else data,
+                content_settings=content_settings,
+                max_concurrency=self.max_connections,
+                **_condition_args(if_match),
+            )
+        return key
+
+    def _put_stream(self, key, chunks):
+        from azure.storage.blob import ContentSettings
+
+        # the blocks are staged one after another and committed at the end
+        block_size = self.max_block_size or _BLOCK_SIZE
+        stream = _StreamReader(chunks)
+        md5 = hashlib.md5() if self.checksum else None
+        block_ids: List[str] = []
+        new_block_id = _block_ids()
+        with map_azure_exceptions(key):
+            blob_client = self.blob_container_client.get_blob_client(key)
+            while True:
+                block = stream.read(block_size)
+                if not block:
+                    break
+                if md5 is not None:
+                    md5.update(block)
+                block_id = next(new_block_id)
+                blob_client.stage_block(block_id, block)
+                block_ids.append(block_id)
+
+            if md5 is not None:
+                content_settings = ContentSettings(content_md5=md5.digest())
+            else:
+                content_settings = ContentSettings()
+            blob_client.commit_block_list(block_ids, content_settings=content_settings)
+        return key
+
     def _get_file(self, key, file):
         with map_azure_exceptions(key):
             blob_client = self.blob_container_client.get_blob_client(key)
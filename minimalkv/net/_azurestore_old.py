@@ -1,9 +1,24 @@
 """Implement the AzureBlockBlobStore for ``azure-storage-blob<12``."""
+import base64
+import hashlib
 import io
 from contextlib import contextmanager
-
-from minimalkv._key_value_store import KeyValueStore
-from minimalkv.net._azurestore_common import _byte_buffer_md5, _file_md5, _filename_md5
+from typing import List
+
+from minimalkv._key_value_store import (
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    _buffer_file,
+    _StreamReader,
+)
+from minimalkv.net._azurestore_common import (
+    _block_ids,
+    _byte_buffer_md5,
+    _file_md5,
+    _filename_md5,
+)
 from minimalkv.net._net_common import LAZY_PROPERTY_ATTR_PREFIX, lazy_property
 
 
@@ -32,6 +47,35 @@ def map_azure_exceptions(key=None, exc_pass=()):
             raise OSError(str(ex))
 
 
+@contextmanager
+def map_precondition_failed(key):
+    """Map the errors of conditional requests to PreconditionFailed."""
+    from azure.common import AzureHttpError
+
+    try:
+        yield
+    except AzureHttpError as ex:
+        if ex.status_code in (412, 409, 404):
+            raise PreconditionFailed(str(ex))
+        raise
+
+
+def _condition_args(if_match):
+    if if_match is None:
+        return {"if_none_match": "*"}
+    return {"if_match": f'"{if_match}"'}
+
+
+# size of the blocks uploaded by put_stream if max_block_size is not set
+_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def _blob_stat(blob):
+    properties = blob.properties
+    etag = properties.etag.strip('"') if properties.etag else None
+    return KeyStat(blob.name, properties.content_length, properties.last_modified, etag)
+
+
 class AzureBlockBlobStore(KeyValueStore):  # noqa D
     def __init__(
         self,
@@ -83,6 +127,12 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
         with map_azure_exceptions(key=key, exc_pass=["AzureMissingResourceHttpError"]):
             self.block_blob_service.delete_blob(self.container, key)
 
+    def _delete_conditional(self, key, if_match):
+        with map_azure_exceptions(key=key), map_precondition_failed(key):
+            self.block_blob_service.delete_blob(
+                self.container, key, **_condition_args(if_match)
+            )
+
     def _get(self, key):
         with map_azure_exceptions(key=key):
             return self.block_blob_service.get_blob_to_bytes(
@@ -91,6 +141,24 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
                 max_connections=self.max_connections,
             ).content
 
+    def _get_range(self, key, start, end):
+        from azure.common import AzureHttpError
+
+        with map_azure_exceptions(key=key):
+            try:
+                return self.block_blob_service.get_blob_to_bytes(
+                    container_name=self.container,
+                    blob_name=key,
+                    start_range=start,
+                    end_range=None if end is None else end - 1,  # inclusive
+                    max_connections=self.max_connections,
+                ).content
+            except AzureHttpError as ex:
+                # start is beyond the end of the blob
+                if ex.status_code != 416:
+                    raise
+        return b""
+
     def _has_key(self, key):
         with map_azure_exceptions(key=key):
             return self.block_blob_service.exists(self.container, key)
@@ -107,6 +175,41 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
                 for blob in blobs
             )
 
+    def _list_page(self, prefix, start_after, limit, token):
+        # The token is the marker of the listing. Blobs cannot be listed from a given
+        # name, so the pages up to start_after are skipped.
+        marker = token
+        with map_azure_exceptions():
+            while True:
+                blobs = self.block_blob_service.list_blob_names(
+                    self.container,
+                    prefix=prefix or None,
+                    num_results=limit,
+                    marker=marker,
+                )
+                keys = [
+                    blob.decode("utf-8") if isinstance(blob, bytes) else blob
+                    for blob in blobs
+                ]
+                marker = blobs.next_marker or None
+                if start_after is not None:
+                    keys = [key for key in keys if key > start_after]
+                if keys or marker is None:
+                    return KeyPage(keys, marker)
+
+    def iter_stat(self, prefix=""):  # noqa D
+        with map_azure_exceptions():
+            blobs = self.block_blob_service.list_blobs(
+                self.container, prefix=prefix or None
+            )
+            return (_blob_stat(blob) for blob in blobs)
+
+    def _stat(self, key):
+        with map_azure_exceptions(key=key):
+            return _blob_stat(
+                self.block_blob_service.get_blob_properties(self.container, key)
+            )
+
     def iter_prefixes(self, delimiter, prefix=""):  # noqa D
         if prefix == "":
             prefix = None
@@ -128,6 +231,10 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
     def _put(self, key, data):
         from azure.storage.blob.models import ContentSettings
 
+        if isinstance(data, memoryview):
+            # the SDK only uploads bytes or streams
+            return self._put_file(key, _buffer_file(data))
+
         if self.checksum:
             content_settings = ContentSettings(content_md5=_byte_buffer_md5(data))
         else:
@@ -143,6 +250,26 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
             )
             return key
 
+    def _put_conditional(self, key, data, if_match):
+        from azure.storage.blob.models import ContentSettings
+
+        if self.checksum:
+            content_settings = ContentSettings(content_md5=_byte_buffer_md5(data))
+        else:
+            content_settings = ContentSettings()
+
+        with map_azure_exceptions(key=key), map_precondition_failed(key):
+            self.block_blob_service.create_blob_from_bytes(
+                container_name=self.container,
+                blob_name=key,
+                # the SDK only uploads bytes or streams
+                blob=bytes(data),
+                max_connections=self.max_connections,
+                content_settings=content_settings,
+                **_condition_args(if_match),
+            )
+            return key
+
     def _put_file(self, key, file):
         from azure.storage.blob.models import ContentSettings
 
@@ -161,6 +288,37 @@ class AzureBlockBlobStore(KeyValueStore):  # noqa D
             )
             return key
 
+    def _put_stream(self, key, chunks):
+        from azure.storage.blob.models import BlobBlock, ContentSettings
+
+        # the blocks are uploaded one after another and committed at the end
+        block_size = self.max_block_size or _BLOCK_SIZE
+        stream = _StreamReader(chunks)
+        md5 = hashlib.md5() if self.checksum else None
+        block_list: List[BlobBlock] = []
+        new_block_id = _block_ids()
+        with map_azure_exceptions(key=key):
+            while True:
+                block = stream.read(block_size)
+                if not block:
+                    break
+                if md5 is not None:
+                    md5.update(block)
+                block_id = next(new_block_id)
+                self.block_blob_service.put_block(self.container, key, block, block_id)
+                block_list.append(BlobBlock(id=block_id))
+
+            if md5 is not None:
+                content_settings = ContentSettings(
+                    content_md5=base64.b64encode(md5.digest()).decode()
+                )
+            else:
+                content_settings = ContentSettings()
+            self.block_blob_service.put_block_list(
+                self.container, key, block_list, content_settings=content_settings
+            )
+            return key
+
     def _get_file(self, key, file):
         with map_azure_exceptions(key=key):
             self.block_blob_service.get_blob_to_stream(
@@ -1,6 +1,13 @@
 LAZY_PROPERTY_ATTR_PREFIX = "_lazy_"
 
 
+def _range_header(start, end):
+    """Return the HTTP ``Range`` header for the bytes from start up to end."""
+    if end is None:
+        return f"bytes={start}-"
+    return f"bytes={start}-{end - 1}"
+
+
 def lazy_property(fn):
     """Decorate function to create a property that gets lazy-evaluated.
 
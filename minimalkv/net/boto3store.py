@@ -3,7 +3,16 @@ from contextlib import contextmanager
 from shutil import copyfileobj
 from typing import List
 
-from minimalkv import CopyMixin, KeyValueStore, UrlMixin
+from minimalkv import (
+    CopyMixin,
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    UrlMixin,
+)
+from minimalkv._key_value_store import _buffer_file, _StreamReader
+from minimalkv.net._net_common import _range_header
 
 
 def _public_readable(grants: List) -> bool:  # TODO: What kind of list
@@ -21,6 +30,11 @@ def _public_readable(grants: List) -> bool:  # TODO: What kind of list
     return False
 
 
+def _strip_etag(etag):
+    # S3 returns ETags in quotes
+    return etag.strip('"') if etag else None
+
+
 @contextmanager
 def map_boto3_exceptions(key=None, exc_pass=()):
     """Map boto3-specific exceptions to the minimalkv-API."""
@@ -35,6 +49,27 @@ def map_boto3_exceptions(key=None, exc_pass=()):
         raise OSError(str(ex))
 
 
+@contextmanager
+def map_precondition_failed(key):
+    """Map the errors of conditional requests to PreconditionFailed."""
+    from botocore.exceptions import ClientError
+
+    try:
+        yield
+    except ClientError as ex:
+        code = ex.response["Error"]["Code"]
+        # a concurrent conditional request on the same object conflicts with 409
+        if code in (
+            "PreconditionFailed",
+            "412",
+            "ConditionalRequestConflict",
+            "NoSuchKey",
+            "404",
+        ):
+            raise PreconditionFailed(str(ex))
+        raise
+
+
 class Boto3SimpleKeyFile(io.RawIOBase):  # noqa D
 
     # see: https://alexwlchan.net/2019/02/working-with-large-s3-objects/
@@ -89,6 +124,12 @@ class Boto3SimpleKeyFile(io.RawIOBase):  # noqa D
 
         return self.s3_object.get(Range=range_header)["Body"].read()
 
+    def readinto(self, b):  # noqa D
+        view = memoryview(b).cast("B")
+        data = self.read(len(view))
+        view[: len(data)] = data
+        return len(data)
+
     def readable(self):  # noqa D
         return True
 
@@ -128,15 +169,69 @@ class Boto3Store(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
                 self.bucket.objects.filter(Prefix=self.prefix + prefix),
             )
 
+    def iter_stat(self, prefix=""):  # noqa D
+        with map_boto3_exceptions():
+            prefix_len = len(self.prefix)
+            return map(
+                lambda o: KeyStat(
+                    o.key[prefix_len:], o.size, o.last_modified, _strip_etag(o.e_tag)
+                ),
+                self.bucket.objects.filter(Prefix=self.prefix + prefix),
+            )
+
+    def _list_page(self, prefix, start_after, limit, token):
+        parameters = {
+            "Bucket": self.bucket.name,
+            "Prefix": self.prefix + prefix,
+            "MaxKeys": limit,
+        }
+        if token is not None:
+            parameters["ContinuationToken"] = token
+        elif start_after is not None:
+            parameters["StartAfter"] = self.prefix + start_after
+        with map_boto3_exceptions():
+            response = self.bucket.meta.client.list_objects_v2(**parameters)
+        prefix_len = len(self.prefix)
+        return KeyPage(
+            [o["Key"][prefix_len:] for o in response.get("Contents", [])],
+            response.get("NextContinuationToken") if response["IsTruncated"] else None,
+        )
+
+    def _stat(self, key):
+        obj = self.__new_object(key)
+        with map_boto3_exceptions(key=key):
+            obj.load()
+        return KeyStat(
+            key, obj.content_length, obj.last_modified, _strip_etag(obj.e_tag)
+        )
+
     def _delete(self, key):
         self.bucket.Object(self.prefix + key).delete()
 
+    def _delete_conditional(self, key, if_match):
+        obj = self.__new_object(key)
+        with map_boto3_exceptions(key=key), map_precondition_failed(key):
+            obj.delete(IfMatch=f'"{if_match}"')
+
     def _get(self, key):
         obj = self.__new_object(key)
         with map_boto3_exceptions(key=key):
             obj = obj.get()
             return obj["Body"].read()
 
+    def _get_range(self, key, start, end):
+        from botocore.exceptions import ClientError
+
+        obj = self.__new_object(key)
+        with map_boto3_exceptions(key=key):
+            try:
+                return obj.get(Range=_range_header(start, end))["Body"].read()
+            except ClientError as ex:
+                # start is beyond the end of the object
+                if ex.response["Error"]["Code"] != "InvalidRange":
+                    raise
+        return b""
+
     def _get_file(self, key, file):
         obj = self.__new_object(key)
         with map_boto3_exceptions(key=key):
@@ -170,20 +265,47 @@ class Boto3Store(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
             self.__new_object(source).load()
             obj.copy_from(**parameters)
 
-    def _put(self, key, data):
-        obj = self.__new_object(key)
-        parameters = {"Body": data, "Metadata": self.metadata}
+    def __upload_args(self):
+        parameters = {"Metadata": self.metadata}
         if self.public:
             parameters["ACL"] = "public-read"
         if self.reduced_redundancy:
             parameters["StorageClass"] = "REDUCED_REDUNDANCY"
+        return parameters
+
+    def _put(self, key, data):
+        if isinstance(data, memoryview):
+            # botocore only takes bytes or files as body
+            data = _buffer_file(data)
+        obj = self.__new_object(key)
         with map_boto3_exceptions(key=key):
-            obj.put(**parameters)
+            obj.put(Body=data, **self.__upload_args())
         return key
 
     def _put_file(self, key, file):
         return self._put(key, file)
 
+    def _put_conditional(self, key, data, if_match):
+        if isinstance(data, memoryview):
+            data = _buffer_file(data)
+        parameters = self.__upload_args()
+        if if_match is None:
+            parameters["IfNoneMatch"] = "*"
+        else:
+            parameters["IfMatch"] = f'"{if_match}"'
+        obj = self.__new_object(key)
+        with map_boto3_exceptions(key=key), map_precondition_failed(key):
+            obj.put(Body=data, **parameters)
+        return key
+
+    def _put_stream(self, key, chunks):
+        # upload_fileobj reads the stream in parts and uploads them as a multipart
+        # upload if there is more than one
+        obj = self.__new_object(key)
+        with map_boto3_exceptions(key=key):
+            obj.upload_fileobj(_StreamReader(chunks), ExtraArgs=self.__upload_args())
+        return key
+
     def _put_filename(self, key, filename):
         with open(filename, "rb") as file:
             return self._put(key, file)
@@ -1,7 +1,22 @@
 from contextlib import contextmanager
-from typing import IO, Dict, Iterator, cast
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from typing import IO, Dict, Iterator, Optional, cast
 
-from minimalkv import CopyMixin, KeyValueStore, UrlMixin
+from minimalkv import (
+    CopyMixin,
+    KeyPage,
+    KeyStat,
+    KeyValueStore,
+    PreconditionFailed,
+    UrlMixin,
+)
+from minimalkv._key_value_store import _buffer_file, _StreamReader
+from minimalkv.net._net_common import _range_header
+
+# size of the parts of multipart uploads by put_stream, at least 5 MiB for S3
+_MULTIPART_SIZE = 8 * 1024 * 1024
 
 
 @contextmanager
@@ -20,6 +35,40 @@ def map_boto_exceptions(key=None, exc_pass=()):
             raise OSError(str(e))
 
 
+@contextmanager
+def map_precondition_failed(key):
+    """Map the errors of conditional requests to PreconditionFailed."""
+    from boto.exception import StorageResponseError
+
+    try:
+        yield
+    except StorageResponseError as e:
+        if e.status in (412, 404):
+            raise PreconditionFailed(str(e))
+        raise
+
+
+def _condition_headers(if_match: Optional[str]) -> Dict[str, str]:
+    if if_match is None:
+        return {"If-None-Match": "*"}
+    return {"If-Match": f'"{if_match}"'}
+
+
+def _parse_last_modified(value: Optional[str]) -> Optional[datetime]:
+    """Parse the modification time of a boto key.
+
+    Listings return ISO 8601 timestamps, HEAD requests HTTP dates.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ").replace(
+            tzinfo=timezone.utc
+        )
+    except ValueError:
+        return parsedate_to_datetime(value)
+
+
 class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
     def __init__(
         self,
@@ -80,6 +129,57 @@ class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
                 lambda k: k.name[prefix_len:], self.bucket.list(self.prefix + prefix)
             )
 
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        The metadata is taken from the bucket listing.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        with map_boto_exceptions():
+            return map(self.__key_stat, self.bucket.list(self.prefix + prefix))
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # the marker of the listing is the last key of the page
+        if token is not None:
+            start_after = token
+        marker = "" if start_after is None else self.prefix + start_after
+        with map_boto_exceptions():
+            result = self.bucket.get_all_keys(
+                prefix=self.prefix + prefix, marker=marker, max_keys=limit
+            )
+        keys = [k.name[len(self.prefix) :] for k in result]
+        return KeyPage(keys, keys[-1] if result.is_truncated and keys else None)
+
+    def __key_stat(self, k) -> KeyStat:
+        return KeyStat(
+            k.name[len(self.prefix) :],
+            k.size,
+            _parse_last_modified(k.last_modified),
+            k.etag.strip('"') if k.etag else None,
+        )
+
+    def _stat(self, key: str) -> KeyStat:
+        with map_boto_exceptions(key=key):
+            k = self.bucket.get_key(self.prefix + key)
+        if k is None:
+            raise KeyError(key)
+        return self.__key_stat(k)
+
     def _has_key(self, key: str) -> bool:
         with map_boto_exceptions(key=key):
             return bool(self.bucket.get_key(self.prefix + key))
@@ -93,11 +193,32 @@ class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
             if e.code != "NoSuchKey":
                 raise OSError(str(e))
 
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        with map_boto_exceptions(key=key), map_precondition_failed(key):
+            self.bucket.delete_key(
+                self.prefix + key, headers=_condition_headers(if_match)
+            )
+
     def _get(self, key: str) -> bytes:
         k = self.__new_key(key)
         with map_boto_exceptions(key=key):
             return k.get_contents_as_string()
 
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        from boto.exception import StorageResponseError
+
+        k = self.__new_key(key)
+        with map_boto_exceptions(key=key):
+            try:
+                return k.get_contents_as_string(
+                    headers={"Range": _range_header(start, end)}
+                )
+            except StorageResponseError as e:
+                # start is beyond the end of the object
+                if e.code != "InvalidRange":
+                    raise
+        return b""
+
     def _get_file(self, key: str, file: IO) -> str:
         k = self.__new_key(key)
         with map_boto_exceptions(key=key):
@@ -119,6 +240,12 @@ class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
                     size = self.key.size - self.location
                 return KeyFile.read(self, size)
 
+            def readinto(self, b):  # noqa D
+                view = memoryview(b).cast("B")
+                data = self.read(len(view))
+                view[: len(data)] = data
+                return len(data)
+
             def seekable(self):  # noqa D
                 return False
 
@@ -138,6 +265,9 @@ class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
             )
 
     def _put(self, key: str, data: bytes) -> str:
+        if isinstance(data, memoryview):
+            # boto only takes strings or files
+            return self._put_file(key, _buffer_file(data))
         k = self.__new_key(key)
         with map_boto_exceptions(key=key):
             k.set_contents_from_string(data, **self.__upload_args())
@@ -149,6 +279,38 @@ class BotoStore(KeyValueStore, UrlMixin, CopyMixin):  # noqa D
             k.set_contents_from_file(file, **self.__upload_args())
             return key
 
+    def _put_conditional(self, key: str, data: bytes, if_match: Optional[str]) -> str:
+        k = self.__new_key(key)
+        with map_boto_exceptions(key=key), map_precondition_failed(key):
+            k.set_contents_from_file(
+                _buffer_file(data),
+                headers=_condition_headers(if_match),
+                **self.__upload_args(),
+            )
+            return key
+
+    def _put_stream(self, key: str, chunks: Iterator) -> str:
+        stream = _StreamReader(chunks)
+        part = stream.read(_MULTIPART_SIZE)
+        if len(part) < _MULTIPART_SIZE:
+            return self._put(key, part)
+
+        with map_boto_exceptions(key=key):
+            upload = self.bucket.initiate_multipart_upload(
+                self.prefix + key, metadata=self.metadata, **self.__upload_args()
+            )
+            try:
+                part_num = 1
+                while part:
+                    upload.upload_part_from_file(BytesIO(part), part_num)
+                    part = stream.read(_MULTIPART_SIZE)
+                    part_num += 1
+                upload.complete_upload()
+            except BaseException:
+                upload.cancel_upload()
+                raise
+            return key
+
     def _put_filename(self, key: str, filename: str) -> str:
         k = self.__new_key(key)
         with map_boto_exceptions(key=key):
@@ -0,0 +1,311 @@
+"""
+Keep the same data in several stores.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.replication import ReplicatedStore
+>>>
+>>> store = ReplicatedStore([DictStore(), DictStore()])
+>>> key = store.put('key', b'value')
+>>> store.get('key')
+b'value'
+"""
+
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import IO, Callable, Iterator, List, Optional, Sequence, TypeVar
+
+from minimalkv._key_value_store import KeyPage, KeyStat, KeyValueStore, _nonempty_page
+from minimalkv._mixins import CopyMixin
+
+_T = TypeVar("_T")
+
+
+def _close_result(future: Future) -> None:
+    # close files opened by requests which lost the race
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class ReplicatedStore(KeyValueStore, CopyMixin):
+    """Store writing to several replicas and reading with hedged requests.
+
+    Writes are sent to all replicas concurrently and return once ``write_quorum``
+    of them succeeded, the others are completed in the background. With a quorum
+    smaller than the number of replicas, reads may thus return outdated values.
+
+    Reads are sent to the first (preferred) replica. If it did not answer after
+    the hedge delay, the same request is sent to the next replica, and the first
+    successful answer is used. The other request is cancelled if it did not start
+    yet, otherwise its result is discarded. If a replica fails or does not have the
+    key, the next one is tried immediately. Unless ``hedge_delay`` is given, the
+    delay is the ``hedge_percentile`` of recent read latencies of the preferred
+    replica, so about 5 % of the reads are hedged by default.
+
+    Keys and their metadata are listed from the preferred replica, using the next one
+    if it fails.
+
+    Parameters
+    ----------
+    stores : sequence of KeyValueStore
+        The replicas, the preferred one first.
+    write_quorum : int, optional
+        Number of replicas a write has to succeed on, all replicas by default.
+    hedge_delay : float, optional
+        Fixed delay in seconds after which reads are hedged.
+    hedge_percentile : float, optional, default = 95
+        Percentile of the read latencies used as the hedge delay.
+    initial_hedge_delay : float, optional, default = 0.05
+        Hedge delay in seconds until enough latencies were measured.
+    max_workers : int, optional
+        Number of threads accessing the replicas.
+
+    """
+
+    #: Number of recent read latencies the hedge delay is computed from.
+    latency_window = 1000
+    #: Number of read latencies needed before they are used.
+    min_latency_samples = 20
+
+    def __init__(
+        self,
+        stores: Sequence[KeyValueStore],
+        write_quorum: Optional[int] = None,
+        hedge_delay: Optional[float] = None,
+        hedge_percentile: float = 95,
+        initial_hedge_delay: float = 0.05,
+        max_workers: Optional[int] = None,
+    ):
+        if not stores:
+            raise ValueError("At least one store is required")
+        if write_quorum is None:
+            write_quorum = len(stores)
+        if not 0 < write_quorum <= len(stores):
+            raise ValueError(
+                f"write_quorum has to be between 1 and the number of stores, "
+                f"got {write_quorum}"
+            )
+        if not 0 < hedge_percentile <= 100:
+            raise ValueError("hedge_percentile has to be between 0 and 100")
+
+        self.stores = list(stores)
+        self.write_quorum = write_quorum
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self._latencies: deque = deque(maxlen=self.latency_window)
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    def current_hedge_delay(self) -> float:
+        """Return the delay in seconds after which reads are currently hedged.
+
+        Returns
+        -------
+        float
+            The delay.
+        """
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.min_latency_samples:
+            return self.initial_hedge_delay
+        index = round(self.hedge_percentile / 100 * (len(latencies) - 1))
+        return latencies[index]
+
+    def _timed(self, index: int, read: Callable):
+        start = time.monotonic()
+        result = read(self.stores[index])
+        # latencies of discarded requests count as well, they are the slow ones
+        if index == 0:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def _read(self, key: str, read: Callable, discard: Optional[Callable] = None):
+        replicas = iter(range(len(self.stores)))
+        pending = set()
+        errors: List[Exception] = []
+
+        def submit() -> None:
+            index = next(replicas, None)
+            if index is not None:
+                pending.add(self._executor.submit(self._timed, index, read))
+
+        submit()
+        timeout: Optional[float] = self.current_hedge_delay()
+        while pending:
+            done, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # the preferred replica is slow, send a hedged request
+                timeout = None
+                submit()
+                continue
+
+            for future in done:
+                try:
+                    result = future.result()
+                except (KeyError, OSError) as e:
+                    errors.append(e)
+                    submit()
+                    continue
+
+                for other in pending:
+                    if not other.cancel() and discard is not None:
+                        other.add_done_callback(discard)
+                for other in done:
+                    if other is not future and discard is not None:
+                        discard(other)
+                return result
+
+        if all(isinstance(e, KeyError) for e in errors):
+            raise KeyError(key)
+        raise next(e for e in errors if not isinstance(e, KeyError))
+
+    def _write(self, key: str, write: Callable) -> None:
+        futures = [self._executor.submit(write, store) for store in self.stores]
+        allowed_failures = len(self.stores) - self.write_quorum
+        succeeded = 0
+        errors: List[Exception] = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(e)
+                if len(errors) > allowed_failures:
+                    break
+            else:
+                succeeded += 1
+                if succeeded >= self.write_quorum:
+                    return
+
+        if all(isinstance(e, KeyError) for e in errors):
+            raise KeyError(key)
+        raise OSError(
+            f"Write quorum not reached for {key}, {len(errors)} of "
+            f"{len(self.stores)} replicas failed"
+        ) from errors[0]
+
+    def _has_key(self, key: str) -> bool:
+        def has_key(store):
+            # a replica missing the key may just be lagging behind, ask the next one
+            if key not in store:
+                raise KeyError(key)
+            return True
+
+        try:
+            return self._read(key, has_key)
+        except KeyError:
+            return False
+
+    def _delete(self, key: str) -> None:
+        self._write(key, lambda store: store.delete(key))
+
+    def _get(self, key: str) -> bytes:
+        return self._read(key, lambda store: store.get(key))
+
+    def _open(self, key: str) -> IO:
+        return self._read(key, lambda store: store.open(key), _close_result)
+
+    def _stat(self, key: str) -> KeyStat:
+        return self._read(key, lambda store: store.stat(key))
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        return self._read(key, lambda store: store.get_range(key, start, end))
+
+    def _put(self, key: str, data: bytes) -> str:
+        self._write(key, lambda store: store.put(key, data))
+        return key
+
+    def _put_file(self, key: str, file: IO) -> str:
+        # all replicas need the data at the same time
+        return self._put(key, file.read())
+
+    def _put_filename(self, key: str, filename: str) -> str:
+        self._write(key, lambda store: store.put_file(key, filename))
+        return key
+
+    def _copy(self, source: str, dest: str) -> str:
+        def copy(store):
+            if isinstance(store, CopyMixin):
+                return store.copy(source, dest)
+            return store.put(dest, store.get(source))
+
+        self._write(source, copy)
+        return dest
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        """Iterate over all keys in the store starting with prefix.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        return iter(self._list(lambda store: store.keys(prefix)))
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        return iter(self._list(lambda store: list(store.iter_stat(prefix))))
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # the token is the last key of the page, so any replica can continue listing
+        if token is not None:
+            start_after = token
+        page = self._list(
+            lambda store: _nonempty_page(store, prefix, start_after, limit)
+        )
+        return KeyPage(page.keys, page.keys[-1] if page.token is not None else None)
+
+    def iter_prefixes(self, delimiter: str, prefix: str = "") -> Iterator[str]:
+        """Iterate over unique prefixes in the store up to delimiter, starting with prefix.
+
+        Parameters
+        ----------
+        delimiter : str
+            Delimiter up to which to iterate over prefixes.
+        prefix : str, optional, default = ''
+            Only iterate over prefixes starting with prefix.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        return iter(
+            self._list(lambda store: list(store.iter_prefixes(delimiter, prefix)))
+        )
+
+    def _list(self, list_replica: Callable[[KeyValueStore], _T]) -> _T:
+        for store in self.stores[:-1]:
+            try:
+                return list_replica(store)
+            except OSError:
+                pass
+        return list_replica(self.stores[-1])
@@ -0,0 +1,430 @@
+"""
+Spread the keys of one store over several stores.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.sharding import ShardedStore
+>>>
+>>> store = ShardedStore([DictStore(), DictStore()])
+>>> key = store.put('key', b'value')
+>>> store.get('key')
+b'value'
+>>> store.add_shard('2', DictStore())
+>>> moved = store.rebalance()
+"""
+
+import bisect
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    IO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from minimalkv._key_value_store import KeyPage, KeyStat, KeyValueStore, _nonempty_page
+from minimalkv._mixins import CopyMixin
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class _Ring:
+    """Consistent hash ring with ``vnodes`` points per shard name."""
+
+    def __init__(self, names: Iterable[str], vnodes: int):
+        points = sorted(
+            (_hash(f"{name}#{i}"), name) for name in names for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._names = [name for _, name in points]
+
+    def lookup(self, key: str) -> str:
+        i = bisect.bisect_right(self._hashes, _hash(key))
+        return self._names[i % len(self._names)]
+
+
+class ShardedStore(KeyValueStore, CopyMixin):
+    """Store spreading keys over several stores using consistent hashing.
+
+    Every shard is placed on a hash ring at ``vnodes`` points derived from its name,
+    a key belongs to the shard owning the next point after the hash of the key. Shards
+    passed as a sequence are named by their position.
+
+    Listing keys and prefixes is done on all shards concurrently, the keys of every
+    shard are yielded once it finished listing them. :meth:`get_many` reads the keys
+    of each shard concurrently.
+
+    After adding a shard with :meth:`add_shard`, only the keys now belonging to it
+    have to be moved, which :meth:`rebalance` does. Until it finished, keys not yet
+    moved are read from the shard they belonged to before and writes remove the
+    value from there. Writes to a key concurrent with moving it may be lost.
+
+    Conditional writes and deletes check their condition on the shard the key belongs
+    to, they are only reliable for keys not waiting to be moved by :meth:`rebalance`.
+
+    Parameters
+    ----------
+    stores : sequence or mapping of KeyValueStore
+        The shards, by name if a mapping.
+    vnodes : int, optional, default = 64
+        Number of points on the hash ring per shard. More points spread keys more
+        evenly.
+    max_workers : int, optional
+        Number of threads accessing the shards concurrently.
+
+    """
+
+    def __init__(
+        self,
+        stores: Union[Sequence[KeyValueStore], Mapping[str, KeyValueStore]],
+        vnodes: int = 64,
+        max_workers: Optional[int] = None,
+    ):
+        if isinstance(stores, Mapping):
+            self._shards = dict(stores)
+        else:
+            self._shards = {str(i): store for i, store in enumerate(stores)}
+        if not self._shards:
+            raise ValueError("At least one store is required")
+        if vnodes < 1:
+            raise ValueError("vnodes must be positive")
+
+        self.vnodes = vnodes
+        self._ring = _Ring(self._shards, vnodes)
+        # the ring before shards were added, until the store is rebalanced
+        self._previous: Optional[_Ring] = None
+        self._executor = ThreadPoolExecutor(max_workers)
+
+    @property
+    def shards(self) -> Dict[str, KeyValueStore]:
+        """The shards by name."""
+        return dict(self._shards)
+
+    def shard_for(self, key: str) -> str:
+        """Return the name of the shard ``key`` belongs to.
+
+        Parameters
+        ----------
+        key : str
+            The key.
+
+        Returns
+        -------
+        str
+            Name of the shard.
+        """
+        return self._ring.lookup(key)
+
+    def add_shard(self, name: str, store: KeyValueStore) -> None:
+        """Add a shard.
+
+        Keys belonging to the new shard are still read from their previous shard until
+        :meth:`rebalance` moved them.
+
+        Parameters
+        ----------
+        name : str
+            Name of the shard, determines the keys belonging to it.
+        store : KeyValueStore
+            The new shard.
+
+        Raises
+        ------
+        ValueError
+            If there already is a shard of that name.
+        """
+        if name in self._shards:
+            raise ValueError(f"There already is a shard named {name!r}")
+        if self._previous is None:
+            self._previous = self._ring
+        self._shards[name] = store
+        self._ring = _Ring(self._shards, self.vnodes)
+
+    def rebalance(self) -> int:
+        """Move all keys not stored on the shard they belong to.
+
+        After adding a shard, this only moves the keys now belonging to it. All shards
+        are listed concurrently.
+
+        Returns
+        -------
+        int
+            Number of keys moved.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+
+        def rebalance_shard(name: str) -> int:
+            store = self._shards[name]
+            moved = 0
+            for key in store.keys():
+                owner = self._ring.lookup(key)
+                if owner == name:
+                    continue
+
+                target = self._shards[owner]
+                # the key may have been written to its new shard in the meantime
+                if key not in target:
+                    source = store.open(key)
+                    try:
+                        target.put_file(key, source)
+                    finally:
+                        source.close()
+                store.delete(key)
+                moved += 1
+            return moved
+
+        moved = sum(self._executor.map(rebalance_shard, list(self._shards)))
+        self._previous = None
+        return moved
+
+    def _stores_for(self, key: str) -> List[KeyValueStore]:
+        # the shard of key, followed by its previous shard if not rebalanced yet
+        owner = self._ring.lookup(key)
+        stores = [self._shards[owner]]
+        if self._previous is not None:
+            previous = self._previous.lookup(key)
+            if previous != owner:
+                stores.append(self._shards[previous])
+        return stores
+
+    def _read(self, key: str, read: Callable):
+        for store in self._stores_for(key):
+            try:
+                return read(store)
+            except KeyError:
+                pass
+        raise KeyError(key)
+
+    def _fan_out(self, list_shard: Callable[[KeyValueStore], Iterable]) -> Iterator:
+        futures = [
+            self._executor.submit(lambda s: list(list_shard(s)), store)
+            for store in self._shards.values()
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+    def _has_key(self, key: str) -> bool:
+        return any(key in store for store in self._stores_for(key))
+
+    def _delete(self, key: str) -> None:
+        for store in self._stores_for(key):
+            store.delete(key)
+
+    def _delete_conditional(self, key: str, if_match: str) -> None:
+        owner, *previous = self._stores_for(key)
+        owner.delete(key, if_match=if_match)
+
+    def _get(self, key: str) -> bytes:
+        return self._read(key, lambda store: store.get(key))
+
+    def _get_file(self, key: str, file: IO) -> str:
+        return self._read(key, lambda store: store.get_file(key, file))
+
+    def _get_filename(self, key: str, filename: str) -> str:
+        return self._read(key, lambda store: store.get_file(key, filename))
+
+    def _open(self, key: str) -> IO:
+        return self._read(key, lambda store: store.open(key))
+
+    def _stat(self, key: str) -> KeyStat:
+        return self._read(key, lambda store: store.stat(key))
+
+    def _get_into(self, key: str, view: memoryview) -> int:
+        return self._read(key, lambda store: store.get_into(key, view))
+
+    def _get_range(self, key: str, start: int, end: Optional[int]) -> bytes:
+        return self._read(key, lambda store: store.get_range(key, start, end))
+
+    def _put(self, key: str, data: bytes) -> str:
+        return self._write(key, lambda store: store.put(key, data))
+
+    def _put_file(self, key: str, file: IO) -> str:
+        return self._write(key, lambda store: store.put_file(key, file))
+
+    def _put_filename(self, key: str, filename: str) -> str:
+        return self._write(key, lambda store: store.put_file(key, filename))
+
+    def _put_stream(self, key: str, chunks: Iterator) -> str:
+        return self._write(key, lambda store: store.put_stream(key, chunks))
+
+    def _put_conditional(self, key: str, data: bytes, if_match: Optional[str]) -> str:
+        return self._write(
+            key,
+            lambda store: store.put(
+                key, data, if_match=if_match, if_none_match=if_match is None
+            ),
+        )
+
+    def _write(self, key: str, write: Callable) -> str:
+        owner, *previous = self._stores_for(key)
+        write(owner)
+        for store in previous:
+            store.delete(key)
+        return key
+
+    def _copy(self, source: str, dest: str) -> str:
+        stores = self._stores_for(source)
+        if (
+            len(stores) == 1
+            and stores == self._stores_for(dest)
+            and isinstance(stores[0], CopyMixin)
+        ):
+            return stores[0].copy(source, dest)
+
+        file = self._open(source)
+        try:
+            return self._put_file(dest, file)
+        finally:
+            file.close()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the data at several keys.
+
+        The keys are grouped by shard and the shards are read concurrently, using the
+        ``get_many`` method of shards providing one.
+
+        Parameters
+        ----------
+        keys : iterable of str
+            The keys to be read.
+
+        Returns
+        -------
+        dict
+            The data of every key as ``bytes``.
+
+        Raises
+        ------
+        ValueError
+            If one of the keys is not valid.
+        KeyError
+            If one of the keys was not found.
+        IOError
+            If there was an error accessing the store.
+        """
+        by_shard: Dict[str, List[str]] = {}
+        for key in keys:
+            self._check_valid_key(key)
+            by_shard.setdefault(self._ring.lookup(key), []).append(key)
+
+        def get_shard(name: str) -> Dict[str, bytes]:
+            get_many = getattr(self._shards[name], "get_many", None)
+            if self._previous is None and get_many is not None:
+                return get_many(by_shard[name])
+            return {key: self._get(key) for key in by_shard[name]}
+
+        result: Dict[str, bytes] = {}
+        for data in self._executor.map(get_shard, list(by_shard)):
+            result.update(data)
+        return result
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        """Iterate over all keys in the store starting with prefix.
+
+        The shards are listed concurrently, the order of the keys is undefined.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        keys = self._fan_out(lambda store: store.iter_keys(prefix))
+        if self._previous is None:
+            return keys
+        # keys are on two shards while being moved
+        return self._unique(keys)
+
+    def _list_page(
+        self,
+        prefix: str,
+        start_after: Optional[str],
+        limit: int,
+        token: Optional[str],
+    ) -> KeyPage:
+        # Every shard lists a page after the token, the last key of the previous page.
+        # The merged page ends at the first key a shard may have further keys after.
+        if token is not None:
+            start_after = token
+        pages = list(
+            self._executor.map(
+                lambda store: _nonempty_page(store, prefix, start_after, limit),
+                self._shards.values(),
+            )
+        )
+        bound = min(
+            (page.keys[-1] for page in pages if page.token is not None), default=None
+        )
+        # keys are on two shards while being moved
+        keys = sorted(
+            {k for page in pages for k in page.keys if bound is None or k <= bound}
+        )
+        if len(keys) > limit:
+            return KeyPage(keys[:limit], keys[limit - 1])
+        return KeyPage(keys, None if bound is None else keys[-1])
+
+    def iter_stat(self, prefix: str = "") -> Iterator[KeyStat]:
+        """Iterate over the metadata of all keys in the store starting with prefix.
+
+        The shards are listed concurrently, the order of the keys is undefined.
+
+        Parameters
+        ----------
+        prefix : str, optional, default = ''
+            Only iterate over keys starting with prefix. Iterate over all keys if empty.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        stats = self._fan_out(lambda store: store.iter_stat(prefix))
+        if self._previous is None:
+            return stats
+        # keys are on two shards while being moved
+        return self._unique(stats, key=lambda stat: stat.key)
+
+    def iter_prefixes(self, delimiter: str, prefix: str = "") -> Iterator[str]:
+        """Iterate over unique prefixes in the store up to delimiter, starting with prefix.
+
+        The shards are listed concurrently, the order of the prefixes is undefined.
+
+        Parameters
+        ----------
+        delimiter : str
+            Delimiter up to which to iterate over prefixes.
+        prefix : str, optional, default = ''
+            Only iterate over prefixes starting with prefix.
+
+        Raises
+        ------
+        IOError
+            If there was an error accessing the store.
+        """
+        return self._unique(
+            self._fan_out(lambda store: store.iter_prefixes(delimiter, prefix))
+        )
+
+    @staticmethod
+    def _unique(items: Iterable, key: Callable = lambda item: item) -> Iterator:
+        seen = set()
+        for item in items:
+            if key(item) not in seen:
+                seen.add(key(item))
+                yield item
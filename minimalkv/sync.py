@@ -0,0 +1,400 @@
+"""
+Copy or mirror the keys of one store to another.
+
+>>> from minimalkv.memory import DictStore
+>>> from minimalkv.sync import sync
+>>>
+>>> source, target = DictStore(), DictStore()
+>>> key = source.put('a', b'value')
+>>> sync(source, target).copied
+1
+>>> sync(source, target).skipped
+1
+
+The module can also be run to synchronize two stores given by URL, see
+:func:`~minimalkv.get_store_from_url`::
+
+    $ python -m minimalkv.sync hfs:///data/store s3://key:secret@endpoint/bucket
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from minimalkv._get_store import get_store_from_url
+from minimalkv._key_value_store import KeyStat, KeyValueStore
+
+#: Values of at least this many bytes are streamed from the source to the target
+#: with ``open`` and ``put_file`` instead of being read into memory.
+DEFAULT_STREAM_THRESHOLD = 16 * 1024 * 1024
+
+_COMPARE = ("etag", "size", "none")
+
+# outcomes of the work on a key
+_COPIED = "copied"
+_SKIPPED = "skipped"
+_DELETED = "deleted"
+_KEPT = "kept"
+
+# number of listed pages whose keys may be in the queue of the thread pool
+_MAX_PENDING_PAGES = 4
+
+
+class SyncResult(NamedTuple):
+    """Statistics of a synchronization, as returned by :func:`sync`.
+
+    Attributes
+    ----------
+    copied : int
+        Number of keys copied.
+    skipped : int
+        Number of keys not copied as they were unchanged or deleted from the source.
+    deleted : int
+        Number of keys deleted from the target.
+    bytes_copied : int
+        Total size of the values copied.
+    seconds : float
+        Time since the start of the synchronization.
+    """
+
+    copied: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    bytes_copied: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes copied per second."""
+        return self.bytes_copied / self.seconds if self.seconds > 0 else 0.0
+
+
+def _unchanged(
+    source_stat: KeyStat, target_stat: Optional[KeyStat], compare: str
+) -> bool:
+    if target_stat is None or source_stat.size != target_stat.size:
+        return False
+    if compare == "size":
+        return True
+    # ETags of different backends differ even for the same value, such values are
+    # copied again
+    return source_stat.etag is not None and source_stat.etag == target_stat.etag
+
+
+def _copy_key(
+    source: KeyValueStore,
+    target: KeyValueStore,
+    key: str,
+    compare: str,
+    stream_threshold: int,
+) -> Tuple[str, int]:
+    try:
+        source_stat = source.stat(key)
+        if compare != "none":
+            try:
+                target_stat: Optional[KeyStat] = target.stat(key)
+            except KeyError:
+                target_stat = None
+            if _unchanged(source_stat, target_stat, compare):
+                return _SKIPPED, 0
+
+        if source_stat.size >= stream_threshold:
+            file = source.open(key)
+            try:
+                target.put_file(key, file)
+            finally:
+                file.close()
+        else:
+            target.put(key, source.get(key))
+    except KeyError:
+        # deleted from the source since it was listed
+        return _SKIPPED, 0
+    return _COPIED, source_stat.size
+
+
+def _delete_key(
+    source: KeyValueStore, target: KeyValueStore, key: str
+) -> Tuple[str, int]:
+    if key in source:
+        return _KEPT, 0
+    target.delete(key)
+    return _DELETED, 0
+
+
+def _load_checkpoint(checkpoint: Optional[str], prefix: str) -> Dict:
+    state = {"prefix": prefix, "phase": "copy", "token": None}
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return state
+    with open(checkpoint) as f:
+        saved = json.load(f)
+    if saved.get("prefix") != prefix:
+        raise ValueError(
+            f"The checkpoint {checkpoint} is of a synchronization of the prefix "
+            f"{saved.get('prefix')!r}"
+        )
+    state.update(saved)
+    return state
+
+
+def _save_checkpoint(checkpoint: Optional[str], state: Dict) -> None:
+    if checkpoint is None:
+        return
+    # replaced at once, so an interrupted write does not lose the previous state
+    tmp = f"{checkpoint}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, checkpoint)
+
+
+def _run_pages(
+    executor: ThreadPoolExecutor,
+    store: KeyValueStore,
+    prefix: str,
+    token: Optional[str],
+    page_size: int,
+    task: Callable[[str], Tuple[str, int]],
+    page_done: Callable[[List[Tuple[str, int]], Optional[str]], None],
+) -> None:
+    """Run ``task`` on all keys of ``store`` starting with prefix, from ``token``.
+
+    Pages are listed while the keys of the previous ones are worked on. Once all keys
+    of a page and the pages before it are done, ``page_done`` is called with the
+    outcomes and the token of the next page.
+    """
+    pending: Deque[Tuple[List[Future], Optional[str]]] = deque()
+    try:
+        while True:
+            page = store.list_page(prefix, limit=page_size, token=token)
+            token = page.token
+            pending.append(([executor.submit(task, key) for key in page.keys], token))
+
+            while pending and (
+                token is None
+                or len(pending) > _MAX_PENDING_PAGES
+                or all(future.done() for future in pending[0][0])
+            ):
+                futures, page_token = pending.popleft()
+                page_done([future.result() for future in futures], page_token)
+            if token is None:
+                return
+    except BaseException:
+        for futures, _ in pending:
+            for future in futures:
+                future.cancel()
+        raise
+
+
+def sync(
+    source: KeyValueStore,
+    target: KeyValueStore,
+    prefix: str = "",
+    mirror: bool = False,
+    compare: str = "etag",
+    max_workers: int = 8,
+    checkpoint: Optional[str] = None,
+    stream_threshold: int = DEFAULT_STREAM_THRESHOLD,
+    page_size: int = 1000,
+    progress: Optional[Callable[[SyncResult], None]] = None,
+) -> SyncResult:
+    """Copy all keys starting with prefix from ``source`` to ``target``.
+
+    The keys are listed page by page with ``list_page`` and copied by a pool of
+    threads. Keys whose value is unchanged according to ``compare`` are skipped, so
+    running a synchronization again only copies what changed. With ``mirror``, keys
+    missing from the source are deleted from the target afterwards.
+
+    With a ``checkpoint`` file, the listing position is saved whenever all keys of a
+    page are done. A synchronization that failed or was interrupted continues from
+    there when run again with the same file, which is removed once it completes.
+
+    Parameters
+    ----------
+    source : KeyValueStore
+        The store to copy from.
+    target : KeyValueStore
+        The store to copy to.
+    prefix : str, optional, default = ''
+        Only synchronize keys starting with prefix.
+    mirror : bool, optional, default = False
+        Delete keys starting with prefix from the target which are not in the source.
+    compare : {'etag', 'size', 'none'}, optional, default = 'etag'
+        Skip keys of the same size and ETag (``'etag'``), of the same size
+        (``'size'``) or copy all keys (``'none'``). The ETags of different types of
+        stores usually differ, ``'etag'`` then copies all keys.
+    max_workers : int, optional, default = 8
+        Number of threads copying keys.
+    checkpoint : str, optional
+        Path of the file to save the progress in.
+    stream_threshold : int, optional, default = DEFAULT_STREAM_THRESHOLD
+        Values of at least this size are streamed instead of read into memory.
+    page_size : int, optional, default = 1000
+        Number of keys listed at once.
+    progress : callable, optional
+        Called with the :class:`SyncResult` so far whenever a page is done.
+
+    Returns
+    -------
+    SyncResult
+        Statistics of the synchronization.
+
+    Raises
+    ------
+    ValueError
+        If ``compare`` is invalid or the checkpoint is of another prefix.
+    IOError
+        If there was an error accessing the stores.
+    """
+    if compare not in _COMPARE:
+        raise ValueError(f"compare must be one of {', '.join(_COMPARE)}")
+
+    state = _load_checkpoint(checkpoint, prefix)
+    start = time.monotonic()
+    counts = {_COPIED: 0, _SKIPPED: 0, _DELETED: 0, _KEPT: 0}
+    bytes_copied = 0
+
+    def result() -> SyncResult:
+        return SyncResult(
+            counts[_COPIED],
+            counts[_SKIPPED],
+            counts[_DELETED],
+            bytes_copied,
+            time.monotonic() - start,
+        )
+
+    def page_done(outcomes: List[Tuple[str, int]], token: Optional[str]) -> None:
+        nonlocal bytes_copied
+        for outcome, size in outcomes:
+            counts[outcome] += 1
+            bytes_copied += size
+        # the end of a phase is saved by the caller
+        if token is not None:
+            state["token"] = token
+            _save_checkpoint(checkpoint, state)
+        if progress is not None:
+            progress(result())
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        if state["phase"] == "copy":
+            _run_pages(
+                executor,
+                source,
+                prefix,
+                state["token"],
+                page_size,
+                lambda key: _copy_key(source, target, key, compare, stream_threshold),
+                page_done,
+            )
+            state.update(phase="delete", token=None)
+            _save_checkpoint(checkpoint, state)
+
+        if mirror:
+            _run_pages(
+                executor,
+                target,
+                prefix,
+                state["token"],
+                page_size,
+                lambda key: _delete_key(source, target, key),
+                page_done,
+            )
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return result()
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def _format_result(result: SyncResult) -> str:
+    return (
+        f"{result.copied} copied ({_format_size(result.bytes_copied)}), "
+        f"{result.skipped} skipped, {result.deleted} deleted in "
+        f"{result.seconds:.1f} s, {_format_size(result.throughput)}/s"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Synchronize two stores given by URL from the command line.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        The arguments, ``sys.argv[1:]`` if not given.
+
+    Returns
+    -------
+    int
+        The exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="minimalkv-sync",
+        description="Copy or mirror the keys of one store to another.",
+    )
+    parser.add_argument("source", help="URL of the store to copy from")
+    parser.add_argument("target", help="URL of the store to copy to")
+    parser.add_argument("--prefix", default="", help="only copy keys with the prefix")
+    parser.add_argument(
+        "--mirror",
+        action="store_true",
+        help="delete keys from the target which are not in the source",
+    )
+    parser.add_argument(
+        "--compare",
+        choices=_COMPARE,
+        default="etag",
+        help="skip keys of the same size and ETag, of the same size or copy all keys",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="number of threads copying keys"
+    )
+    parser.add_argument(
+        "--checkpoint", help="file to save the progress in, to resume from it"
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=1000, help="number of keys listed at once"
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="only report the final statistics"
+    )
+    args = parser.parse_args(argv)
+
+    last_report = time.monotonic()
+
+    def report(result: SyncResult) -> None:
+        nonlocal last_report
+        if time.monotonic() - last_report >= 1:
+            last_report = time.monotonic()
+            print(_format_result(result), file=sys.stderr)
+
+    try:
+        result = sync(
+            get_store_from_url(args.source),
+            get_store_from_url(args.target),
+            prefix=args.prefix,
+            mirror=args.mirror,
+            compare=args.compare,
+            max_workers=args.workers,
+            checkpoint=args.checkpoint,
+            page_size=args.page_size,
+            progress=None if args.quiet else report,
+        )
+    except (OSError, ValueError) as e:
+        print(f"minimalkv-sync: error: {e}", file=sys.stderr)
+        return 1
+    print(_format_result(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,7 @@ setup(
     install_requires=["uritools"],
     python_requires=">=3.8",
     package_data={"minimalkv": ["py.typed"]},
+    entry_points={"console_scripts": ["minimalkv-sync = minimalkv.sync:main"]},
     classifiers=[
         "License :: OSI Approved :: BSD License",
         "Programming Language :: Python :: 3",
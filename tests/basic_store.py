@@ -1,11 +1,12 @@
 import os
 import tempfile
 import time
+from contextlib import contextmanager
 from io import BytesIO
 
 import pytest
 
-from minimalkv import CopyMixin
+from minimalkv import CopyMixin, KeyStat, PreconditionFailed
 from minimalkv.crypt import HMACDecorator
 from minimalkv.decorator import PrefixDecorator
 from minimalkv.idgen import HashDecorator, UUIDDecorator
@@ -18,6 +19,24 @@ def is_emulated_gcstore_test(store):
     )
 
 
+@contextmanager
+def conditional_writes():
+    try:
+        yield
+    except NotImplementedError:
+        pytest.skip("The store does not support conditional writes")
+
+
+def list_all_pages(store, prefix="", start_after=None, limit=1):
+    page = store.list_page(prefix, start_after=start_after, limit=limit)
+    keys = list(page.keys)
+    while page.token is not None:
+        assert len(page.keys) <= limit
+        page = store.list_page(prefix, limit=limit, token=page.token)
+        keys.extend(page.keys)
+    return keys
+
+
 class BasicStore:
     def test_store(self, store, key, value):
         new_key = store.put(key, value)
@@ -188,6 +207,42 @@ class BasicStore:
             if os.path.exists(tmp.name):
                 os.unlink(tmp.name)
 
+    def test_put_bytes_like(self, store, key, key2, value, value2):
+        store.put(key, bytearray(value))
+        store.put(key2, memoryview(value2))
+
+        assert store.get(key) == value
+        assert store.get(key2) == value2
+
+    def test_put_strided_memoryview(self, store, key, long_value):
+        store.put(key, memoryview(long_value)[::3])
+        assert store.get(key) == long_value[::3]
+
+    def test_put_numpy_array(self, store, key, long_value):
+        np = pytest.importorskip("numpy")
+        array = np.frombuffer(long_value, dtype=np.uint32)
+
+        store.put(key, array)
+        assert store.get(key) == long_value
+
+    def test_put_stream(self, store, key, long_value):
+        def chunks():
+            yield long_value[:10]
+            yield b""
+            yield bytearray(long_value[10:1000])
+            yield memoryview(long_value)[1000:]
+
+        assert store.put_stream(key, chunks()) == key
+        assert store.get(key) == long_value
+
+    def test_put_stream_empty(self, store, key):
+        store.put_stream(key, iter(()))
+        assert store.get(key) == b""
+
+    def test_put_stream_rejects_unicode(self, store, key, value):
+        with pytest.raises(IOError):
+            store.put_stream(key, [value, "text"])
+
     def test_delete(self, store, key, value):
         store.put(key, value)
 
@@ -326,6 +381,208 @@ class BasicStore:
         store.put(key, value)
         store.get(key)
 
+    def test_get_into(self, store, key, long_value):
+        store.put(key, long_value)
+
+        buffer = bytearray(len(long_value))
+        assert store.get_into(key, buffer) == len(long_value)
+        assert buffer == long_value
+
+        buffer = bytearray(len(long_value) + 10)
+        assert store.get_into(key, memoryview(buffer)) == len(long_value)
+        assert buffer[: len(long_value)] == long_value
+
+    def test_get_into_numpy_array(self, store, key, long_value):
+        np = pytest.importorskip("numpy")
+        store.put(key, long_value)
+
+        array = np.empty(len(long_value) // 4, dtype=np.uint32)
+        assert store.get_into(key, array) == len(long_value)
+        assert array.tobytes() == long_value
+
+    def test_get_into_too_small_buffer(self, store, key, value):
+        store.put(key, value)
+        with pytest.raises(ValueError):
+            store.get_into(key, bytearray(len(value) - 1))
+
+    def test_get_into_read_only_buffer(self, store, key, value):
+        store.put(key, value)
+        with pytest.raises(TypeError):
+            store.get_into(key, bytes(len(value)))
+
+    def test_key_error_on_nonexistant_get_into(self, store, key):
+        with pytest.raises(KeyError):
+            store.get_into(key, bytearray(10))
+
+    def test_exception_on_invalid_key_get_into(self, store, invalid_key):
+        with pytest.raises(ValueError):
+            store.get_into(invalid_key, bytearray(10))
+
+    def test_get_range(self, store, key, long_value):
+        store.put(key, long_value)
+
+        assert store.get_range(key, 3, 1000) == long_value[3:1000]
+        assert store.get_range(key, 40000) == long_value[40000:]
+        assert store.get_range(key) == long_value
+        assert store.get_range(key, 0, 1) == long_value[:1]
+
+    def test_get_range_negative_offsets(self, store, key, long_value):
+        store.put(key, long_value)
+
+        assert store.get_range(key, -100) == long_value[-100:]
+        assert store.get_range(key, -100, -10) == long_value[-100:-10]
+        assert store.get_range(key, 10, -10) == long_value[10:-10]
+        assert store.get_range(key, -(10**9), 5) == long_value[:5]
+
+    def test_get_range_outside_value(self, store, key, value):
+        store.put(key, value)
+
+        assert store.get_range(key, 3, 10**6) == value[3:]
+        assert store.get_range(key, len(value)) == b""
+        assert store.get_range(key, len(value) + 10, len(value) + 20) == b""
+        assert store.get_range(key, 5, 5) == b""
+        assert store.get_range(key, 5, 2) == b""
+
+    def test_key_error_on_nonexistant_get_range(self, store, key):
+        with pytest.raises(KeyError):
+            store.get_range(key, 0, 10)
+        with pytest.raises(KeyError):
+            store.get_range(key, 5, 5)
+        with pytest.raises(KeyError):
+            store.get_ranges(key, [(0, 10), (10**6, None)])
+
+    def test_exception_on_invalid_key_get_range(self, store, invalid_key):
+        with pytest.raises(ValueError):
+            store.get_range(invalid_key, 0, 10)
+
+    def test_get_ranges(self, store, key, long_value):
+        store.put(key, long_value)
+        ranges = [(40000, None), (0, 10), (5, 20), (-50, -40), (30000, 30001), (7, 7)]
+
+        assert store.get_ranges(key, ranges) == [
+            long_value[start:end] for start, end in ranges
+        ]
+        assert store.get_ranges(key, ranges, max_gap=0) == [
+            long_value[start:end] for start, end in ranges
+        ]
+        assert store.get_ranges(key, []) == []
+
+    def test_stat(self, store, key, key2, value, value2):
+        store.put(key, value)
+        store.put(key2, value2)
+
+        stat = store.stat(key)
+        assert isinstance(stat, KeyStat)
+        assert stat.key == key
+        assert stat.size == len(value)
+        assert store.stat(key2).size == len(value2)
+
+    def test_stat_last_modified_is_timezone_aware(self, store, key, value):
+        store.put(key, value)
+
+        last_modified = store.stat(key).last_modified
+        assert last_modified is None or last_modified.tzinfo is not None
+
+    def test_key_error_on_nonexistant_stat(self, store, key):
+        with pytest.raises(KeyError):
+            store.stat(key)
+
+    def test_exception_on_invalid_key_stat(self, store, invalid_key):
+        with pytest.raises(ValueError):
+            store.stat(invalid_key)
+
+    def test_iter_stat(self, store, key, key2, value, value2):
+        store.put(key, value)
+        store.put(key2, value2)
+
+        stats = {stat.key: stat for stat in store.iter_stat()}
+        assert set(stats) == {key, key2}
+        assert stats[key].size == len(value)
+        assert stats[key2].size == len(value2)
+
+    def test_iter_stat_with_prefix(self, store, key, key2, value):
+        key_prefix = key + "_key1"
+        store.put(key_prefix, value)
+        store.put(key2, value)
+
+        stats = list(store.iter_stat(key))
+        assert [stat.key for stat in stats] == [key_prefix]
+        assert stats[0].size == len(value)
+
+    def test_list_page(self, store, key, key2, value, value2):
+        store.put(key, value)
+        store.put(key2, value2)
+
+        keys = list_all_pages(store)
+        assert sorted(keys) == sorted([key, key2])
+        assert list_all_pages(store, limit=1000) == keys
+
+    def test_list_page_with_prefix(self, store, key, key2, value):
+        key_prefix = key + "_key1"
+        store.put(key_prefix, value)
+        store.put(key2, value)
+
+        assert list_all_pages(store, key) == [key_prefix]
+
+    def test_list_page_start_after(self, store, key, key2, value):
+        store.put(key, value)
+        store.put(key2, value)
+
+        first, second = list_all_pages(store)
+        assert list_all_pages(store, start_after=first) == [second]
+        assert list_all_pages(store, start_after=second) == []
+
+    def test_list_page_invalid_arguments(self, store, key, value):
+        with pytest.raises(ValueError):
+            store.list_page(limit=0)
+        with pytest.raises(ValueError):
+            store.list_page(start_after=key, token=key)
+
+    def test_put_if_none_match(self, store, key, value, value2):
+        with conditional_writes():
+            assert store.put(key, value, if_none_match=True) == key
+            with pytest.raises(PreconditionFailed):
+                store.put(key, value2, if_none_match=True)
+        assert store.get(key) == value
+
+    def test_put_if_match(self, store, key, value, value2):
+        store.put(key, value)
+        etag = store.stat(key).etag
+        if etag is None:
+            pytest.skip("The store does not return ETags")
+
+        with conditional_writes():
+            assert store.put(key, value2, if_match=etag) == key
+            with pytest.raises(PreconditionFailed):
+                store.put(key, value, if_match=etag)
+        assert store.get(key) == value2
+        assert store.stat(key).etag != etag
+
+    def test_put_if_match_nonexistant_key(self, store, key, value):
+        with conditional_writes():
+            with pytest.raises(PreconditionFailed):
+                store.put(key, value, if_match="0123456789abcdef")
+        assert key not in store
+
+    def test_put_with_both_conditions_fails(self, store, key, value):
+        with pytest.raises(ValueError):
+            store.put(key, value, if_match="0123456789abcdef", if_none_match=True)
+
+    def test_delete_if_match(self, store, key, value):
+        store.put(key, value)
+        etag = store.stat(key).etag
+        if etag is None:
+            pytest.skip("The store does not return ETags")
+
+        with conditional_writes():
+            with pytest.raises(PreconditionFailed):
+                store.delete(key, if_match="0123456789abcdef")
+            assert key in store
+            store.delete(key, if_match=etag)
+            assert key not in store
+            with pytest.raises(PreconditionFailed):
+                store.delete(key, if_match=etag)
+
     def test_max_key_length(self, store, max_key, value):
         new_key = store.put(max_key, value)
 
@@ -2,6 +2,7 @@ import os
 import re
 import tempfile
 import uuid
+from io import BytesIO
 
 import pytest
 
@@ -85,6 +86,16 @@ class HashGen(IDGen):
     def templated_hashstore(self, store, hashfunc, idgen_template):
         return HashDecorator(store, hashfunc, idgen_template)
 
+    @pytest.fixture
+    def staged_hashstore(self, store, hashfunc):
+        if not hasattr(store, "move"):
+            pytest.skip("store does not support move")
+        return HashDecorator(store, hashfunc, staging_prefix="staging-")
+
+    @pytest.fixture
+    def dedup_hashstore(self, store, hashfunc):
+        return HashDecorator(store, hashfunc, dedup=True)
+
     @pytest.fixture
     def validate_hash(self, hashfunc):
         hash_regexp = re.compile(
@@ -139,3 +150,66 @@ class HashGen(IDGen):
         key = templated_hashstore.put(None, value)
 
         assert idgen_template.format(value_hash) == key
+
+    def test_put_file_staged(self, staged_hashstore, value_hash, value, mocker):
+        mocker.patch("tempfile.NamedTemporaryFile", side_effect=AssertionError)
+        key = staged_hashstore.put_file(None, BytesIO(value))
+
+        assert key == value_hash
+        assert staged_hashstore.get(key) == value
+        assert not list(staged_hashstore.iter_keys("staging-"))
+
+    def test_put_file_staged_cleans_up(self, staged_hashstore, value, mocker):
+        mocker.patch.object(
+            staged_hashstore._dstore, "move", side_effect=OSError("move failed")
+        )
+        with pytest.raises(IOError):
+            staged_hashstore.put_file(None, BytesIO(value))
+
+        assert not list(staged_hashstore.iter_keys("staging-"))
+
+    def test_dedup_skips_stored_data(self, dedup_hashstore, value, mocker):
+        put = mocker.spy(dedup_hashstore._dstore, "put")
+        key = dedup_hashstore.put(None, value)
+        assert dedup_hashstore.put(None, value) == key
+        assert dedup_hashstore.put_file(None, BytesIO(value)) == key
+
+        assert put.call_count == 1
+        assert dedup_hashstore.bytes_saved == 2 * len(value)
+        assert dedup_hashstore.get(key) == value
+
+    def test_dedup_put_file_str(self, dedup_hashstore, value, value_hash):
+        dedup_hashstore.put(None, value)
+        tmpfile = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            tmpfile.write(value)
+            tmpfile.close()
+            assert dedup_hashstore.put_file(None, tmpfile.name) == value_hash
+            assert dedup_hashstore.bytes_saved == len(value)
+        finally:
+            if os.path.exists(tmpfile.name):
+                os.unlink(tmpfile.name)
+
+    def test_dedup_checks_store(self, store, dedup_hashstore, value, value_hash):
+        store.put(value_hash, value)
+        assert dedup_hashstore.put(None, value) == value_hash
+        assert dedup_hashstore.bytes_saved == len(value)
+
+    def test_dedup_after_delete(self, dedup_hashstore, value):
+        key = dedup_hashstore.put(None, value)
+        dedup_hashstore.delete(key)
+        dedup_hashstore.put(None, value)
+
+        assert dedup_hashstore.get(key) == value
+        assert dedup_hashstore.bytes_saved == 0
+
+    def test_dedup_put_file_staged(self, store, hashfunc, value, value_hash):
+        if not hasattr(store, "move"):
+            pytest.skip("store does not support move")
+        hashstore = HashDecorator(
+            store, hashfunc, staging_prefix="staging-", dedup=True
+        )
+        hashstore.put(None, value)
+
+        assert hashstore.put_file(None, BytesIO(value)) == value_hash
+        assert not list(hashstore.iter_keys("staging-"))
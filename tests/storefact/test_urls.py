@@ -62,6 +62,10 @@ good_urls = [
     ("redis:///2", dict(type="redis", host="localhost", db=2)),
     ("memory://#wrap:readonly", {"type": "memory", "wrap": "readonly"}),
     ("memory://", dict(type="memory")),
+    (
+        "memory://#wrap:compress(zlib)+readonly",
+        {"type": "memory", "wrap": "compress(zlib)+readonly"},
+    ),
 ]
 
 bad_urls = [
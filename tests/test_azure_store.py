@@ -8,6 +8,7 @@ from basic_store import BasicStore, OpenSeekTellStore
 from conftest import ExtendedKeyspaceTests
 
 from minimalkv._mixins import ExtendedKeyspaceMixin
+from minimalkv.net._azurestore_common import _block_ids
 from minimalkv.net.azurestore import AzureBlockBlobStore
 
 asb = pytest.importorskip("azure.storage.blob")
@@ -106,6 +107,15 @@ def test_azure_setgetstate():
     _delete_container(conn_string, container)
 
 
+def test_block_ids_differ_between_uploads():
+    upload, other_upload = _block_ids(), _block_ids()
+    ids = [next(upload) for _ in range(3)]
+
+    assert len(set(ids)) == 3
+    assert len({len(block_id) for block_id in ids}) == 1
+    assert next(other_upload) not in ids
+
+
 def test_azure_store_attributes():
     abbs = AzureBlockBlobStore(
         "CONN_STR", "CONTAINER", max_connections=42, checksum=True
@@ -0,0 +1,203 @@
+import threading
+import time
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv.bloom import BloomFilterDecorator, _BloomFilter
+from minimalkv.memory import DictStore
+
+
+class CountingStore(DictStore):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+        self.listings = 0
+
+    def _has_key(self, key):
+        self.lookups += 1
+        return super()._has_key(key)
+
+    def _open(self, key):
+        self.lookups += 1
+        return super()._open(key)
+
+    def iter_keys(self, prefix=""):
+        self.listings += 1
+        return super().iter_keys(prefix)
+
+
+class TestBloomFilterDecorator(BasicStore):
+    @pytest.fixture
+    def base_store(self):
+        return CountingStore()
+
+    @pytest.fixture
+    def store(self, base_store):
+        return BloomFilterDecorator(base_store, capacity=1000)
+
+    def test_misses_are_answered_locally(self, store, base_store):
+        for i in range(100):
+            store.put(f"key{i}", b"value")
+        base_store.lookups = 0
+
+        for i in range(100, 1100):
+            assert f"key{i}" not in store
+            with pytest.raises(KeyError):
+                store.get(f"key{i}")
+        assert base_store.lookups < 50
+
+    def test_stat_misses_are_answered_locally(self, store, base_store):
+        store.put("key", b"value")
+        base_store.lookups = 0
+
+        for i in range(100):
+            with pytest.raises(KeyError):
+                store.stat(f"missing{i}")
+        assert base_store.lookups < 10
+        assert store.stat("key").size == 5
+
+    def test_existing_keys_are_built_lazily(self, base_store):
+        base_store.put("key", b"value")
+        store = BloomFilterDecorator(base_store)
+        assert base_store.listings == 0
+        assert "key" in store
+        assert "other" not in store
+        assert base_store.listings == 1
+
+    def test_built_eagerly(self, base_store):
+        BloomFilterDecorator(base_store, lazy=False)
+        assert base_store.listings == 1
+
+    def test_concurrent_first_use_builds_once(self, base_store, mocker):
+        base_store.put("key", b"value")
+        store = BloomFilterDecorator(base_store)
+        original = base_store.iter_keys
+
+        def iter_keys(prefix=""):
+            # let the other threads reach the filter while it is built
+            time.sleep(0.05)
+            return original(prefix)
+
+        mocker.patch.object(base_store, "iter_keys", iter_keys)
+        errors: list = []
+
+        def lookup():
+            try:
+                assert store.get("key") == b"value"
+                with pytest.raises(KeyError):
+                    store.get("missing")
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert base_store.listings == 1
+
+    def test_copy_and_move(self, store):
+        store.put("key", b"value")
+        store.copy("key", "copy")
+        store.move("key", "moved")
+        assert store.get("copy") == b"value"
+        assert store.get("moved") == b"value"
+        assert "key" not in store
+
+    def test_rebuild_after_delete(self, base_store):
+        store = BloomFilterDecorator(base_store, rebuild_interval=0)
+        store.put("key", b"value")
+        store.delete("key")
+        base_store.lookups = 0
+        assert "key" not in store
+        assert base_store.listings == 2
+        assert base_store.lookups == 0
+
+    def test_rebuild_grows_filter(self, store):
+        for i in range(5000):
+            store.put(f"key{i}", b"")
+        store.rebuild()
+        assert store._filter.num_bits > _BloomFilter.for_capacity(1000, 0.01).num_bits
+        assert all(f"key{i}" in store for i in range(5000))
+
+    def test_writes_during_rebuild_are_kept(self, store, base_store, mocker):
+        original = base_store.iter_keys
+
+        def iter_keys(prefix=""):
+            store.put("concurrent", b"value")
+            return original(prefix)
+
+        store.put("key", b"value")
+        mocker.patch.object(base_store, "iter_keys", iter_keys)
+        store.rebuild()
+        assert "concurrent" in store
+
+    def test_rebuild_before_adding(self, store, base_store, mocker):
+        store.put("key", b"value")
+        original = store._get_filter
+
+        def get_filter():
+            # a rebuild finishes right after the filter was looked up
+            bloom = original()
+            store.rebuild()
+            return bloom
+
+        mocker.patch.object(store, "_get_filter", get_filter)
+        store.put("added", b"value")
+        mocker.stopall()
+        assert "added" in store
+
+    def test_rebuild_while_writing(self, store, base_store, mocker):
+        store.put("key", b"value")
+        original = base_store._put
+
+        def put(key, data):
+            # the rebuild lists the keys before the value is written
+            store.rebuild()
+            return original(key, data)
+
+        mocker.patch.object(base_store, "_put", put)
+        store.put("added", b"value")
+        mocker.stopall()
+        assert "added" in store
+        assert not store._writing
+
+    def test_persistence(self, base_store, tmp_path):
+        path = str(tmp_path / "filter")
+        store = BloomFilterDecorator(base_store, path=path)
+        store.put("key", b"value")
+        store.save()
+
+        listings = base_store.listings
+        reloaded = BloomFilterDecorator(base_store, path=path)
+        assert "key" in reloaded
+        assert "other" not in reloaded
+        assert base_store.listings == listings
+
+    def test_save_without_path(self, store):
+        with pytest.raises(ValueError):
+            store.save()
+
+    def test_invalid_file(self, base_store, tmp_path):
+        path = tmp_path / "filter"
+        path.write_bytes(b"garbage")
+        with pytest.raises(ValueError):
+            BloomFilterDecorator(base_store, path=str(path), lazy=False)
+
+    def test_invalid_arguments(self, base_store):
+        with pytest.raises(ValueError):
+            BloomFilterDecorator(base_store, capacity=0)
+        with pytest.raises(ValueError):
+            BloomFilterDecorator(base_store, error_rate=1)
+
+
+def test_false_positive_rate():
+    bloom = _BloomFilter.for_capacity(10000, 0.01)
+    for i in range(10000):
+        bloom.add(str(i))
+    assert all(str(i) in bloom for i in range(10000))
+    false_positives = sum(str(i) in bloom for i in range(10000, 20000))
+    assert false_positives < 200
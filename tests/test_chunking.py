@@ -0,0 +1,176 @@
+import os
+import random
+from io import BytesIO
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv import chunking
+from minimalkv.chunking import ChunkingDecorator, _Chunker
+from minimalkv.memory import DictStore
+
+
+@pytest.fixture
+def random_data():
+    return random.Random(0).getrandbits(8 * 20000).to_bytes(20000, "little")
+
+
+class TestChunkingDecorator(BasicStore):
+    @pytest.fixture
+    def base_store(self):
+        return DictStore()
+
+    @pytest.fixture
+    def store(self, base_store):
+        return ChunkingDecorator(base_store, avg_chunk_size=256, max_workers=4)
+
+    def chunk_keys(self, base_store):
+        return set(base_store.iter_keys("chunk_"))
+
+    def test_chunks_are_deduplicated(self, store, base_store, random_data):
+        store.put("key1", random_data)
+        chunks = self.chunk_keys(base_store)
+        assert len(chunks) > 10
+
+        # inserting data only adds the chunks around the insertion
+        changed = random_data[:10000] + b"inserted" + random_data[10000:]
+        store.put("key2", changed)
+        assert len(self.chunk_keys(base_store) - chunks) <= 3
+        assert store.get("key1") == random_data
+        assert store.get("key2") == changed
+
+    def test_chunk_keys_are_hidden(self, store, random_data):
+        store.put("key", random_data)
+        assert store.keys() == ["key"]
+        assert list(store) == ["key"]
+        assert "key" in store
+        assert not any(k.startswith("chunk_") for k in store.iter_prefixes("_"))
+
+    def test_stat_sums_chunk_sizes(self, store, random_data):
+        store.put("key", random_data)
+        assert store.stat("key").size == len(random_data)
+        assert [(s.key, s.size) for s in store.iter_stat()] == [
+            ("key", len(random_data))
+        ]
+
+    def test_chunk_prefix_is_reserved(self, store, value):
+        with pytest.raises(ValueError):
+            store.put("chunk_abc", value)
+
+    def test_get_many(self, store, random_data):
+        store.put("key1", random_data)
+        store.put("key2", random_data[::-1])
+        store.put("key3", b"")
+
+        assert store.get_many(["key1", "key2", "key3"]) == {
+            "key1": random_data,
+            "key2": random_data[::-1],
+            "key3": b"",
+        }
+        with pytest.raises(KeyError):
+            store.get_many(["key1", "missing"])
+
+    def test_get_range_reads_needed_chunks(self, store, mocker, random_data):
+        store.put("key", random_data)
+        get_chunk = mocker.spy(store, "_get_chunk")
+
+        assert store.get_range("key", 10000, 10010) == random_data[10000:10010]
+        assert get_chunk.call_count <= 2
+        assert store.get_range("key", -5) == random_data[-5:]
+        assert store.get_range("key", 30000) == b""
+
+    def test_open_seek(self, store, random_data):
+        store.put("key", random_data)
+        with store.open("key") as handle:
+            assert handle.seekable()
+            assert handle.seek(0, 2) == len(random_data)
+            for pos in (0, 1, 5000, 12345, 19999):
+                handle.seek(pos)
+                assert handle.read(1000) == random_data[pos : pos + 1000]
+
+    def test_put_file_unseekable(self, store, random_data):
+        class Unseekable:
+            def __init__(self, data):
+                self.buf = BytesIO(data)
+
+            def read(self, n=-1):
+                return self.buf.read(n)
+
+        store.put_file("key", Unseekable(random_data))
+        assert store.get("key") == random_data
+
+    def test_corrupted_chunk(self, store, base_store, random_data):
+        store.put("key", random_data)
+        chunk = sorted(self.chunk_keys(base_store))[0]
+        base_store.put(chunk, b"garbage")
+
+        with pytest.raises(IOError):
+            store.get("key")
+
+    def test_not_a_manifest(self, store, base_store, value):
+        base_store.put("key", value)
+        with pytest.raises(IOError):
+            store.get("key")
+
+    def test_copy_shares_chunks(self, store, base_store, random_data):
+        store.put("key", random_data)
+        chunks = self.chunk_keys(base_store)
+        store.copy("key", "key2")
+
+        assert store.get("key2") == random_data
+        assert self.chunk_keys(base_store) == chunks
+
+    def test_collect_garbage(self, store, base_store, random_data):
+        store.put("key1", random_data)
+        store.put("key2", random_data[:5000])
+        chunks = self.chunk_keys(base_store)
+
+        store.delete("key1")
+        assert store.collect_garbage() > 0
+        assert self.chunk_keys(base_store) < chunks
+        assert store.get("key2") == random_data[:5000]
+
+        store.delete("key2")
+        store.collect_garbage()
+        assert not self.chunk_keys(base_store)
+
+    def test_invalid_chunk_sizes(self, base_store):
+        with pytest.raises(ValueError):
+            ChunkingDecorator(base_store, avg_chunk_size=64)
+        with pytest.raises(ValueError):
+            ChunkingDecorator(base_store, 1024, min_chunk_size=2048)
+
+
+class TestChunker:
+    @pytest.fixture
+    def chunker(self):
+        return _Chunker(64, 256, 1024)
+
+    def test_sizes(self, chunker, random_data):
+        chunks = list(chunker.split(BytesIO(random_data)))
+        assert b"".join(chunks) == random_data
+        assert all(64 <= len(c) <= 1024 for c in chunks[:-1])
+        assert 100 < len(random_data) / len(chunks) < 600
+
+    def test_constant_data(self, chunker):
+        chunks = list(chunker.split(BytesIO(b"\0" * 5000)))
+        assert b"".join(chunks) == b"\0" * 5000
+        assert all(len(c) in (64, 1024) for c in chunks[:-1])
+
+    def test_empty(self, chunker):
+        assert list(chunker.split(BytesIO(b""))) == []
+
+    def test_boundaries_follow_content(self, chunker, random_data):
+        chunks = set(chunker.split(BytesIO(random_data)))
+        shifted = set(chunker.split(BytesIO(os.urandom(100) + random_data)))
+        assert len(chunks & shifted) >= len(chunks) - 2
+
+    def test_implementations_agree(self, random_data):
+        if not chunking.has_numpy:
+            pytest.skip("numpy is not installed")
+        data = bytearray(random_data)
+        mask = ((1 << 6) - 1) << 58
+        for begin in range(63, 20000, 997):
+            assert chunking._find_boundary_np(
+                data, begin, 20000, mask
+            ) == chunking._find_boundary_py(data, begin, 20000, mask)
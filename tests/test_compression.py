@@ -0,0 +1,253 @@
+import os
+import random
+import tempfile
+from io import BytesIO
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv import compression, get_store_from_url
+from minimalkv.compression import Codec, CompressionDecorator, ZlibCodec, register_codec
+from minimalkv.memory import DictStore
+
+
+def codec_params():
+    params: list = ["zlib"]
+    for name, module in (("zstd", "zstandard"), ("lz4", "lz4")):
+        try:
+            __import__(module)
+        except ImportError:
+            params.append(pytest.param(name, marks=pytest.mark.skip(module)))
+        else:
+            params.append(name)
+    return params
+
+
+class Unseekable:
+    def __init__(self, data):
+        self.buf = BytesIO(data)
+
+    def read(self, n=-1):
+        return self.buf.read(n)
+
+    def close(self):
+        pass
+
+
+class ShortReads(Unseekable):
+    def read(self, n=-1):
+        return self.buf.read(10 if n < 0 else min(n, 10))
+
+
+@pytest.fixture
+def compressible():
+    rng = random.Random(0)
+    words = [
+        rng.getrandbits(48).to_bytes(6, "little").hex().encode() for _ in range(50)
+    ]
+    return b" ".join(rng.choice(words) for _ in range(50000))
+
+
+class TestCompressionDecorator(BasicStore):
+    @pytest.fixture(params=codec_params())
+    def codec(self, request):
+        return request.param
+
+    @pytest.fixture
+    def base_store(self):
+        return DictStore()
+
+    @pytest.fixture
+    def store(self, base_store, codec):
+        return CompressionDecorator(base_store, codec=codec, min_size=16)
+
+    def test_value_is_compressed(self, store, base_store, compressible):
+        store.put("key", compressible)
+        assert len(base_store.get("key")) < len(compressible) / 2
+        assert store.get("key") == compressible
+        assert store.open("key").read() == compressible
+
+    @pytest.mark.parametrize("source", [BytesIO, Unseekable, ShortReads])
+    def test_put_file_streams(self, store, base_store, compressible, source):
+        store.put_file("key", source(compressible))
+        assert len(base_store.get("key")) < len(compressible) / 2
+        assert store.get("key") == compressible
+
+    def test_put_file_short_reads(self, store):
+        store.put_file("key", ShortReads(b"x" * 100))
+        assert store.get("key") == b"x" * 100
+
+    def test_put_file_str_compressed(self, store, compressible):
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+            f.write(compressible)
+        try:
+            store.put_file("key", f.name)
+            assert store.get("key") == compressible
+        finally:
+            os.unlink(f.name)
+
+    def test_open_reads_exact_sizes(self, store, compressible):
+        store.put("key", compressible)
+        with store.open("key") as f:
+            parts = []
+            while True:
+                buf = f.read(1000)
+                parts.append(buf)
+                if len(buf) < 1000:
+                    break
+                assert len(buf) == 1000
+        assert b"".join(parts) == compressible
+
+    def test_small_values_are_stored_raw(self, store, base_store):
+        store.put("key", b"tiny")
+        assert base_store.get("key").endswith(b"tiny")
+        assert store.get("key") == b"tiny"
+
+    def test_incompressible_values_are_stored_raw(self, store, base_store):
+        data = os.urandom(1000)
+        store.put("key", data)
+        assert base_store.get("key").endswith(data)
+        assert store.get("key") == data
+
+    def test_reads_uncompressed_values(self, store, base_store, compressible):
+        base_store.put("key", compressible)
+        base_store.put("short", b"ab")
+        assert store.get("key") == compressible
+        assert store.open("key").read() == compressible
+        assert store.get("short") == b"ab"
+        assert store.open("short").read() == b"ab"
+
+    def test_reads_values_of_other_codecs(self, base_store, codec, compressible):
+        CompressionDecorator(base_store, codec=codec).put("key", compressible)
+        assert CompressionDecorator(base_store).get("key") == compressible
+        assert CompressionDecorator(base_store).open("key").read() == compressible
+
+    def test_stat_reports_uncompressed_size(self, store, base_store, compressible):
+        store.put("key", compressible)
+        store.put("short", b"ab")
+        base_store.put("plain", b"abc")
+        assert base_store.stat("key").size < len(compressible)
+
+        assert store.stat("key").size == len(compressible)
+        assert store.stat("short").size == 2
+        assert store.stat("plain").size == 3
+        assert {stat.key: stat.size for stat in store.iter_stat()} == {
+            "key": len(compressible),
+            "short": 2,
+            "plain": 3,
+        }
+
+    @pytest.mark.parametrize("source", [BytesIO, Unseekable])
+    def test_stat_reads_only_the_header(
+        self, store, base_store, compressible, source, mocker
+    ):
+        store.put("key", compressible)
+        store.put_file("file", source(compressible))
+        open_ = mocker.spy(base_store, "open")
+
+        assert store.stat("key").size == len(compressible)
+        assert store.stat("file").size == len(compressible)
+        # the size of values streamed from unseekable files is unknown when writing
+        assert open_.call_count == (source is Unseekable)
+
+    def test_unknown_codec(self, base_store):
+        with pytest.raises(ValueError):
+            CompressionDecorator(base_store, codec="unknown")
+
+    def test_unknown_codec_id(self, store, base_store):
+        base_store.put(
+            "key", compression._HEADER.pack(compression._MAGIC, 1, 200, 0, 0)
+        )
+        with pytest.raises(OSError):
+            store.get("key")
+
+    def test_unsupported_version(self, store, base_store):
+        base_store.put("key", compression._HEADER.pack(compression._MAGIC, 9, 0, 0, 0))
+        with pytest.raises(OSError):
+            store.get("key")
+
+
+class TestDictionaries:
+    @pytest.fixture(params=["zlib", "zstd"])
+    def codec(self, request):
+        if request.param == "zstd":
+            pytest.importorskip("zstandard")
+        return compression.CompressionDecorator(DictStore(), request.param).codec
+
+    @pytest.fixture
+    def samples(self):
+        rng = random.Random(1)
+        return [
+            b'{"user": "%d", "name": "user number %d", "active": true}'
+            % (rng.randrange(10**6), i)
+            for i in range(1000)
+        ]
+
+    def test_dictionary_improves_small_values(self, codec, samples):
+        dictionary = codec.train_dictionary(samples[:900], 4096)
+        plain = CompressionDecorator(DictStore(), codec, min_size=16)
+        with_dict = CompressionDecorator(
+            DictStore(), codec, min_size=16, dictionaries=[dictionary]
+        )
+        for i, sample in enumerate(samples[900:]):
+            plain.put(str(i), sample)
+            with_dict.put(str(i), sample)
+            assert with_dict.get(str(i)) == sample
+            assert with_dict.open(str(i)).read() == sample
+
+        def stored_size(store):
+            return sum(len(store._dstore.get(k)) for k in store._dstore.keys())
+
+        assert stored_size(with_dict) < stored_size(plain)
+
+    def test_old_dictionaries_are_readable(self, codec, samples):
+        old = codec.train_dictionary(samples[:500], 4096)
+        new = codec.train_dictionary(samples[500:], 4096)
+        base_store = DictStore()
+        CompressionDecorator(base_store, codec, min_size=16, dictionaries=[old]).put(
+            "key", samples[0]
+        )
+        store = CompressionDecorator(base_store, codec, dictionaries=[new, old])
+        assert store.get("key") == samples[0]
+
+        with pytest.raises(OSError):
+            CompressionDecorator(base_store, codec).get("key")
+
+    def test_lz4_has_no_dictionaries(self):
+        pytest.importorskip("lz4")
+        with pytest.raises(ValueError):
+            compression.LZ4Codec().train_dictionary([b"abc"], 100)
+
+
+def test_register_codec():
+    class ReversedZlibCodec(ZlibCodec):
+        codec_id = 1
+        name = "reversed"
+
+    with pytest.raises(ValueError):
+        register_codec(ReversedZlibCodec)
+
+    class BadCodec(Codec):
+        codec_id = 0
+        name = "bad"
+
+    with pytest.raises(ValueError):
+        register_codec(BadCodec)
+
+
+def test_missing_optional_dependencies(mocker):
+    mocker.patch.object(compression, "has_zstandard", False)
+    mocker.patch.object(compression, "has_lz4", False)
+    with pytest.raises(ImportError):
+        CompressionDecorator(DictStore(), "zstd")
+    with pytest.raises(ImportError):
+        CompressionDecorator(DictStore(), "lz4")
+
+
+@pytest.mark.parametrize(
+    "url, codec", [("compress", "zlib"), ("compress(zlib)", "zlib")]
+)
+def test_store_from_url(url, codec):
+    store = get_store_from_url("memory://#wrap:" + url)
+    assert isinstance(store, CompressionDecorator)
+    assert store.codec.name == codec
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
+import pickle
+from io import BytesIO
+
 import pytest
 from basic_store import BasicStore
 from conftest import ExtendedKeyspaceTests
 from idgens import HashGen, UUIDGen
-from test_hmac import HMACDec
+from test_hmac import ChunkedHMACDec, HMACDec
 
+from minimalkv._key_value_store import KeyValueStore
 from minimalkv._mixins import ExtendedKeyspaceMixin
 from minimalkv.memory import DictStore
 
@@ -14,6 +18,56 @@ class TestDictStore(BasicStore, UUIDGen, HashGen, HMACDec):
     def store(self):
         return DictStore()
 
+    def test_get_ranges_coalesces_nearby_ranges(self, store, long_value, mocker):
+        store.put("key", long_value)
+        get_range = mocker.spy(store, "_get_range")
+
+        ranges = [(0, 10), (100, 110), (40000, 40010)]
+        data = store.get_ranges("key", ranges, max_gap=1000)
+        assert data == [long_value[start:end] for start, end in ranges]
+        assert sorted(call.args[1:] for call in get_range.call_args_list) == [
+            (0, 110),
+            (40000, 40010),
+        ]
+
+    def test_pickle(self, value):
+        store = DictStore()
+        store.put("key", value)
+        unpickled = pickle.loads(pickle.dumps(store))
+        assert unpickled.get("key") == value
+        unpickled.put("key", value, if_match=unpickled.stat("key").etag)
+
+    def test_instances_do_not_share_lock(self):
+        assert DictStore()._lock is not DictStore()._lock
+
+    def test_default_stat_with_short_reads(self, long_value):
+        class ShortReads:
+            # unseekable, returns less than requested before the end
+            def __init__(self, data):
+                self.buf = BytesIO(data)
+
+            def read(self, n=-1):
+                return self.buf.read(min(n, 1000))
+
+            def close(self):
+                pass
+
+        class ShortReadStore(DictStore):
+            _stat = KeyValueStore._stat
+
+            def _open(self, key):
+                return ShortReads(self.d[key])
+
+        store = ShortReadStore()
+        store.put("key", long_value)
+        assert store.stat("key").size == len(long_value)
+
+
+class TestDictStoreChunkedHMAC(ChunkedHMACDec):
+    @pytest.fixture
+    def store(self):
+        return DictStore()
+
 
 class TestExtendedKeyspaceDictStore(TestDictStore, ExtendedKeyspaceTests):
     @pytest.fixture
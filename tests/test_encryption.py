@@ -0,0 +1,195 @@
+import os
+import tempfile
+from io import BytesIO
+
+import pytest
+
+from minimalkv import crypt
+from minimalkv.crypt import EncryptionDecorator, VerificationException
+from minimalkv.fs import FilesystemStore
+from minimalkv.idgen import HashDecorator
+from minimalkv.memory import DictStore
+
+pytest.importorskip("cryptography")
+
+
+class Unseekable:
+    def __init__(self, data):
+        self.buf = BytesIO(data)
+
+    def read(self, n=-1):
+        return self.buf.read(n)
+
+    def close(self):
+        pass
+
+
+class TestEncryptionDecorator:
+    @pytest.fixture(params=["dict", "fs"])
+    def store(self, request, tmp_path):
+        if request.param == "dict":
+            return DictStore()
+        return FilesystemStore(str(tmp_path))
+
+    @pytest.fixture(params=["aes-gcm", "chacha20-poly1305"])
+    def algorithm(self, request):
+        return request.param
+
+    @pytest.fixture(params=[None, 4])
+    def max_workers(self, request):
+        return request.param
+
+    @pytest.fixture
+    def cryptstore(self, store, algorithm, max_workers):
+        return EncryptionDecorator(
+            os.urandom(32),
+            store,
+            algorithm=algorithm,
+            chunk_size=16,
+            max_workers=max_workers,
+        )
+
+    @pytest.fixture(params=[b"", b"a_short_value", bytes(range(256)) * 3])
+    def data(self, request):
+        return request.param
+
+    def test_roundtrip(self, cryptstore, data):
+        cryptstore.put("key", data)
+        assert cryptstore.get("key") == data
+        assert cryptstore.open("key").read() == data
+
+    def test_value_is_encrypted(self, store, cryptstore):
+        cryptstore.put("key", b"secret message" * 4)
+        assert b"secret" not in store.get("key")
+
+    def test_put_file_obj(self, cryptstore, data):
+        cryptstore.put_file("key", BytesIO(data))
+        assert cryptstore.get("key") == data
+
+    def test_put_file_unseekable(self, cryptstore, data):
+        cryptstore.put_file("key", Unseekable(data))
+        assert cryptstore.get("key") == data
+
+    def test_put_file_str(self, cryptstore, data):
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+            f.write(data)
+        try:
+            cryptstore.put_file("key", f.name)
+            assert cryptstore.get("key") == data
+        finally:
+            os.unlink(f.name)
+
+    def test_get_file(self, cryptstore, data):
+        cryptstore.put("key", data)
+        b = BytesIO()
+        cryptstore.get_file("key", b)
+        assert b.getvalue() == data
+
+    def test_open_seek(self, cryptstore):
+        data = bytes(range(256)) * 3
+        cryptstore.put("key", data)
+        with cryptstore.open("key") as handle:
+            assert handle.seekable()
+            assert handle.seek(0, 2) == len(data)
+            for pos in (0, 15, 16, 17, 300, 767):
+                handle.seek(pos)
+                assert handle.tell() == pos
+                assert handle.read(40) == data[pos : pos + 40]
+
+    @pytest.mark.parametrize("n", [1, 7, 16, 100])
+    def test_reading_with_limit(self, cryptstore, data, n):
+        cryptstore.put("key", data)
+        handle = cryptstore.open("key")
+        chunks = list(iter(lambda: handle.read(n), b""))
+        assert all(len(c) == n for c in chunks[:-1])
+        assert b"".join(chunks) == data
+
+    def test_stat_reads_only_the_header(self, store, cryptstore, data, mocker):
+        cryptstore.put("key", data)
+        open_ = mocker.spy(store, "open")
+        get = mocker.spy(store, "get")
+
+        assert cryptstore.stat("key").size == len(data)
+        assert [stat.size for stat in cryptstore.iter_stat()] == [len(data)]
+        open_.assert_not_called()
+        get.assert_not_called()
+
+    def test_manipulated_bytes(self, store, cryptstore):
+        cryptstore.put("key", b"a_short_value" * 3)
+        encrypted = store.get("key")
+        for pos in range(len(encrypted)):
+            bad = bytearray(encrypted)
+            bad[pos] ^= 1
+            store.put("key", bytes(bad))
+            with pytest.raises(VerificationException):
+                cryptstore.get("key")
+
+    def test_truncated(self, store, cryptstore):
+        cryptstore.put("key", b"x" * 64)
+        # drop the last chunk and its tag
+        store.put("key", store.get("key")[: -(16 + 16)])
+        with pytest.raises(VerificationException):
+            cryptstore.get("key")
+        with pytest.raises(VerificationException):
+            cryptstore.open("key").seek(0, 2)
+
+    def test_value_bound_to_key(self, store, cryptstore):
+        cryptstore.put("key", b"a_short_value")
+        store.put("key2", store.get("key"))
+        with pytest.raises(VerificationException):
+            cryptstore.get("key2")
+
+    def test_wrong_secret_key(self, store, cryptstore):
+        cryptstore.put("key", b"a_short_value")
+        with pytest.raises(VerificationException):
+            EncryptionDecorator(os.urandom(32), store).get("key")
+
+    def test_reads_other_algorithm(self, store, cryptstore):
+        secret_key = os.urandom(32)
+        EncryptionDecorator(secret_key, store, algorithm="chacha20-poly1305").put(
+            "key", b"a_short_value"
+        )
+        assert EncryptionDecorator(secret_key, store).get("key") == b"a_short_value"
+
+    def test_copy_raises_not_implemented(self, cryptstore):
+        with pytest.raises(NotImplementedError):
+            cryptstore.copy("src", "dest")
+
+    def test_move_raises_not_implemented(self, cryptstore):
+        with pytest.raises(NotImplementedError):
+            cryptstore.move("src", "dest")
+
+    def test_staged_hashing_over_encryption(self, store, cryptstore, data):
+        hashstore = HashDecorator(cryptstore, staging_prefix="staging-")
+        key = hashstore.put_file(None, BytesIO(data))
+
+        assert hashstore.get(key) == data
+        assert not list(store.iter_keys("staging-"))
+
+
+def test_parallel_reads_use_thread_pool(mocker):
+    store = EncryptionDecorator(
+        os.urandom(32), DictStore(), chunk_size=4, max_workers=2
+    )
+    data = bytes(range(100))
+    store.put("key", data)
+
+    map_ = mocker.spy(store._EncryptionDecorator__executor, "map")
+    handle = store.open("key")
+    # the two chunks spanned by the read are decrypted as one batch
+    assert handle.read(8) == data[:8]
+    assert map_.call_count == 1
+    assert handle.read() == data[8:]
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        EncryptionDecorator(b"secret", DictStore(), algorithm="rot13")
+    with pytest.raises(ValueError):
+        EncryptionDecorator(b"secret", DictStore(), chunk_size=0)
+
+
+def test_missing_cryptography(mocker):
+    mocker.patch.object(crypt, "has_cryptography", False)
+    with pytest.raises(ImportError, match="cryptography"):
+        EncryptionDecorator(b"secret", DictStore())
@@ -13,6 +13,8 @@ from conftest import ExtendedKeyspaceTests
 from idgens import HashGen, UUIDGen
 from url_store import UrlStore
 
+from minimalkv._hstores import HFilesystemStore
+from minimalkv._key_value_store import PreconditionFailed
 from minimalkv._mixins import ExtendedKeyspaceMixin
 from minimalkv.fs import FilesystemStore, WebFilesystemStore
 
@@ -27,6 +29,67 @@ class TestBaseFilesystemStore(BasicStore, UrlStore, UUIDGen, HashGen):
         return FilesystemStore(tmpdir)
 
 
+class TestFilesystemStoreMove(TestBaseFilesystemStore):
+    def test_move_renames_file(self, store, key, key2, value, mocker):
+        store.put(key, value)
+        replace = mocker.spy(os, "replace")
+
+        assert store.move(key, key2) == key2
+        replace.assert_called_once()
+        assert store.get(key2) == value
+        assert key not in store
+
+    def test_move_nonexistant_key(self, store, key, key2):
+        with pytest.raises(KeyError):
+            store.move(key, key2)
+
+
+class TestFilesystemStoreStat(TestBaseFilesystemStore):
+    def test_stat_uses_file_metadata(self, store, tmpdir, key, value):
+        store.put(key, value)
+        mtime = os.stat(os.path.join(tmpdir, key)).st_mtime
+
+        stat = store.stat(key)
+        assert stat.size == len(value)
+        assert stat.last_modified.timestamp() == pytest.approx(mtime)
+
+    def test_hstore_size_is_deprecated(self, tmpdir, value):
+        store = HFilesystemStore(tmpdir)
+        store.put("key", value)
+        with pytest.deprecated_call():
+            assert store.size("key") == len(value)
+
+
+class TestFilesystemStoreETag(TestBaseFilesystemStore):
+    @pytest.fixture(params=[True, False], ids=["xattr", "no-xattr"])
+    def store(self, request, tmpdir, mocker):
+        if not request.param:
+            mocker.patch("os.setxattr", side_effect=OSError, create=True)
+            mocker.patch("os.getxattr", side_effect=OSError, create=True)
+        return FilesystemStore(tmpdir)
+
+    def test_same_size_writes_change_etag(self, store, tmpdir, key):
+        store.put(key, b"aaaa")
+        etag = store.stat(key).etag
+        st = os.stat(os.path.join(tmpdir, key))
+        assert store.put(key, b"bbbb", if_match=etag) == key
+        # filesystems with coarse timestamps give quick writes the same mtime
+        os.utime(os.path.join(tmpdir, key), ns=(st.st_atime_ns, st.st_mtime_ns))
+        with pytest.raises(PreconditionFailed):
+            store.put(key, b"cccc", if_match=etag)
+        assert store.get(key) == b"bbbb"
+
+        etag = store.stat(key).etag
+        store.put(key, b"dddd")
+        assert store.stat(key).etag != etag
+
+    def test_no_temporary_files_are_left(self, store, tmpdir, key, value):
+        store.put(key, value)
+        store.put(key, value, if_match=store.stat(key).etag)
+        store.copy(key, "copy")
+        assert sorted(os.listdir(tmpdir)) == sorted([key, "copy"])
+
+
 class TestFilesystemStoreMkdir(TestBaseFilesystemStore):
     def test_concurrent_mkdir(self, tmpdir, mocker):
         # Concurrent instantiation of the store in two threads could lead to
@@ -204,3 +267,32 @@ class TestExtendedKeyspaceFilesystemStore(
             )
         )
         assert out == []
+
+    def test_list_page_walks_directories_in_key_order(self, store, value):
+        keys = [
+            "a" + os.sep + "b",
+            "a-c",
+            "a" + os.sep + "c" + os.sep + "d",
+            "a0",
+            "b",
+            "a" + os.sep + "b-c",
+        ]
+        for k in keys:
+            store.put(k, value)
+
+        page = store.list_page(limit=2)
+        pages = [page.keys]
+        while page.token is not None:
+            page = store.list_page(limit=2, token=page.token)
+            pages.append(page.keys)
+        assert [k for keys in pages for k in keys] == sorted(keys)
+        assert store.list_page(start_after="a" + os.sep + "b-c").keys == [
+            "a" + os.sep + "c" + os.sep + "d",
+            "a0",
+            "b",
+        ]
+        assert store.list_page("a" + os.sep).keys == [
+            "a" + os.sep + "b",
+            "a" + os.sep + "b-c",
+            "a" + os.sep + "c" + os.sep + "d",
+        ]
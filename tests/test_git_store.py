@@ -1,6 +1,13 @@
+import glob
+import os
+from datetime import datetime
+from io import BytesIO
+
 import pytest
 from basic_store import BasicStore
 from conftest import ExtendedKeyspaceTests
+from dulwich.objects import Blob, Commit
+from dulwich.pack import write_pack_objects
 from dulwich.repo import Repo
 from idgens import HashGen, UUIDGen
 
@@ -68,6 +75,199 @@ class TestGitCommitStore(BasicStore, UUIDGen, HashGen):
         _, blob_id = tree.lookup_path(repo.__getitem__, fn2.encode("ascii"))
         assert repo[blob_id].data == b"bar2"
 
+    def test_transaction_creates_single_commit(self, store, repo_path, branch, value):
+        store.put("before", value)
+        repo = Repo(repo_path)
+        parent = repo.refs[b"refs/heads/" + branch]
+
+        with store.transaction(message="batch"):
+            for i in range(10):
+                store.put(f"key{i}", value)
+            store.delete("before")
+            # not committed yet
+            assert "key0" not in store
+
+        commit = repo[repo.refs[b"refs/heads/" + branch]]
+        assert isinstance(commit, Commit)
+        assert commit.message == b"batch"
+        assert commit.parents == [parent]
+        assert sorted(store.keys()) == sorted(f"key{i}" for i in range(10))
+
+    def test_transaction_rollback_on_error(self, store, repo_path, branch, value):
+        store.put("before", value)
+        repo = Repo(repo_path)
+        head = repo.refs[b"refs/heads/" + branch]
+
+        with pytest.raises(RuntimeError):
+            with store.transaction():
+                store.put("after", value)
+                raise RuntimeError
+
+        assert Repo(repo_path).refs[b"refs/heads/" + branch] == head
+        assert store.keys() == ["before"]
+
+    def test_commit_many(self, store, repo_path, branch, value, value2):
+        store.put("gone", value)
+        store.commit_many({"k1": value, "k2": value2}, deletes=["gone"])
+
+        assert sorted(store.keys()) == ["k1", "k2"]
+        assert store.get("k2") == value2
+        repo = Repo(repo_path)
+        commit = repo[repo.refs[b"refs/heads/" + branch]]
+        assert isinstance(commit, Commit)
+        assert commit.message == b"Updated 3 keys"
+        parent = repo[commit.parents[0]]
+        assert isinstance(parent, Commit)
+        assert len(parent.parents) == 0
+
+    def test_sees_commits_from_other_store(self, store, repo_path, branch, value):
+        store.put("key", value)
+        assert store.get("key") == value
+
+        other = GitCommitStore(repo_path, branch=branch, subdir=store.subdir.encode())
+        other.put("key", value + b"2")
+        other.put("key2", value)
+
+        assert store.get("key") == value + b"2"
+        assert "key2" in store
+
+    @pytest.fixture
+    def count_objects(self, repo_path):
+        def count_objects():
+            objects_path = os.path.join(repo_path, "objects")
+            loose = sum(
+                len(os.listdir(os.path.join(objects_path, d)))
+                for d in os.listdir(objects_path)
+                if len(d) == 2
+            )
+            packs = len(glob.glob(os.path.join(objects_path, "pack", "*.pack")))
+            return loose, packs
+
+        return count_objects
+
+    def test_put_file_writes_blob(self, store, repo_path, long_value):
+        class Unseekable:
+            def __init__(self, data):
+                self.buf = BytesIO(data)
+
+            def read(self, n=-1):
+                return self.buf.read(n)
+
+        store.bufsize = 1000
+        store.put_file("seekable", BytesIO(long_value))
+        store.put_file("unseekable", Unseekable(long_value))
+
+        assert store.get("seekable") == long_value
+        assert store.get("unseekable") == long_value
+        expected = Blob()
+        expected.data = long_value
+        blob = Repo(repo_path)[expected.id]
+        assert isinstance(blob, Blob)
+        assert blob.data == long_value
+
+    def test_pack_writes_single_pack(
+        self, repo_path, branch, subdir_name, value, count_objects
+    ):
+        store = GitCommitStore(repo_path, branch=branch, subdir=subdir_name, pack=True)
+        store.commit_many({f"key{i}": value + bytes([i]) for i in range(10)})
+        store.put_file("key10", BytesIO(value))
+
+        assert count_objects() == (0, 2)
+        assert store.get("key3") == value + bytes([3])
+        assert store.get("key10") == value
+
+    def test_repack(self, store, value, count_objects):
+        for i in range(10):
+            store.put(f"key{i}", value + bytes([i]))
+        assert count_objects()[0] > 0
+
+        assert store.repack() > 0
+        assert count_objects() == (0, 1)
+        assert sorted(store.keys()) == sorted(f"key{i}" for i in range(10))
+        assert store.get("key3") == value + bytes([3])
+
+    def test_stat_reads_object_headers(self, store, value, long_value, mocker):
+        store.put("key", value)
+        store.put("long", long_value)
+        store.put("empty", b"")
+        mocker.patch.object(Blob, "raw_length", side_effect=AssertionError)
+
+        sizes = {"key": len(value), "long": len(long_value), "empty": 0}
+        assert {key: store.stat(key).size for key in sizes} == sizes
+        store.repack()
+        assert {key: store.stat(key).size for key in sizes} == sizes
+
+    def test_stat_of_deltified_objects(self, store, repo_path, long_value):
+        values = [long_value + bytes(i) for i in range(5)]
+        store.commit_many({f"key{i}": data for i, data in enumerate(values)})
+
+        # replace the loose blobs by a pack storing them as deltas
+        blobs = []
+        for data in values:
+            blob = Blob()
+            blob.data = data
+            blobs.append(blob)
+        repo = Repo(repo_path)
+        f, commit, _ = repo.object_store.add_pack()
+        write_pack_objects(
+            f,
+            [(blob, None) for blob in blobs],
+            deltify=True,
+            object_format=repo.object_format,
+        )
+        commit()
+        for blob in blobs:
+            hexsha = blob.id.decode()
+            os.remove(os.path.join(repo_path, "objects", hexsha[:2], hexsha[2:]))
+        assert any(
+            unpacked.pack_type_num == 6
+            for pack in repo.object_store.packs
+            for unpacked in pack.data.iter_unpacked()
+        )
+
+        assert [store.stat(f"key{i}").size for i in range(5)] == list(map(len, values))
+
+    def test_at_commit(self, store, repo_path, branch, value, value2):
+        store.put("key", value)
+        store.put("key2", value)
+        commit_id = Repo(repo_path).refs[b"refs/heads/" + branch]
+        store.put("key", value2)
+        store.delete("key2")
+
+        snapshot = store.at(commit_id)
+        assert snapshot.get("key") == value
+        assert snapshot.open("key2").read() == value
+        assert sorted(snapshot.keys()) == ["key", "key2"]
+        assert snapshot._trees is store._trees
+        assert store.at(commit_id.decode()).get("key") == value
+        assert store.keys() == ["key"]
+
+        with pytest.raises(NotImplementedError):
+            snapshot.put("key", value)
+
+    def test_at_unknown_commit(self, store, value):
+        store.put("key", value)
+        with pytest.raises(ValueError):
+            store.at(b"0" * 40)
+
+    def test_at_time(self, store, value, value2, mocker):
+        time = mocker.patch("minimalkv.git.time.time")
+        for i, timestamp in enumerate([1000, 2000, 3000]):
+            time.return_value = timestamp
+            store.put("key", value + bytes([i]))
+
+        assert store.at(1000).get("key") == value + bytes([0])
+        assert store.at(2999.5).get("key") == value + bytes([1])
+        assert store.at(datetime.fromtimestamp(5000)).get("key") == value + bytes([2])
+        with pytest.raises(ValueError):
+            store.at(999)
+
+        # the index picks up new commits
+        time.return_value = 4000
+        store.put("key", value2)
+        assert store.at(3500).get("key") == value + bytes([2])
+        assert store.at(4000).get("key") == value2
+
 
 class TestExtendedKeyspaceGitStore(TestGitCommitStore, ExtendedKeyspaceTests):
     @pytest.fixture
@@ -76,3 +276,28 @@ class TestExtendedKeyspaceGitStore(TestGitCommitStore, ExtendedKeyspaceTests):
             pass
 
         return ExtendedKeyspaceStore(repo_path, branch=branch, subdir=subdir_name)
+
+    def test_transaction_replaces_blobs_and_trees(self, store, value, value2):
+        store.put("a/b", value)
+        store.put("c", value)
+
+        with store.transaction():
+            store.delete("a")
+            store.put("a/c", value2)
+            store.put("c/d", value2)
+
+        assert sorted(store.keys()) == ["a/c", "c/d"]
+        assert store.get("c/d") == value2
+
+    def test_iter_keys_only_reads_matching_subtrees(self, store, value, mocker):
+        for k in ["a/x", "a/y/z", "ab", "b/x", "b/y"]:
+            store.put(k, value)
+
+        iter_tree = mocker.spy(store, "_iter_tree")
+        assert sorted(store.iter_keys("a/")) == ["a/x", "a/y/z"]
+        assert sorted(c.args[1] for c in iter_tree.call_args_list) == ["", "a/", "a/y/"]
+
+        assert sorted(store.iter_prefixes("/")) == ["a/", "ab", "b/"]
+        assert sorted(store.iter_prefixes("/", prefix="a/")) == ["a/x", "a/y/"]
+        assert sorted(store.iter_prefixes("/", prefix="a/y")) == ["a/y/"]
+        assert list(store.iter_prefixes("/", prefix="c/")) == []
@@ -5,7 +5,15 @@ from io import BytesIO
 
 import pytest
 
-from minimalkv.crypt import HMACDecorator, VerificationException, _HMACFileReader
+from minimalkv.crypt import (
+    HMACDecorator,
+    VerificationException,
+    _ChunkedHMACFileReader,
+    _ChunkedHMACSigningReader,
+    _HMACFileReader,
+    _HMACSigningReader,
+)
+from minimalkv.idgen import HashDecorator
 
 
 class TestHMACFileReader:
@@ -75,6 +83,10 @@ class TestHMACFileReader:
 
             assert b"".join(chunks) == value
 
+    def test_reading_byte_by_byte(self, value, create_reader):
+        reader = create_reader()
+        assert b"".join(iter(lambda: reader.read(1), b"")) == value
+
     def test_manipulated_input_full_read(self, secret_key, value, bad_datas, hashfunc):
         for bad_data in bad_datas:
             reader = _HMACFileReader(
@@ -104,6 +116,193 @@ class TestHMACFileReader:
         assert create_reader().read() == value
 
 
+class TestHMACSigningReader:
+    @pytest.fixture
+    def signed_value(self, secret_key, value, hashfunc):
+        return value + hmac.HMAC(secret_key, value, hashfunc).digest()
+
+    @pytest.fixture
+    def create_reader(self, secret_key, value, hashfunc):
+        return lambda source=None: _HMACSigningReader(
+            hmac.HMAC(secret_key, None, hashfunc), source or BytesIO(value)
+        )
+
+    def test_unbounded_read(self, create_reader, signed_value):
+        assert create_reader().read() == signed_value
+
+    @pytest.mark.parametrize("n", [1, 3, 10, 100])
+    def test_reading_with_limit(self, create_reader, signed_value, n):
+        reader = create_reader()
+        chunks = []
+        while True:
+            chunk = reader.read(n)
+            chunks.append(chunk)
+            if len(chunk) < n:
+                break
+        assert all(len(c) == n for c in chunks[:-1])
+        assert b"".join(chunks) == signed_value
+
+    def test_unseekable_source(self, create_reader, value, signed_value):
+        reader = create_reader(Unseekable(value))
+        assert not reader.seekable()
+        with pytest.raises(IOError):
+            reader.seek(0)
+        assert reader.read(5) + reader.read() == signed_value
+
+    def test_seek_and_tell(self, create_reader, signed_value):
+        reader = create_reader()
+        assert reader.seekable()
+        assert reader.seek(0, 2) == len(signed_value)
+        assert reader.tell() == len(signed_value)
+        assert reader.read() == b""
+
+        reader.seek(0)
+        assert reader.read(4) == signed_value[:4]
+        reader.seek(2)
+        assert reader.read() == signed_value[2:]
+        reader.seek(-3, 2)
+        assert reader.read() == signed_value[-3:]
+
+    def test_source_offset(self, create_reader, value, signed_value):
+        source = BytesIO(b"garbage" + value)
+        source.seek(7)
+        reader = create_reader(source)
+        assert reader.seek(0, 2) == len(signed_value)
+        reader.seek(0)
+        assert reader.read() == signed_value
+
+
+class Unseekable:
+    def __init__(self, data):
+        self.buf = BytesIO(data)
+
+    def read(self, n=-1):
+        return self.buf.read(n)
+
+
+class TestChunkedHMAC:
+    @pytest.fixture(params=[b"", b"a", b"0123456789abcdef", b"x" * 100])
+    def data(self, request):
+        return request.param
+
+    @pytest.fixture(params=[1, 4, 16])
+    def chunk_size(self, request):
+        return request.param
+
+    @pytest.fixture
+    def new_hmac(self, secret_key, hashfunc):
+        return lambda: hmac.HMAC(secret_key, None, hashfunc)
+
+    @pytest.fixture
+    def signed(self, new_hmac, chunk_size, data):
+        return _ChunkedHMACSigningReader(new_hmac(), chunk_size, BytesIO(data)).read()
+
+    def frames(self, signed, chunk_size, digest_size):
+        # split a signed value into its header and chunks
+        header, body = signed[:12], signed[12:]
+        size = chunk_size + digest_size
+        return header, [body[i : i + size] for i in range(0, len(body), size)]
+
+    def test_roundtrip(self, new_hmac, signed, data):
+        assert _ChunkedHMACFileReader(new_hmac(), BytesIO(signed)).read() == data
+
+    def test_unseekable(self, new_hmac, chunk_size, data, signed):
+        signing = _ChunkedHMACSigningReader(new_hmac(), chunk_size, Unseekable(data))
+        assert not signing.seekable()
+        assert signing.read(3) + signing.read() == signed
+
+        reader = _ChunkedHMACFileReader(new_hmac(), Unseekable(signed))
+        assert not reader.seekable()
+        with pytest.raises(IOError):
+            reader.seek(0)
+        assert reader.read(3) + reader.read() == data
+
+    @pytest.mark.parametrize("n", [1, 3, 10])
+    def test_reading_with_limit(self, new_hmac, signed, data, n):
+        reader = _ChunkedHMACFileReader(new_hmac(), BytesIO(signed))
+        chunks = list(iter(lambda: reader.read(n), b""))
+        assert all(len(c) == n for c in chunks[:-1])
+        assert b"".join(chunks) == data
+
+    def test_signing_reader_seek(self, new_hmac, chunk_size, data, signed):
+        signing = _ChunkedHMACSigningReader(new_hmac(), chunk_size, BytesIO(data))
+        assert signing.seek(0, 2) == len(signed)
+        assert signing.read() == b""
+        signing.seek(5)
+        assert signing.read() == signed[5:]
+
+    def test_seek(self, new_hmac, signed, data):
+        reader = _ChunkedHMACFileReader(new_hmac(), BytesIO(signed))
+        assert reader.seekable()
+        assert reader.seek(0, 2) == len(data)
+        assert reader.read() == b""
+        for pos in range(len(data)):
+            reader.seek(pos)
+            assert reader.tell() == pos
+            assert reader.read(5) == data[pos : pos + 5]
+
+    def test_random_access_reads_only_needed_chunks(self, new_hmac):
+        data = bytes(range(256)) * 16
+        signed = _ChunkedHMACSigningReader(new_hmac(), 256, BytesIO(data)).read()
+        source = BytesIO(signed)
+        reader = _ChunkedHMACFileReader(new_hmac(), source)
+
+        # corrupt all chunks except the ones read
+        digest_size = new_hmac().digest_size
+        corrupted = bytearray(signed)
+        for i in range(16):
+            if i not in (5, 6):
+                corrupted[12 + i * (256 + digest_size)] ^= 1
+        source.seek(0)
+        source.write(bytes(corrupted))
+
+        reader.seek(5 * 256 + 200)
+        assert reader.read(100) == data[5 * 256 + 200 : 5 * 256 + 300]
+
+        with pytest.raises(VerificationException):
+            reader.read()
+
+    def test_manipulated_bytes(self, new_hmac, signed):
+        for pos in range(len(signed)):
+            bad = bytearray(signed)
+            bad[pos] ^= 1
+            with pytest.raises(VerificationException):
+                _ChunkedHMACFileReader(new_hmac(), BytesIO(bytes(bad))).read()
+
+    def test_truncated(self, new_hmac, signed, chunk_size):
+        header, frames = self.frames(signed, chunk_size, new_hmac().digest_size)
+        if len(frames) < 2:
+            pytest.skip("needs more than one chunk")
+        truncated = header + b"".join(frames[:-1])
+
+        with pytest.raises(VerificationException):
+            _ChunkedHMACFileReader(new_hmac(), BytesIO(truncated)).read()
+        with pytest.raises(VerificationException):
+            _ChunkedHMACFileReader(new_hmac(), Unseekable(truncated)).read()
+        with pytest.raises(VerificationException):
+            _ChunkedHMACFileReader(new_hmac(), BytesIO(truncated)).seek(0, 2)
+
+    def test_reordered(self, new_hmac, signed, chunk_size):
+        header, frames = self.frames(signed, chunk_size, new_hmac().digest_size)
+        if len(frames) < 3:
+            pytest.skip("needs more than two full chunks")
+        reordered = header + frames[1] + frames[0] + b"".join(frames[2:])
+
+        reader = _ChunkedHMACFileReader(new_hmac(), BytesIO(reordered))
+        with pytest.raises(VerificationException):
+            reader.read(1)
+
+    def test_not_chunked(self, new_hmac, data):
+        with pytest.raises(VerificationException):
+            _ChunkedHMACFileReader(new_hmac(), BytesIO(data + b"x" * 100)).read()
+
+    def test_unsupported_version(self, new_hmac, signed):
+        with pytest.raises(VerificationException, match="version"):
+            _ChunkedHMACFileReader(
+                new_hmac(), BytesIO(signed[:7] + b"\x02" + signed[8:])
+            )
+
+
 # test the "real" HMACMixin: core functionality and checks
 # this only works with dicts, as we access the internal structures to
 # manipulate values
@@ -123,6 +322,18 @@ class HMACDec:
         with pytest.raises(NotImplementedError):
             HMACDecorator(b"secret", store).copy("src", "dest")
 
+    def test_move_raises_not_implemented(self, store):
+        with pytest.raises(NotImplementedError):
+            HMACDecorator(b"secret", store).move("src", "dest")
+
+    def test_staged_hashing_over_hmac(self, store, hmacstore, value):
+        # values are signed with their key, so they must not be moved
+        hashstore = HashDecorator(hmacstore, staging_prefix="staging-")
+        key = hashstore.put_file(None, BytesIO(value))
+
+        assert hashstore.get(key) == value
+        assert not list(store.iter_keys("staging-"))
+
     def test_put_file_obj(self, key, value, hmacstore):
         hmacstore.put_file(key, BytesIO(value))
         assert hmacstore.get(key) == value
@@ -130,9 +341,28 @@ class HMACDec:
     def test_put_file_str(self, key, value, hmacstore):
         with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
             f.write(value)
-        hmacstore.put_file(key, f.name)
+        try:
+            hmacstore.put_file(key, f.name)
+            assert hmacstore.get(key) == value
+            # the source file is not altered
+            with open(f.name, "rb") as source:
+                assert source.read() == value
+        finally:
+            os.unlink(f.name)
+
+    def test_put_file_without_tempfile(self, key, value, hmacstore, mocker):
+        mocker.patch("tempfile.NamedTemporaryFile", side_effect=AssertionError)
+        hmacstore.put_file(key, BytesIO(value))
         assert hmacstore.get(key) == value
 
+    def test_put_stream_is_signed(self, key, value, hmacstore):
+        hmacstore.put_stream(key, [value[:3], memoryview(value)[3:]])
+        assert hmacstore.get(key) == value
+
+        hmacstore.d[key] += b"a"
+        with pytest.raises(VerificationException):
+            hmacstore.get(key)
+
     def test_get_file_obj(self, key, value, hmacstore):
         hmacstore.put(key, value)
         b = BytesIO()
@@ -175,6 +405,31 @@ class HMACDec:
         with pytest.raises(VerificationException):
             handle.read(1)
 
+    def test_get_range(self, hmacstore, key, value):
+        hmacstore.put(key, value)
+
+        assert hmacstore.get_range(key, 2, 7) == value[2:7]
+        assert hmacstore.get_range(key, -3) == value[-3:]
+        assert hmacstore.get_range(key, 100) == b""
+        assert hmacstore.get_ranges(key, [(0, 2), (-4, None)]) == [
+            value[:2],
+            value[-4:],
+        ]
+
+    def test_get_into_fails_on_manipulation(self, hmacstore, key, value):
+        hmacstore.put(key, value)
+        hmacstore.d[key] += b"a"
+
+        with pytest.raises(VerificationException):
+            hmacstore.get_into(key, bytearray(len(value) + 1))
+
+    def test_get_range_fails_on_manipulation(self, hmacstore, key, value):
+        hmacstore.put(key, value)
+        hmacstore.d[key] += b"a"
+
+        with pytest.raises(VerificationException):
+            hmacstore.get_range(key, 1)
+
     def test_get_fails_on_replay_manipulation(self, hmacstore, key, key2, value):
         hmacstore.put(key, value)
         hmacstore.d[key2] = hmacstore.d[key]
@@ -182,3 +437,42 @@ class HMACDec:
 
         with pytest.raises(VerificationException):
             hmacstore.get(key2)
+
+
+class ChunkedHMACDec(HMACDec):
+    @pytest.fixture
+    def hmacstore(self, secret_key, store):
+        return HMACDecorator(secret_key, store, chunk_size=4)
+
+    def test_invalid_chunk_size(self, store):
+        with pytest.raises(ValueError):
+            HMACDecorator(b"secret", store, chunk_size=0)
+
+    def test_open_fails_on_manipulation(self, hmacstore, key, value):
+        hmacstore.put(key, value)
+        hmacstore.d[key] += b"a"
+
+        with pytest.raises(VerificationException):
+            hmacstore.open(key).read()
+
+    def test_open_is_seekable(self, hmacstore, key, value):
+        hmacstore.put(key, value)
+        with hmacstore.open(key) as handle:
+            assert handle.seek(-5, 2) == len(value) - 5
+            assert handle.read() == value[-5:]
+            handle.seek(3)
+            assert handle.read(4) == value[3:7]
+
+    def test_stat_reads_only_the_header(self, store, hmacstore, key, value, mocker):
+        hmacstore.put(key, value)
+        open_ = mocker.spy(store, "open")
+        get = mocker.spy(store, "get")
+
+        assert hmacstore.stat(key).size == len(value)
+        open_.assert_not_called()
+        get.assert_not_called()
+
+    def test_unchunked_value_fails(self, secret_key, store, hmacstore, key, value):
+        HMACDecorator(secret_key, store).put(key, value)
+        with pytest.raises(VerificationException):
+            hmacstore.get(key)
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from io import BytesIO
+from typing import IO, cast
+
+import pytest
+
+from minimalkv.idgen import Blake2bTreeHash, HashDecorator, _iter_chunks
+from minimalkv.memory import DictStore
+
+
+class TestBlake2bTreeHash:
+    @pytest.fixture(params=[0, 1, 16, 17, 100])
+    def data(self, request):
+        return os.urandom(request.param)
+
+    def test_interface(self, data):
+        phash = Blake2bTreeHash(data, leaf_size=16)
+        assert phash.digest_size == 32
+        assert len(phash.digest()) == 32
+        assert phash.hexdigest() == phash.digest().hex()
+
+    @pytest.mark.parametrize("max_workers", [1, 2, 4])
+    @pytest.mark.parametrize("step", [1, 7, 16, 50])
+    def test_independent_of_updates_and_threads(self, data, max_workers, step):
+        expected = Blake2bTreeHash(data, leaf_size=16, max_workers=1).digest()
+
+        phash = Blake2bTreeHash(leaf_size=16, max_workers=max_workers)
+        for i in range(0, len(data), step):
+            phash.update(data[i : i + step])
+        assert phash.digest() == expected
+
+    def test_single_leaf_is_tree_node(self, data):
+        # a tree with a single leaf still differs from the plain BLAKE2b digest
+        plain = hashlib.blake2b(data, digest_size=32).digest()
+        assert Blake2bTreeHash(data, leaf_size=1024).digest() != plain
+
+    def test_parameters_change_digest(self, data):
+        assert (
+            Blake2bTreeHash(data, leaf_size=16).digest()
+            != Blake2bTreeHash(data, leaf_size=32).digest()
+        )
+        assert len(Blake2bTreeHash(data, digest_size=20).digest()) == 20
+
+    def test_leaf_boundaries(self):
+        digests = {Blake2bTreeHash(b"x" * n, leaf_size=16).digest() for n in range(50)}
+        assert len(digests) == 50
+
+    def test_update_after_digest(self):
+        phash = Blake2bTreeHash(b"data")
+        phash.digest()
+        with pytest.raises(ValueError):
+            phash.update(b"more")
+
+
+def test_iter_chunks_reuses_buffer():
+    data = os.urandom(100)
+    chunks = [bytes(c) for c in _iter_chunks(BytesIO(data), 16)]
+    assert chunks == [data[i : i + 16] for i in range(0, 100, 16)]
+
+    views = list(_iter_chunks(BytesIO(data), 16))
+    assert all(isinstance(v, memoryview) for v in views)
+    assert len({id(cast(memoryview, v).obj) for v in views}) == 1
+
+
+def test_iter_chunks_without_readinto():
+    class Source:
+        def __init__(self, data):
+            self.buf = BytesIO(data)
+
+        def read(self, n=-1):
+            return self.buf.read(n)
+
+    data = os.urandom(100)
+    assert b"".join(_iter_chunks(cast(IO, Source(data)), 16)) == data
+
+
+@pytest.mark.parametrize("bufsize", [1, 7, 1024])
+def test_hash_decorator_with_tree_hash(bufsize, tmp_path):
+    data = os.urandom(5000)
+    store = HashDecorator(
+        DictStore(),
+        hashfunc=lambda data=b"": Blake2bTreeHash(data, leaf_size=1000),
+        bufsize=bufsize,
+    )
+    expected = Blake2bTreeHash(data, leaf_size=1000).hexdigest()
+
+    assert store.put(None, data) == expected
+    assert store.put_file(None, BytesIO(data)) == expected
+
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    assert store.put_file(None, str(path)) == expected
+    assert store.get(expected) == data
@@ -3,11 +3,14 @@ from unittest import mock
 optional_dependencies = [
     "azure",
     "boto",
+    "cryptography",
     "dulwich",
     "gcsfs",
     "google",
+    "lz4",
     "redis",
     "sqlalchemy",
+    "zstandard",
 ]
 
 orig_import = __import__
@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv.keyindex import KeyIndexDecorator, _prefix_end
+from minimalkv.memory import DictStore
+
+
+class ListingCountingStore(DictStore):
+    listings = 0
+
+    def iter_keys(self, prefix=""):
+        self.listings += 1
+        return super().iter_keys(prefix)
+
+
+class TestKeyIndexDecorator(BasicStore):
+    @pytest.fixture
+    def base_store(self):
+        return ListingCountingStore()
+
+    @pytest.fixture
+    def store(self, base_store):
+        store = KeyIndexDecorator(base_store, page_size=3)
+        yield store
+        store.close()
+
+    def test_listing_is_served_from_index(self, store, base_store):
+        keys = [f"dir{i % 3}_key{i}" for i in range(20)]
+        for key in keys:
+            store.put(key, b"")
+        listings = base_store.listings
+
+        assert store.keys() == sorted(keys)
+        assert list(store) == sorted(keys)
+        assert store.keys("dir1_") == sorted(k for k in keys if k.startswith("dir1_"))
+        assert list(store.iter_prefixes("_")) == ["dir0_", "dir1_", "dir2_"]
+        assert list(store.iter_prefixes("-", "dir1_key1")) == [
+            k for k in sorted(keys) if k.startswith("dir1_key1")
+        ]
+        assert base_store.listings == listings
+
+    def test_iter_prefixes_mixed(self, store):
+        for key in ["a", "a_b", "a_c_d", "ab", "b_x", "b-"]:
+            store.put(key, b"")
+        assert list(store.iter_prefixes("_")) == ["a", "a_", "ab", "b-", "b_"]
+        assert list(store.iter_prefixes("_", "a_")) == ["a_b", "a_c_"]
+
+    def test_copy_move_delete_update_index(self, store):
+        store.put("key", b"value")
+        store.copy("key", "copy")
+        store.move("key", "moved")
+        assert store.keys() == ["copy", "moved"]
+        store.delete("copy")
+        assert store.keys() == ["moved"]
+
+    def test_index_is_built_from_store(self, base_store):
+        base_store.put("existing", b"")
+        store = KeyIndexDecorator(base_store)
+        assert store.keys() == ["existing"]
+
+    def test_concurrent_first_use_reconciles_once(self, base_store, mocker):
+        for i in range(10):
+            base_store.put(f"key{i}", b"")
+        store = KeyIndexDecorator(base_store, page_size=3)
+        original = base_store.iter_keys
+
+        def iter_keys(prefix=""):
+            # let the other threads reach the index while it is filled
+            time.sleep(0.05)
+            return original(prefix)
+
+        mocker.patch.object(base_store, "iter_keys", iter_keys)
+        results: list = []
+
+        def list_keys():
+            try:
+                results.append(store.keys())
+            except BaseException as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=list_keys) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.close()
+
+        assert results == [sorted(f"key{i}" for i in range(10))] * 3
+        assert base_store.listings == 1
+
+    def test_reconcile(self, store, base_store):
+        store.put("key", b"")
+        base_store.put("added", b"")
+        base_store.delete("key")
+        assert store.keys() == ["key"]
+
+        assert store.reconcile() == (1, 1)
+        assert store.keys() == ["added"]
+
+    def test_persistent_index(self, base_store, tmp_path):
+        path = str(tmp_path / "index.sqlite")
+        store = KeyIndexDecorator(base_store, path=path)
+        store.put("key", b"")
+        store.close()
+
+        listings = base_store.listings
+        store = KeyIndexDecorator(base_store, path=path)
+        assert store.keys() == ["key"]
+        assert base_store.listings == listings
+        store.close()
+
+
+def test_prefix_end():
+    assert _prefix_end("") is None
+    assert _prefix_end("ab") == "ac"
+    assert _prefix_end("a\U0010ffff") == "b"
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+from io import BytesIO
 from uuid import uuid4 as uuid
 
 import pytest
@@ -8,7 +9,9 @@ pymongo = pytest.importorskip("pymongo")
 
 from basic_store import BasicStore
 from conftest import ExtendedKeyspaceTests
+from gridfs.grid_file import GridOut
 
+from minimalkv._key_value_store import PreconditionFailed
 from minimalkv._mixins import ExtendedKeyspaceMixin
 from minimalkv.db.mongo import MongoStore
 
@@ -40,3 +43,86 @@ class TestExtendedKeyspaceDictStore(TestMongoDB, ExtendedKeyspaceTests):
             pytest.skip("could not connect to mongodb")
         yield ExtendedKeyspaceStore(conn[db_name], "minimalkv-tests")
         conn.drop_database(db_name)
+
+
+class TestMongoGridFS(BasicStore):
+    @pytest.fixture(params=[0, 1024])
+    def gridfs_threshold(self, request):
+        return request.param
+
+    @pytest.fixture
+    def db(self):
+        mongomock = pytest.importorskip("mongomock")
+        from mongomock.gridfs import enable_gridfs_integration
+
+        enable_gridfs_integration()
+        return mongomock.MongoClient()[f"_minimalkv_test_{uuid()}"]
+
+    @pytest.fixture
+    def store(self, db, gridfs_threshold):
+        return MongoStore(
+            db, "minimalkv-tests", gridfs_threshold=gridfs_threshold, chunk_size=1024
+        )
+
+    def test_small_value_stored_inline(self, store, db, key):
+        store.put(key, b"")
+        assert "v" in db["minimalkv-tests"].find_one({"_id": key})
+        assert db["minimalkv-tests.files"].count_documents({}) == 0
+
+    def test_large_value_stored_in_gridfs(self, store, db, key, long_value):
+        store.put_file(key, BytesIO(long_value))
+
+        item = db["minimalkv-tests"].find_one({"_id": key})
+        assert "v" not in item
+        assert db["minimalkv-tests.chunks"].count_documents(
+            {"files_id": item["f"]}
+        ) == -(-len(long_value) // 1024)
+        assert store.get(key) == long_value
+        assert isinstance(store.open(key), GridOut)
+
+    def test_put_file_short_reads(self, store, key, long_value):
+        class ShortReads(BytesIO):
+            def read(self, n=-1):
+                return super().read(10 if n < 0 else min(n, 10))
+
+        store.put_file(key, ShortReads(long_value[:500]))
+        assert store.get(key) == long_value[:500]
+
+    def test_overwrite_removes_chunks(self, store, db, key, long_value):
+        store.put(key, long_value)
+        store.put(key, long_value)
+        assert db["minimalkv-tests.files"].count_documents({}) == 1
+
+        store.put(key, b"")
+        assert db["minimalkv-tests.files"].count_documents({}) == 0
+        assert db["minimalkv-tests.chunks"].count_documents({}) == 0
+
+    def test_conditional_writes_remove_chunks(self, store, db, key, long_value):
+        store.put(key, long_value)
+        etag = store.stat(key).etag
+        store.put(key, long_value, if_match=etag)
+        assert db["minimalkv-tests.files"].count_documents({}) == 1
+
+        with pytest.raises(PreconditionFailed):
+            store.put(key, long_value, if_match=etag)
+        with pytest.raises(PreconditionFailed):
+            store.put(key, long_value, if_none_match=True)
+        assert db["minimalkv-tests.files"].count_documents({}) == 1
+
+        store.delete(key, if_match=store.stat(key).etag)
+        assert db["minimalkv-tests.files"].count_documents({}) == 0
+        assert db["minimalkv-tests.chunks"].count_documents({}) == 0
+
+    def test_delete_removes_chunks(self, store, db, key, long_value):
+        store.put(key, long_value)
+        store.delete(key)
+        assert db["minimalkv-tests.files"].count_documents({}) == 0
+        assert db["minimalkv-tests.chunks"].count_documents({}) == 0
+
+    def test_copy_duplicates_chunks(self, store, db, key, key2, long_value):
+        store.put(key, long_value)
+        store.copy(key, key2)
+        store.delete(key)
+
+        assert store.get(key2) == long_value
+        assert db["minimalkv-tests.files"].count_documents({}) == 1
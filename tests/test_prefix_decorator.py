@@ -89,3 +89,16 @@ class TestPrefixDecorator(BasicStore):
 
         rountrip = pickle.loads(pickle.dumps(store))
         assert isinstance(rountrip, PrefixDecorator)
+
+    def test_move_maps_keys(self, store, prefix, key, key2, value):
+        store.put(key, value)
+        assert store.move(key, key2) == key2
+
+        assert store._dstore.get(prefix + key2) == value
+        assert prefix + key not in store._dstore
+
+    def test_list_page_is_listed_by_decorated_store(self, store, key, value, mocker):
+        store.put(key, value)
+        list_page = mocker.spy(store._dstore, "list_page")
+        assert store.list_page().keys == [key]
+        assert list_page.call_count == 1
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv.memory import DictStore
+from minimalkv.replication import ReplicatedStore
+
+
+class SlowStore(DictStore):
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.reads = 0
+
+    def _get(self, key):
+        self.reads += 1
+        time.sleep(self.delay)
+        return super()._get(key)
+
+    def _open(self, key):
+        self.reads += 1
+        time.sleep(self.delay)
+        return super()._open(key)
+
+
+class FailingStore(DictStore):
+    def _get(self, key):
+        raise OSError("unavailable")
+
+    def _put(self, key, data):
+        raise OSError("unavailable")
+
+    def iter_keys(self, prefix=""):
+        raise OSError("unavailable")
+
+
+class BlockingStore(DictStore):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+
+    def _put(self, key, data):
+        self.unblock.wait()
+        return super()._put(key, data)
+
+
+class TestReplicatedStore(BasicStore):
+    @pytest.fixture
+    def store(self):
+        return ReplicatedStore([DictStore() for _ in range(3)])
+
+    def test_writes_go_to_all_replicas(self, store, key, value):
+        store.put(key, value)
+        assert all(replica.get(key) == value for replica in store.stores)
+        store.delete(key)
+        assert all(key not in replica for replica in store.stores)
+
+
+def test_write_quorum():
+    blocking = BlockingStore()
+    store = ReplicatedStore([DictStore(), DictStore(), blocking], write_quorum=2)
+
+    store.put("key", b"value")
+    assert "key" not in blocking
+    blocking.unblock.set()
+    store._executor.shutdown()
+    assert blocking.get("key") == b"value"
+
+
+def test_write_quorum_not_reached():
+    store = ReplicatedStore([DictStore(), FailingStore()], write_quorum=2)
+    with pytest.raises(OSError):
+        store.put("key", b"value")
+
+    store = ReplicatedStore([DictStore(), FailingStore()], write_quorum=1)
+    store.put("key", b"value")
+    assert store.get("key") == b"value"
+
+
+def test_hedged_read_is_faster():
+    slow, fast = SlowStore(delay=0.5), SlowStore()
+    store = ReplicatedStore([slow, fast], hedge_delay=0.01)
+    store.put("key", b"value")
+
+    start = time.monotonic()
+    assert store.get("key") == b"value"
+    assert store.open("key").read() == b"value"
+    assert time.monotonic() - start < 0.5
+    assert fast.reads == 2
+
+
+def test_no_hedging_for_fast_reads():
+    preferred, other = SlowStore(), SlowStore()
+    store = ReplicatedStore([preferred, other], hedge_delay=1)
+    store.put("key", b"value")
+    for _ in range(10):
+        assert store.get("key") == b"value"
+    assert preferred.reads == 10
+    assert other.reads == 0
+
+
+def test_adaptive_hedge_delay():
+    store = ReplicatedStore([SlowStore(delay=0.001), SlowStore()])
+    assert store.current_hedge_delay() == store.initial_hedge_delay
+
+    store.put("key", b"value")
+    for _ in range(store.min_latency_samples):
+        store.get("key")
+    assert 0.001 <= store.current_hedge_delay() < store.initial_hedge_delay
+
+
+def test_read_falls_back_on_errors():
+    replica = DictStore()
+    replica.put("key", b"value")
+    store = ReplicatedStore([FailingStore(), replica], hedge_delay=10)
+
+    assert store.get("key") == b"value"
+    assert store.keys() == ["key"]
+
+
+def test_read_from_lagging_replica():
+    lagging, replica = DictStore(), DictStore()
+    replica.put("key", b"value")
+    store = ReplicatedStore([lagging, replica], hedge_delay=10)
+
+    assert store.get("key") == b"value"
+    assert "key" in store
+    assert "other" not in store
+    with pytest.raises(KeyError):
+        store.get("other")
+
+
+def test_read_fails_on_all_replicas():
+    store = ReplicatedStore([FailingStore(), FailingStore()])
+    with pytest.raises(OSError):
+        store.get("key")
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        ReplicatedStore([])
+    with pytest.raises(ValueError):
+        ReplicatedStore([DictStore()], write_quorum=2)
+    with pytest.raises(ValueError):
+        ReplicatedStore([DictStore()], hedge_percentile=0)
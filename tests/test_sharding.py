@@ -0,0 +1,134 @@
+from collections import Counter
+
+import pytest
+from basic_store import BasicStore
+
+from minimalkv.chunking import ChunkingDecorator
+from minimalkv.memory import DictStore
+from minimalkv.sharding import ShardedStore
+
+
+class TestShardedStore(BasicStore):
+    @pytest.fixture
+    def shards(self):
+        return [DictStore() for _ in range(3)]
+
+    @pytest.fixture
+    def store(self, shards):
+        return ShardedStore(shards, max_workers=3)
+
+    @pytest.fixture
+    def keys(self):
+        return [f"key{i}" for i in range(1000)]
+
+    def test_keys_are_spread(self, store, shards, keys):
+        for key in keys:
+            store.put(key, key.encode())
+
+        sizes = [len(shard.keys()) for shard in shards]
+        assert sum(sizes) == len(keys)
+        assert min(sizes) > len(keys) / 6
+        for key in keys:
+            name = store.shard_for(key)
+            assert store.shards[name].get(key) == key.encode()
+
+    def test_placement_is_stable(self, shards, keys):
+        store = ShardedStore(shards)
+        other = ShardedStore({str(i): DictStore() for i in range(3)})
+        assert [store.shard_for(k) for k in keys] == [other.shard_for(k) for k in keys]
+
+    def test_iter_prefixes_across_shards(self, store):
+        for i in range(20):
+            store.put(f"a_{i}", b"")
+            store.put(f"b_{i}", b"")
+        assert sorted(store.iter_prefixes("_")) == ["a_", "b_"]
+
+    def test_list_page_merges_shards_in_order(self, store, keys):
+        for key in keys[:100]:
+            store.put(key, b"")
+
+        page = store.list_page(limit=7)
+        listed = list(page.keys)
+        while page.token is not None:
+            assert len(page.keys) <= 7
+            page = store.list_page(limit=7, token=page.token)
+            listed.extend(page.keys)
+        assert listed == sorted(keys[:100])
+
+    def test_get_many(self, store, keys):
+        for key in keys[:50]:
+            store.put(key, key.encode())
+        assert store.get_many(keys[:50]) == {k: k.encode() for k in keys[:50]}
+        with pytest.raises(KeyError):
+            store.get_many([keys[0], "missing"])
+
+    def test_get_many_uses_shard_get_many(self, keys, mocker):
+        shards: list = [
+            ChunkingDecorator(DictStore(), avg_chunk_size=256) for _ in range(2)
+        ]
+        store = ShardedStore(shards)
+        for key in keys[:20]:
+            store.put(key, key.encode() * 100)
+        spies = [mocker.spy(shard, "get_many") for shard in shards]
+
+        assert store.get_many(keys[:20]) == {k: k.encode() * 100 for k in keys[:20]}
+        assert all(spy.call_count == 1 for spy in spies)
+
+    def test_copy_between_shards(self, store, keys):
+        store.put(keys[0], b"value")
+        dest = next(k for k in keys if store.shard_for(k) != store.shard_for(keys[0]))
+        store.copy(keys[0], dest)
+        assert store.get(dest) == b"value"
+        assert store.get(keys[0]) == b"value"
+
+    def test_add_shard_moves_only_affected_keys(self, store, shards, keys):
+        for key in keys:
+            store.put(key, key.encode())
+        before = {k: store.shard_for(k) for k in keys}
+
+        new_shard = DictStore()
+        store.add_shard("3", new_shard)
+        moved = store.rebalance()
+
+        after = {k: store.shard_for(k) for k in keys}
+        changed = [k for k in keys if before[k] != after[k]]
+        assert set(after[k] for k in changed) == {"3"}
+        assert moved == len(changed)
+        assert sorted(new_shard.keys()) == sorted(changed)
+        assert len(keys) / 8 < moved < len(keys) / 2
+        assert sum(len(shard.keys()) for shard in shards) == len(keys) - moved
+        for key in keys:
+            assert store.get(key) == key.encode()
+
+    def test_reads_before_rebalance(self, store, keys):
+        for key in keys:
+            store.put(key, key.encode())
+        store.add_shard("3", DictStore())
+
+        moving = [k for k in keys if store.shard_for(k) == "3"]
+        assert moving
+        for key in keys:
+            assert key in store
+            assert store.get(key) == key.encode()
+            assert store.open(key).read() == key.encode()
+        assert store.get_many(moving) == {k: k.encode() for k in moving}
+
+        # a write during rebalancing goes to the new shard only
+        store.put(moving[0], b"new")
+        store.delete(moving[1])
+        remaining = [k for k in keys if k != moving[1]]
+        assert sorted(store.keys()) == sorted(remaining)
+        assert Counter(store.iter_keys())[moving[0]] == 1
+
+        assert store.rebalance() == len(moving) - 2
+        assert store.get(moving[0]) == b"new"
+        assert moving[1] not in store
+
+    def test_invalid_arguments(self, shards):
+        with pytest.raises(ValueError):
+            ShardedStore([])
+        with pytest.raises(ValueError):
+            ShardedStore(shards, vnodes=0)
+        store = ShardedStore(shards)
+        with pytest.raises(ValueError):
+            store.add_shard("0", DictStore())
@@ -49,6 +49,22 @@ class TestSQLAlchemyStore(BasicStore):
         metadata.drop_all()
 
 
+class TestSQLAlchemyStoreWithETags(TestSQLAlchemyStore):
+    @pytest.fixture
+    def store(self, engine):
+        metadata = MetaData(bind=engine)
+        store = SQLAlchemyStore(engine, metadata, "minimalkv_test", etags=True)
+        # create table
+        store.table.create()
+        yield store
+        metadata.drop_all()
+
+    def test_copy_changes_etag(self, store, key, key2, value):
+        store.put(key, value)
+        store.copy(key, key2)
+        assert store.stat(key2).etag != store.stat(key).etag
+
+
 class TestExtendedKeyspaceSQLAlchemyStore(TestSQLAlchemyStore, ExtendedKeyspaceTests):
     @pytest.fixture
     def store(self, engine):
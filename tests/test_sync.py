@@ -0,0 +1,142 @@
+import os
+from typing import List
+
+import pytest
+
+from minimalkv.fs import FilesystemStore
+from minimalkv.memory import DictStore
+from minimalkv.sync import SyncResult, main, sync
+
+
+class FailingStore(DictStore):
+    # fails after storing ``fail_after`` values
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def _put_file(self, key, file, *args, **kwargs):
+        if self.fail_after == 0:
+            raise OSError("disk full")
+        self.fail_after -= 1
+        return super()._put_file(key, file, *args, **kwargs)
+
+
+@pytest.fixture
+def source():
+    store = DictStore()
+    for i in range(25):
+        store.put(f"key{i:02d}", b"value %d" % i)
+    return store
+
+
+def test_copies_all_keys(source, tmpdir):
+    target = FilesystemStore(str(tmpdir))
+
+    result = sync(source, target, page_size=7)
+    assert result.copied == 25
+    assert result.bytes_copied == sum(len(source.get(k)) for k in source.keys())
+    assert sorted(target.keys()) == sorted(source.keys())
+    for key in source.keys():
+        assert target.get(key) == source.get(key)
+
+
+def test_copies_keys_with_prefix(source):
+    target = DictStore()
+    assert sync(source, target, prefix="key1").copied == 10
+    assert sorted(target.keys()) == [f"key1{i}" for i in range(10)]
+
+
+def test_skips_unchanged_keys(source):
+    target = DictStore()
+    sync(source, target)
+
+    source.put("key03", b"changed")
+    result = sync(source, target)
+    assert (result.copied, result.skipped) == (1, 24)
+    assert target.get("key03") == b"changed"
+
+
+def test_compare(source):
+    target = DictStore()
+    sync(source, target)
+    source.put("key03", b"changed value")
+    target.put("key04", b"VALUE 4")
+
+    assert sync(source, target, compare="size").copied == 1
+    assert target.get("key04") == b"VALUE 4"
+    assert sync(source, target, compare="none").copied == 25
+    assert target.get("key04") == b"value 4"
+
+    with pytest.raises(ValueError):
+        sync(source, target, compare="mtime")
+
+
+def test_mirror_deletes_keys_missing_from_source(source):
+    target = DictStore()
+    target.put("key99", b"stale")
+    target.put("other", b"other")
+
+    result = sync(source, target, prefix="key", mirror=True, page_size=4)
+    assert result.deleted == 1
+    assert "key99" not in target
+    assert "other" in target
+    assert sorted(target.keys("key")) == sorted(source.keys())
+
+
+def test_streams_large_values(source, mocker):
+    source.put("large", b"x" * 1000)
+    target = DictStore()
+    put_file = mocker.spy(target, "put_file")
+
+    sync(source, target, stream_threshold=100)
+    assert [call.args[0] for call in put_file.call_args_list] == ["large"]
+    assert target.get("large") == b"x" * 1000
+
+
+def test_resumes_from_checkpoint(source, tmpdir):
+    checkpoint = str(tmpdir.join("checkpoint.json"))
+    target = FailingStore(fail_after=12)
+
+    with pytest.raises(OSError):
+        sync(source, target, checkpoint=checkpoint, page_size=5, max_workers=1)
+    assert os.path.exists(checkpoint)
+
+    target.fail_after = -1
+    result = sync(source, target, compare="none", checkpoint=checkpoint, page_size=5)
+    # the first two pages were done before the failure
+    assert result.copied == 15
+    assert sorted(target.keys()) == sorted(source.keys())
+    assert not os.path.exists(checkpoint)
+
+
+def test_checkpoint_of_other_prefix(source, tmpdir):
+    checkpoint = str(tmpdir.join("checkpoint.json"))
+    with pytest.raises(OSError):
+        sync(source, FailingStore(7), checkpoint=checkpoint, page_size=5, max_workers=1)
+
+    with pytest.raises(ValueError):
+        sync(source, DictStore(), prefix="key1", checkpoint=checkpoint)
+
+
+def test_reports_progress(source):
+    results: List[SyncResult] = []
+    result = sync(source, DictStore(), page_size=10, progress=results.append)
+
+    assert [r.copied for r in results] == [10, 20, 25]
+    assert results[-1].bytes_copied == result.bytes_copied
+    assert result.throughput > 0
+
+
+def test_main(source, tmpdir, capsys):
+    source_dir, target_dir = tmpdir.mkdir("source"), tmpdir.mkdir("target")
+    sync(source, FilesystemStore(str(source_dir)))
+
+    args = [f"hfs://{source_dir}", f"hfs://{target_dir}", "--quiet"]
+    assert main(args) == 0
+    assert "25 copied" in capsys.readouterr().out
+    assert sorted(os.listdir(target_dir)) == sorted(source.keys())
+
+    os.remove(source_dir.join("key00"))
+    assert main(args + ["--mirror", "--compare", "size"]) == 0
+    assert "24 skipped, 1 deleted" in capsys.readouterr().out
+    assert not target_dir.join("key00").exists()
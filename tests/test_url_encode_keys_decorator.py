@@ -26,8 +26,22 @@ class TestURLEncodeKeysDecorator(BasicStore):
         assert base_store.get("abc+def%2Fkey") == value
         assert store.get("abc def/key") == value
 
+    def test_list_page_is_sorted(self, store):
+        keys = ["a b", "a!", "a.", "a(", "a="]
+        for key in keys:
+            store.put(key, b"")
+
+        assert store.list_page(limit=10).keys == sorted(keys)
+        assert store.list_page(start_after="a.").keys == ["a="]
+        page = store.list_page(limit=2)
+        assert page.keys == sorted(keys)[:2]
+        assert store.list_page(limit=10, token=page.token).keys == sorted(keys)[2:]
+
     # The invalid key is replaced by a valid one after encoding through
     # the decorator...
     test_exception_on_invalid_key_delete = None
     test_exception_on_invalid_key_get_file = None
     test_exception_on_invalid_key_get = None
+    test_exception_on_invalid_key_stat = None
+    test_exception_on_invalid_key_get_range = None
+    test_exception_on_invalid_key_get_into = None